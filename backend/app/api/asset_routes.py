@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Optional
+from app.api.deps import get_asset_catalog
+from app.services.asset_catalog import AssetCatalog
+from app.services.file_storage import run_io
+from app.models.schemas import AssetRecord
+
+router = APIRouter()
+
+@router.get("/projects/{project_name}/assets", response_model=List[AssetRecord])
+async def list_project_assets(
+    response: Response,
+    project_name: str,
+    scene_id: Optional[str] = None,
+    shot_id: Optional[str] = None,
+    file_type: Optional[str] = Query(None, description="image/video"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    catalog: AssetCatalog = Depends(get_asset_catalog),
+):
+    """
+    Generated files of a project from the asset catalog, in scene/shot/file name order.
+    X-Total-Count holds the number of matching files for paging.
+    """
+    assets = await run_io(catalog.list_assets, project_name, scene_id, shot_id, file_type, limit, offset)
+    response.headers["X-Total-Count"] = str(await run_io(catalog.count_assets, project_name, scene_id, shot_id, file_type))
+    return assets
+
+@router.get("/assets/{file_id}", response_model=AssetRecord)
+async def get_asset(file_id: str, catalog: AssetCatalog = Depends(get_asset_catalog)):
+    """
+    Look up a generated file by the file_id returned when it was generated
+    """
+    asset = await run_io(catalog.get, file_id)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return asset
@@ -0,0 +1,63 @@
+from app.services.gemini_client import GeminiClient
+from app.services.veo_client import VeoClient
+from app.services.file_storage import FileStorageService
+from app.services.http_pool import http_pool
+from app.services.generation_cache import GenerationCache, generation_cache
+from app.services.progress_hub import ProgressHub, progress_hub
+from app.services.task_store import TaskStore, task_store
+from app.services.veo_jobs import VeoJobManager, veo_jobs
+from app.services.derivatives import DerivativeService, derivatives
+from app.services.project_registry import ProjectRegistry, project_registry
+from app.services.single_flight import SingleFlight, generation_flights
+from app.services.asset_catalog import AssetCatalog, asset_catalog
+from app.services.storage_sweeper import StorageSweeper, storage_sweeper
+
+
+def get_gemini_client() -> GeminiClient:
+    """GeminiClient bound to the shared Gemini connection pool"""
+    return GeminiClient(http_client=http_pool.gemini)
+
+
+def get_veo_client() -> VeoClient:
+    """VeoClient bound to the shared Veo connection pool"""
+    return VeoClient(http_client=http_pool.veo)
+
+
+def get_file_storage() -> FileStorageService:
+    return FileStorageService()
+
+
+def get_generation_cache() -> GenerationCache:
+    return generation_cache
+
+
+def get_veo_jobs() -> VeoJobManager:
+    return veo_jobs
+
+
+def get_task_store() -> TaskStore:
+    return task_store
+
+
+def get_progress_hub() -> ProgressHub:
+    return progress_hub
+
+
+def get_derivatives() -> DerivativeService:
+    return derivatives
+
+
+def get_project_registry() -> ProjectRegistry:
+    return project_registry
+
+
+def get_flights() -> SingleFlight:
+    return generation_flights
+
+
+def get_asset_catalog() -> AssetCatalog:
+    return asset_catalog
+
+
+def get_storage_sweeper() -> StorageSweeper:
+    return storage_sweeper
@@ -0,0 +1,22 @@
+import httpx
+from fastapi import HTTPException
+from app.services.rate_limiter import THROTTLE_STATUSES
+from app.services.resilience import CircuitOpenError
+
+
+def upstream_http_exception(e: Exception) -> HTTPException:
+    """
+    Map an upstream failure to the error returned to our own clients.
+    Throttling keeps its status and Retry-After so callers can back off too;
+    an open circuit is reported as 503 with the time until the next probe.
+    """
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_in)))})
+    if isinstance(e, httpx.HTTPStatusError) and e.response.status_code in THROTTLE_STATUSES:
+        retry_after = e.response.headers.get("Retry-After")
+        return HTTPException(
+            status_code=e.response.status_code,
+            detail=f"Upstream is throttling requests: {e}",
+            headers={"Retry-After": retry_after} if retry_after else None
+        )
+    return HTTPException(status_code=500, detail=str(e))
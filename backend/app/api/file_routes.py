@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from app.api.deps import get_derivatives, get_file_storage
+from app.services.derivatives import DerivativeService, is_derivative
+from app.services.file_storage import FileStorageService, run_io
+
+router = APIRouter()
+
+# Thumbnails are re-rendered in place when the original changes, so revalidate rather than pin
+THUMBNAIL_CACHE_CONTROL = "public, max-age=300"
+
+
+@router.get("/thumbnails/{file_path:path}")
+async def get_thumbnail(
+    file_path: str,
+    storage: FileStorageService = Depends(get_file_storage),
+    derivatives: DerivativeService = Depends(get_derivatives),
+):
+    """
+    WebP thumbnail of a generated frame, or poster image of a generated video.
+    Rendered on demand if it is missing or older than the original.
+    """
+    source = await run_io(storage.resolve_file, file_path)
+    if source is None or is_derivative(source):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    thumbnail = await derivatives.ensure(source)
+    if thumbnail is None:
+        raise HTTPException(status_code=404, detail="Thumbnail unavailable")
+    return FileResponse(thumbnail, media_type="image/webp", headers={"Cache-Control": THUMBNAIL_CACHE_CONTROL})
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
+from typing import Literal
+from app.api.errors import upstream_http_exception
+from app.api.deps import get_generation_cache, get_gemini_client, get_file_storage, get_progress_hub, get_derivatives, get_flights
 from app.services.gemini_client import GeminiClient
 from app.services.file_storage import FileStorageService
+from app.services.generation_cache import GenerationCache
+from app.services.derivatives import DerivativeService
+from app.services.progress_hub import ProgressHub, task_update
+from app.services.single_flight import SingleFlight, coalesce_key
 from app.models.schemas import GeneratedFile
-from app.core.config import settings
-import uuid
-import os
 
 router = APIRouter()
 
@@ -17,40 +21,61 @@ class ImageGenRequest(BaseModel):
     frame_type: str  # start/middle/end
 
 @router.post("/generate-image", response_model=GeneratedFile)
-async def generate_image(request: ImageGenRequest):
+async def generate_image(
+    request: ImageGenRequest,
+    client: GeminiClient = Depends(get_gemini_client),
+    storage: FileStorageService = Depends(get_file_storage),
+    cache_store: GenerationCache = Depends(get_generation_cache),
+    cache: Literal["use", "bypass"] = Query("use", description="bypass: skip the cache lookup and regenerate"),
+    hub: ProgressHub = Depends(get_progress_hub),
+    derivatives: DerivativeService = Depends(get_derivatives),
+    flights: SingleFlight = Depends(get_flights),
+):
     """
     Generate an image based on prompt and save it
+    Identical concurrent requests (double clicks, retries, several viewers) share one generation
     """
-    client = GeminiClient()
-    storage = FileStorageService()
-    
-    try:
-        # 1. Generate Image
-        image_data = await client.generate_image(request.prompt)
-        
+    def publish(state: str, **kwargs):
+        hub.publish(task_update(
+            request.project_name, request.scene_id, request.shot_id, request.frame_type, state, **kwargs
+        ))
+
+    async def produce():
+        # 1. Generate Image (or reuse an identical cached generation)
+        blob = await cache_store.get_or_stream(
+            cache_key,
+            lambda: client.stream_image(request.prompt),
+            bypass=cache == "bypass"
+        )
+
         # 2. Save File
         filename = f"{request.scene_id}_{request.shot_id}_{request.frame_type}.png"
-        file_path = storage.save_file(
-            content=image_data,
+        file_path = await blob.save_to(
+            storage,
             project_name=request.project_name,
             scene_id=request.scene_id,
             shot_id=request.shot_id,
             filename=filename
         )
-        
+        return file_path, blob.hit
+
+    cache_key = client.cache_key(request.prompt)
+    publish("running")
+    try:
+        file_path, _ = await flights.do(
+            coalesce_key(cache_key or request.prompt, request.project_name, request.scene_id,
+                         request.shot_id, request.frame_type, cache),
+            produce
+        )
+
         # 3. Return Result
-        rel_path = os.path.relpath(file_path, settings.OUTPUT_DIR)
-        file_url = f"/files/{rel_path.replace(os.sep, '/')}"
-        
-        return GeneratedFile(
-            file_id=str(uuid.uuid4()),
-            shot_id=request.shot_id,
-            file_type="image",
-            file_path=file_path,
-            file_url=file_url,
-            file_name=filename,
-            file_size=os.path.getsize(file_path)
+        generated = await storage.register_file_async(
+            file_path, request.project_name, request.scene_id, request.shot_id, "image"
         )
+        derivatives.schedule(file_path)
+        publish("completed", file=generated)
+        return generated
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        publish("failed", error=str(e))
+        raise upstream_http_exception(e)
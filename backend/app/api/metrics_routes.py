@@ -0,0 +1,116 @@
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.gemini_batcher import gemini_batcher
+from app.services.generation_cache import generation_cache
+from app.services.metrics import HTTP_IN_FLIGHT, HTTP_SECONDS, metrics
+from app.services.progress_hub import progress_hub
+from app.services.rate_limiter import rate_limiters
+from app.services.resilience import circuit_breakers
+from app.services.single_flight import generation_flights
+from app.services.veo_jobs import veo_jobs
+
+router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware buffering, so SSE streams pass through untouched).
+    Routes are labelled by their path template to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            HTTP_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=route_label(scope),
+                status=str(status_code)
+            )
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope["path"].startswith("/files/"):
+        return "/files"
+    return "unmatched"
+
+
+def collect_service_stats():
+    """State the services already track, read at scrape time"""
+    cache = generation_cache.stats()
+    yield "cache_hits_total", "counter", "Generation cache hits", [({}, cache["hits"])]
+    yield "cache_misses_total", "counter", "Generation cache misses", [({}, cache["misses"])]
+    yield "cache_evictions_total", "counter", "Generation cache evictions", [({}, cache["evictions"])]
+    # Read from running counters: a scrape never walks the cache directory
+    if cache["size_bytes"] is not None:
+        yield "cache_size_bytes", "gauge", "Generation cache size", [({}, cache["size_bytes"])]
+
+    limiters = rate_limiters.stats().values()
+    yield "rate_limit_concurrency", "gauge", "Adaptive concurrency limit per model", [
+        ({"model": s["name"]}, s["concurrency_target"]) for s in limiters
+    ]
+    yield "rate_limit_waiting", "gauge", "Requests waiting for a rate limiter slot", [
+        ({"model": s["name"]}, s["waiting"]) for s in limiters
+    ]
+    yield "rate_limit_throttled_total", "counter", "429/503 responses seen per model", [
+        ({"model": s["name"]}, s["throttled"]) for s in limiters
+    ]
+
+    breakers = circuit_breakers.stats().values()
+    yield "circuit_breaker_open", "gauge", "1 while an upstream's circuit is open or half open", [
+        ({"upstream": s["name"]}, 0 if s["state"] == "closed" else 1) for s in breakers
+    ]
+    yield "circuit_breaker_rejected_total", "counter", "Calls rejected by an open circuit", [
+        ({"upstream": s["name"]}, s["rejected"]) for s in breakers
+    ]
+
+    batching = gemini_batcher.stats()
+    yield "gemini_batches_total", "counter", "batchGenerateContent calls submitted", [({}, batching["batches"])]
+    yield "gemini_batched_frames_total", "counter", "Frames produced by a batch call", [({}, batching["batched"])]
+    yield "gemini_batch_fallbacks_total", "counter", "Batched frames re-sent as single requests", [({}, batching["fallbacks"])]
+
+    yield "generation_coalesced_total", "counter", "Requests that joined an identical in-flight generation", [
+        ({"kind": "image"}, generation_flights.stats()["coalesced"]),
+        ({"kind": "video"}, veo_jobs.coalesced),
+    ]
+
+    yield "progress_subscribers", "gauge", "Open progress event streams", [
+        ({}, sum(progress_hub.stats().values()))
+    ]
+
+
+metrics.register_collector(collect_service_stats)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """
+    Prometheus scrape endpoint
+    """
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
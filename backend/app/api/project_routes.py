@@ -0,0 +1,112 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from typing import AsyncIterator, Literal, Optional
+from app.api.deps import get_gemini_client, get_veo_client, get_file_storage, get_progress_hub, get_project_registry
+from app.core.config import settings
+from app.services.batch_scheduler import batch_scheduler
+from app.services.gemini_client import GeminiClient
+from app.services.veo_client import VeoClient
+from app.services.file_storage import FileStorageService
+from app.services.file_storage import run_io
+from app.services.manifest import project_slug
+from app.services.progress_hub import ProgressHub
+from app.services.project_registry import ProjectRegistry, RegisteredProject
+from app.models.schemas import ProjectData, Shot, TaskStatus
+
+router = APIRouter()
+
+async def load_project(project_id: str, registry: ProjectRegistry) -> RegisteredProject:
+    registered = await run_io(registry.get_project, project_id)
+    if registered is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return registered
+
+@router.get("/projects/{project_id}", response_model=ProjectData)
+async def get_project(project_id: str, registry: ProjectRegistry = Depends(get_project_registry)):
+    """
+    Latest processed upload of a project (project_id as returned by /upload-json)
+    """
+    project = (await load_project(project_id, registry)).project
+    # Serialized directly; response_model re-validation would double the cost for large scripts
+    return Response(content=project.model_dump_json(), media_type="application/json")
+
+@router.get("/projects/{project_id}/shots/{shot_id}", response_model=Shot)
+async def get_project_shot(
+    project_id: str,
+    shot_id: str,
+    scene_id: Optional[str] = Query(None, description="场景ID（镜头ID在多个场景中重复时必填）"),
+    registry: ProjectRegistry = Depends(get_project_registry),
+):
+    """
+    One shot with its processed prompts
+    """
+    shots = (await load_project(project_id, registry)).find_shots(shot_id, scene_id)
+    if not shots:
+        raise HTTPException(status_code=404, detail="Shot not found")
+    if len(shots) > 1:
+        raise HTTPException(status_code=409, detail="Shot id is used in several scenes; pass scene_id")
+    return shots[0]
+
+@router.post("/projects/{project_id}/generate", response_model=TaskStatus, status_code=202)
+async def generate_project(
+    project_id: str,
+    project_data: ProjectData,
+    gemini: GeminiClient = Depends(get_gemini_client),
+    veo: VeoClient = Depends(get_veo_client),
+    storage: FileStorageService = Depends(get_file_storage),
+    cache: Literal["use", "bypass"] = Query("use", description="bypass: skip the cache lookup and regenerate"),
+    mode: Literal["all", "changed"] = Query("all", description="changed: skip frames already generated from the same prompt"),
+):
+    """
+    Schedule every frame and video of a processed project as one batch.
+    Returns the batch status immediately; poll /batches/{task_id} for progress.
+    """
+    # Task records are keyed by the path id, progress events by the body's project: they must agree
+    if project_slug(project_data.project) != project_id or project_data.project_id not in (None, project_id):
+        raise HTTPException(status_code=409, detail="Project body does not match project_id")
+    return batch_scheduler.submit(
+        project_id, project_data, gemini, veo, storage,
+        cache_bypass=cache == "bypass",
+        only_changed=mode == "changed"
+    )
+
+@router.get("/batches/{task_id}", response_model=TaskStatus)
+async def get_batch_status(task_id: str):
+    """
+    Get the progress of a batch generation
+    """
+    status = batch_scheduler.get_batch(task_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return status
+
+@router.get("/projects/{project_id}/events")
+async def stream_project_events(request: Request, project_id: str, hub: ProgressHub = Depends(get_progress_hub)):
+    """
+    Server-sent events with per-frame TaskStatus updates for one project
+    (project_id as returned by /upload-json; task_id is "<scene_id>-<shot_id>-<frame_type>"). The latest state of each
+    known task is sent on connect; slow clients receive only the newest state.
+    """
+    subscriber = hub.subscribe(project_id)
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                batch = await subscriber.next_batch(timeout=settings.PROGRESS_HEARTBEAT)
+                if subscriber.overflowed:
+                    # Too far behind: close so the browser reconnects and resyncs from the snapshot
+                    yield "event: overflow\ndata: {}\n\n"
+                    break
+                if not batch:
+                    yield ": keepalive\n\n"
+                    continue
+                yield "".join(f"event: task\ndata: {data}\n\n" for data in batch)
+        finally:
+            hub.unsubscribe(project_id, subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
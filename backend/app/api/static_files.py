@@ -0,0 +1,165 @@
+import os
+from email.utils import formatdate, parsedate
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers, QueryParams
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+from app.services.file_hashes import file_hashes
+from app.services.file_storage import VERSION_LENGTH, run_io
+
+# Versioned URLs (?v=<content hash>) never change content; plain URLs revalidate via ETag
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class UnsatisfiableRange(ValueError):
+    pass
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive (start, end) of a single "bytes=" range. None means serve the whole
+    file (malformed or multi-range requests, which RFC 9110 allows ignoring).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first or last):
+        return None
+    try:
+        start = int(first) if first else None
+        end = int(last) if last else None
+    except ValueError:
+        return None
+
+    if start is None:
+        # Suffix range: the last N bytes
+        if end <= 0 or size == 0:
+            raise UnsatisfiableRange(header)
+        return max(0, size - end), size - 1
+    if start < 0 or (end is not None and end < start):
+        return None
+    if start >= size:
+        raise UnsatisfiableRange(header)
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class FileRangeResponse(FileResponse):
+    """
+    File body (or one byte range of it). Uses the ASGI zero-copy send extension
+    when the server offers it; otherwise reads large chunks in a worker thread.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, stat_result: os.stat_result, headers: dict, method: str,
+                 byte_range: Optional[Tuple[int, int]] = None):
+        size = stat_result.st_size
+        self.start, end = byte_range or (0, size - 1)
+        self.count = end - self.start + 1
+        headers = {**headers, "content-length": str(self.count)}
+        if byte_range is not None:
+            headers["content-range"] = f"bytes {self.start}-{end}/{size}"
+        super().__init__(path, status_code=206 if byte_range else 200, headers=headers,
+                         stat_result=stat_result, method=method)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only or self.count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            file = await anyio.to_thread.run_sync(open, self.path, "rb")
+            try:
+                await send({"type": ZEROCOPY_EXTENSION, "file": file, "offset": self.start,
+                            "count": self.count, "more_body": False})
+            finally:
+                await anyio.to_thread.run_sync(file.close)
+            return
+
+        # Served from anyio's thread pool (as StaticFiles does) so downloads never queue behind storage writes
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            remaining = self.count
+            while remaining:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break  # Truncated underneath us; the declared length cannot be met
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class OutputFiles(StaticFiles):
+    """
+    /files mount for generated outputs: strong content-hash ETags, If-None-Match /
+    If-Modified-Since 304s, single byte ranges (video seeking) and immutable caching
+    for content-versioned URLs. Dot-files and dot-directories (in-flight .tmp writes,
+    a legacy .cache) are never served.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        # Conditional handling happens in get_response, once the content hash is known
+        return FileResponse(full_path, status_code=status_code, stat_result=stat_result, method=scope["method"])
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if any(part.startswith(".") for part in path.replace(os.sep, "/").split("/")):
+            raise HTTPException(status_code=404)
+        response = await super().get_response(path, scope)
+        if not isinstance(response, FileResponse) or response.status_code != 200:
+            return response
+
+        full_path, stat_result = str(response.path), response.stat_result
+        digest = file_hashes.lookup(full_path, stat_result) or await run_io(file_hashes.digest, full_path, stat_result)
+        etag = f'"{digest}"'
+        version = QueryParams(scope["query_string"]).get("v") or ""
+        headers = {
+            "etag": etag,
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "accept-ranges": "bytes",
+            # A short prefix (?v=a) would pin whatever content happens to match it
+            "cache-control": IMMUTABLE_CACHE_CONTROL if len(version) >= VERSION_LENGTH and digest.startswith(version)
+            else REVALIDATE_CACHE_CONTROL,
+        }
+
+        request_headers = Headers(scope=scope)
+        if self.is_fresh(request_headers, etag, headers["last-modified"]):
+            return NotModifiedResponse(Headers(headers))
+
+        byte_range = None
+        range_header = request_headers.get("range")
+        if range_header and self.range_applies(request_headers.get("if-range"), etag, headers["last-modified"]):
+            try:
+                byte_range = parse_range(range_header, stat_result.st_size)
+            except UnsatisfiableRange:
+                return Response(status_code=416, headers={**headers, "content-range": f"bytes */{stat_result.st_size}"})
+        return FileRangeResponse(full_path, stat_result, headers, scope["method"], byte_range)
+
+    def is_fresh(self, request_headers: Headers, etag: str, last_modified: str) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            # If-Modified-Since is ignored whenever If-None-Match is present
+            return etag_matches(if_none_match, etag)
+        if_modified_since = parsedate(request_headers.get("if-modified-since", ""))
+        return if_modified_since is not None and if_modified_since >= parsedate(last_modified)
+
+    def range_applies(self, if_range: Optional[str], etag: str, last_modified: str) -> bool:
+        # If-Range needs a strong match (or the exact date); otherwise the full file is sent
+        return if_range is None or if_range.strip() in (etag, last_modified)
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.api.deps import get_generation_cache, get_storage_sweeper
+from app.services.generation_cache import GenerationCache
+from app.services.storage_sweeper import StorageSweeper
+from app.services.rate_limiter import rate_limiters
+from app.services.resilience import circuit_breakers
+
+router = APIRouter()
+
+@router.get("/system/cache")
+async def get_cache_stats(cache: GenerationCache = Depends(get_generation_cache)):
+    """
+    Generation cache size and hit/miss counters
+    """
+    return await cache.stats_async()
+
+@router.get("/system/rate-limits")
+async def get_rate_limits():
+    """
+    Current per-model token bucket and adaptive concurrency limits
+    """
+    return rate_limiters.stats()
+
+@router.get("/system/breakers")
+async def get_circuit_breakers():
+    """
+    Circuit breaker state per upstream (closed/open/half_open)
+    """
+    return circuit_breakers.stats()
+
+@router.get("/system/storage")
+async def get_storage_stats(sweeper: StorageSweeper = Depends(get_storage_sweeper)):
+    """
+    Storage sweeper totals and the report of its last pass
+    """
+    return sweeper.stats()
+
+@router.post("/system/storage/sweep")
+async def run_storage_sweep(sweeper: StorageSweeper = Depends(get_storage_sweeper)):
+    """
+    Run one sweep now and return what it reclaimed
+    """
+    report = await sweeper.sweep()
+    if report is None:
+        raise HTTPException(status_code=409, detail="Another worker is sweeping")
+    return report
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Optional
+from app.api.deps import get_task_store
+from app.services.file_storage import run_io
+from app.services.task_store import TaskStore
+from app.models.schemas import TaskRecord
+
+router = APIRouter()
+
+@router.get("/tasks", response_model=List[TaskRecord])
+async def list_tasks(
+    project: Optional[str] = Query(None, description="项目名称"),
+    status: Optional[str] = Query(None, description="queued/running/completed/failed"),
+    scene_id: Optional[str] = None,
+    shot_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    store: TaskStore = Depends(get_task_store),
+):
+    """
+    List persisted generation tasks, most recently updated first
+    """
+    return await run_io(store.list_tasks, project, status, scene_id, shot_id, limit, offset)
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
+from typing import Literal
+from app.api.errors import upstream_http_exception
+from app.api.deps import get_veo_client, get_file_storage, get_veo_jobs
 from app.services.veo_client import VeoClient
-from app.services.file_storage import FileStorageService
-from app.models.schemas import GeneratedFile
-from app.core.config import settings
-import uuid
-import os
+from app.services.veo_jobs import VeoJobManager
+from app.services.file_storage import FileStorageService, run_io
+from app.models.schemas import TaskStatus
 
 router = APIRouter()
 
@@ -14,46 +15,51 @@ class VideoGenRequest(BaseModel):
     scene_id: str
     shot_id: str
     prompt: str
-    start_image_path: str = None # Optional path to start frame
+    start_image_path: str = None # Optional path to start frame (defaults to the shot's saved start frame)
 
-@router.post("/generate-video", response_model=GeneratedFile)
-async def generate_video(request: VideoGenRequest):
+@router.post("/generate-video", response_model=TaskStatus, status_code=202)
+async def generate_video(
+    request: VideoGenRequest,
+    client: VeoClient = Depends(get_veo_client),
+    storage: FileStorageService = Depends(get_file_storage),
+    jobs: VeoJobManager = Depends(get_veo_jobs),
+    cache: Literal["use", "bypass"] = Query("use", description="bypass: skip the cache lookup and regenerate"),
+):
     """
-    Generate a video based on prompt and save it
+    Submit a video generation and return its task status immediately.
+    Poll /video-tasks/{task_id}; the result holds the GeneratedFile once completed.
+    The shot's start frame (start_image_path, a file_path returned by /generate-image,
+    or else the saved <scene>_<shot>_start.png) conditions the video.
     """
-    client = VeoClient()
-    storage = FileStorageService()
-    
+    if request.start_image_path:
+        start_image_path = await run_io(storage.resolve_file, request.start_image_path)
+        if start_image_path is None:
+            raise HTTPException(status_code=400, detail="start_image_path is not a generated file")
+    else:
+        start_image_path = await run_io(storage.find_output_file, request.project_name, request.scene_id,
+                                        request.shot_id, f"{request.scene_id}_{request.shot_id}_start.png")
     try:
-        # 1. Generate Video
-        video_data = await client.generate_video(
+        return await jobs.submit(
+            client,
+            storage,
             prompt=request.prompt,
-            image_url=None # TODO: Handle local file upload to Veo if supported
-        )
-        
-        # 2. Save File
-        filename = f"{request.scene_id}_{request.shot_id}_video.mp4"
-        file_path = storage.save_file(
-            content=video_data,
             project_name=request.project_name,
             scene_id=request.scene_id,
             shot_id=request.shot_id,
-            filename=filename
-        )
-        
-        # 3. Return Result
-        rel_path = os.path.relpath(file_path, settings.OUTPUT_DIR)
-        file_url = f"/files/{rel_path.replace(os.sep, '/')}"
-
-        return GeneratedFile(
-            file_id=str(uuid.uuid4()),
-            shot_id=request.shot_id,
-            file_type="video",
-            file_path=file_path,
-            file_url=file_url,
-            file_name=filename,
-            file_size=os.path.getsize(file_path)
+            filename=f"{request.scene_id}_{request.shot_id}_video.mp4",
+            cache_bypass=cache == "bypass",
+            start_image_path=start_image_path
         )
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise upstream_http_exception(e)
+
+@router.get("/video-tasks/{task_id}", response_model=TaskStatus)
+async def get_video_task(task_id: str, jobs: VeoJobManager = Depends(get_veo_jobs)):
+    """
+    Get the status of a video generation task
+    """
+    status = jobs.get_status(task_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return status
@@ -12,10 +12,12 @@ class Settings(BaseSettings):
     # System Config
     MAX_CONCURRENT_TASKS: int = int(os.getenv("MAX_CONCURRENT_TASKS", 5))
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", 500 * 1024 * 1024)) # 500MB
+    STORAGE_IO_WORKERS: int = int(os.getenv("STORAGE_IO_WORKERS", 4)) # 文件读写线程池大小
     
     # Base directory calculation
     _BACKEND_DIR: str = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     OUTPUT_DIR: str = os.path.join(_BACKEND_DIR, os.getenv("OUTPUT_DIR", "output"))
+    DATA_DIR: str = os.path.join(_BACKEND_DIR, os.getenv("DATA_DIR", "data"))  # 本地状态数据库（不对外暴露）
     
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     
@@ -27,6 +29,94 @@ class Settings(BaseSettings):
     GEMINI_BASE_URL: str = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
     VEO_BASE_URL: str = os.getenv("VEO_BASE_URL", "https://api.veo.google.com/v1")
 
+    # HTTP Pool Config (seconds)
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10.0))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30.0))
+    GEMINI_READ_TIMEOUT: float = float(os.getenv("GEMINI_READ_TIMEOUT", 30.0))
+    VEO_READ_TIMEOUT: float = float(os.getenv("VEO_READ_TIMEOUT", 120.0))
+
+    # Veo Long-running Operation Polling (seconds)
+    VEO_POLL_INITIAL_INTERVAL: float = float(os.getenv("VEO_POLL_INITIAL_INTERVAL", 2.0))
+    VEO_POLL_MAX_INTERVAL: float = float(os.getenv("VEO_POLL_MAX_INTERVAL", 30.0))
+    VEO_POLL_BACKOFF: float = float(os.getenv("VEO_POLL_BACKOFF", 1.5))
+    VEO_JOB_TIMEOUT: float = float(os.getenv("VEO_JOB_TIMEOUT", 900.0))
+
+    # Veo Start-frame Uploads (image-to-video; uploaded once per content hash)
+    VEO_UPLOAD_TTL: float = float(os.getenv("VEO_UPLOAD_TTL", 48 * 3600.0)) # 上游未返回过期时间时的默认有效期
+    VEO_UPLOAD_REFRESH_MARGIN: float = float(os.getenv("VEO_UPLOAD_REFRESH_MARGIN", 3600.0)) # 距过期不足此秒数即重新上传
+    REFERENCE_UPLOADS_PATH: str = os.getenv("REFERENCE_UPLOADS_PATH", "")  # 默认为 DATA_DIR/reference_uploads.json
+
+    # Generation Cache Config
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_DIR: str = os.getenv("CACHE_DIR", "")  # 默认为 DATA_DIR/cache（不放在公开的 OUTPUT_DIR 下）
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", 5 * 1024 * 1024 * 1024)) # 5GB
+
+    # Storage Sweeper (background cleanup of OUTPUT_DIR)
+    SWEEP_ENABLED: bool = os.getenv("SWEEP_ENABLED", "true").lower() == "true"
+    SWEEP_INTERVAL: float = float(os.getenv("SWEEP_INTERVAL", 600.0)) # 两次清理间隔（秒）
+    TEMP_FILE_TTL: float = float(os.getenv("TEMP_FILE_TTL", 24 * 3600.0)) # 未完成写入的临时文件保留时间
+    OUTPUT_MAX_BYTES: int = int(os.getenv("OUTPUT_MAX_BYTES", 0)) # 输出目录容量上限（不含缓存），0 为不限
+    SWEEP_MIN_AGE: float = float(os.getenv("SWEEP_MIN_AGE", 3600.0)) # 超出容量时也不删除比此更新的文件
+
+    # Single-flight (identical concurrent generations share one upstream call)
+    SINGLE_FLIGHT_FILE_LOCKS: bool = os.getenv("SINGLE_FLIGHT_FILE_LOCKS", "true").lower() == "true" # 跨 uvicorn worker 合并（文件锁）
+    SINGLE_FLIGHT_LOCK_DIR: str = os.getenv("SINGLE_FLIGHT_LOCK_DIR", "")  # 默认为 DATA_DIR/locks
+    SINGLE_FLIGHT_LOCK_POLL: float = float(os.getenv("SINGLE_FLIGHT_LOCK_POLL", 0.1)) # 等待其他进程释放锁的轮询间隔
+
+    # Upstream Rate Limiting (per model; token bucket + AIMD concurrency)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    GEMINI_RATE_LIMIT_RPS: float = float(os.getenv("GEMINI_RATE_LIMIT_RPS", 2.0))
+    GEMINI_RATE_LIMIT_BURST: int = int(os.getenv("GEMINI_RATE_LIMIT_BURST", 5))
+    VEO_RATE_LIMIT_RPS: float = float(os.getenv("VEO_RATE_LIMIT_RPS", 0.5))
+    VEO_RATE_LIMIT_BURST: int = int(os.getenv("VEO_RATE_LIMIT_BURST", 2))
+    RATE_LIMIT_MIN_CONCURRENCY: int = int(os.getenv("RATE_LIMIT_MIN_CONCURRENCY", 1))
+    RATE_LIMIT_MAX_CONCURRENCY: int = int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", MAX_CONCURRENT_TASKS))
+    RATE_LIMIT_DECREASE_FACTOR: float = float(os.getenv("RATE_LIMIT_DECREASE_FACTOR", 0.5))
+    RATE_LIMIT_DEFAULT_RETRY_AFTER: float = float(os.getenv("RATE_LIMIT_DEFAULT_RETRY_AFTER", 5.0)) # 429无Retry-After时的暂停秒数
+    RATE_LIMIT_MAX_COOLDOWN: float = float(os.getenv("RATE_LIMIT_MAX_COOLDOWN", 120.0))
+
+    # Upstream Retry / Circuit Breaker
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", 3))
+    RETRY_BASE_DELAY: float = float(os.getenv("RETRY_BASE_DELAY", 0.5))
+    RETRY_MAX_DELAY: float = float(os.getenv("RETRY_MAX_DELAY", 10.0))
+    GEMINI_ATTEMPT_TIMEOUT: float = float(os.getenv("GEMINI_ATTEMPT_TIMEOUT", 90.0)) # 单次请求总时限
+    VEO_ATTEMPT_TIMEOUT: float = float(os.getenv("VEO_ATTEMPT_TIMEOUT", 300.0))
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", 5))
+    BREAKER_RESET_TIMEOUT: float = float(os.getenv("BREAKER_RESET_TIMEOUT", 30.0))
+
+    # Finished task/batch statuses kept in memory for polling clients
+    TASK_STATUS_TTL: float = float(os.getenv("TASK_STATUS_TTL", 3600.0)) # 已结束任务状态的保留秒数
+
+    # Progress Streaming (SSE)
+    PROGRESS_MAX_PENDING: int = int(os.getenv("PROGRESS_MAX_PENDING", 10000)) # 单个慢客户端最多积压的任务数
+    PROGRESS_HEARTBEAT: float = float(os.getenv("PROGRESS_HEARTBEAT", 15.0))
+
+    # Task Store Config
+    TASK_DB_PATH: str = os.getenv("TASK_DB_PATH", "")  # 默认为 DATA_DIR/tasks.db
+    ASSET_DB_PATH: str = os.getenv("ASSET_DB_PATH", "")  # 已生成文件目录，默认为 DATA_DIR/assets.db
+    TASK_RESUME_ON_STARTUP: bool = os.getenv("TASK_RESUME_ON_STARTUP", "true").lower() == "true"
+    TASK_MAX_ATTEMPTS: int = int(os.getenv("TASK_MAX_ATTEMPTS", 3)) # 启动恢复时跳过已开始过这么多次的任务，0 为不限
+
+    # Project Registry (parsed uploads memoized by content hash)
+    PROJECT_CACHE_SIZE: int = int(os.getenv("PROJECT_CACHE_SIZE", 16)) # 内存中保留的已解析项目数
+    PROJECT_REGISTRY_DIR: str = os.getenv("PROJECT_REGISTRY_DIR", "")  # 默认为 DATA_DIR/projects
+
+    # Derivatives (WebP thumbnails / video posters)
+    DERIVATIVES_ENABLED: bool = os.getenv("DERIVATIVES_ENABLED", "true").lower() == "true"
+    DERIVATIVE_WORKERS: int = int(os.getenv("DERIVATIVE_WORKERS", 2)) # 缩略图进程池大小
+    THUMBNAIL_MAX_SIZE: int = int(os.getenv("THUMBNAIL_MAX_SIZE", 480)) # 长边像素
+    THUMBNAIL_QUALITY: int = int(os.getenv("THUMBNAIL_QUALITY", 80))
+
+    # Gemini Batch Submission (frames collected into one batchGenerateContent call)
+    GEMINI_BATCH_ENABLED: bool = os.getenv("GEMINI_BATCH_ENABLED", "false").lower() == "true"
+    GEMINI_BATCH_SIZE: int = int(os.getenv("GEMINI_BATCH_SIZE", 32)) # 每批最多帧数，满即提交
+    GEMINI_BATCH_MAX_WAIT: float = float(os.getenv("GEMINI_BATCH_MAX_WAIT", 2.0)) # 收集窗口（秒），调大可整项目合批
+    GEMINI_BATCH_POLL_INTERVAL: float = float(os.getenv("GEMINI_BATCH_POLL_INTERVAL", 5.0))
+    GEMINI_BATCH_TIMEOUT: float = float(os.getenv("GEMINI_BATCH_TIMEOUT", 1800.0)) # 超时后逐帧单独请求
+
+    # Metrics (Prometheus text format at /metrics)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,192 @@
+"""
+Mock Gemini + Veo upstream with configurable latency, payload sizes and error rates.
+
+Serves Gemini `:generateContent` and `:batchGenerateContent` (inline batches as
+long-running `batches/...` operations) and the Veo endpoints (`:generate`, long-running
+operations) on one port, so both base URLs can point at it:
+    python -m app.mock.upstream --port 9000 --latency-ms 800 --error-rate-429 0.05
+    GEMINI_BASE_URL=http://127.0.0.1:9000 VEO_BASE_URL=http://127.0.0.1:9000 \\
+        GEMINI_API_KEY=mock VEO_API_KEY=mock uvicorn main:app
+
+Used by benchmarks/load.py; mount in-process with httpx.ASGITransport(app=create_app(...)).
+"""
+import argparse
+import asyncio
+import base64
+import random
+import struct
+import uuid
+import zlib
+from typing import Optional
+
+from app.mock.veo_operations import MOCK_VIDEO, register_routes
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+PNG_HEADER = b'\x89PNG\r\n\x1a\n'
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def tiny_png(width: int = 64, height: int = 36) -> bytes:
+    """A small decodable grey PNG; decoders stop at IEND, so padding after it is ignored"""
+    rows = b"".join(b"\x00" + b"\x80" * width for _ in range(height))
+    return (
+        PNG_HEADER
+        + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+        + _png_chunk(b"IDAT", zlib.compress(rows))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+class MockProfile(BaseModel):
+    """How the mock upstream behaves; faults apply to POST (generation/submit) requests only"""
+    latency_ms: float = 200.0       # median latency per generation request
+    latency_sigma: float = 0.5      # lognormal spread; 0 = fixed latency
+    image_bytes: int = 256 * 1024   # decoded size of each generated image
+    video_bytes: int = 1024 * 1024  # decoded size of each generated video
+    error_rate_429: float = 0.0
+    error_rate_5xx: float = 0.0
+    error_status: int = 500         # status used for the 5xx share
+    retry_after: float = 1.0        # Retry-After sent with 429s
+    polls_until_done: int = 2       # LRO polls answered with done=false (Veo operations and Gemini batches)
+    batch_fail_prompt: Optional[str] = None  # batched prompts containing this marker get a per-request error
+    seed: Optional[int] = None
+
+
+def sample_latency(profile: MockProfile, rng: random.Random) -> float:
+    """Seconds to wait; lognormal with the configured median"""
+    if profile.latency_ms <= 0:
+        return 0.0
+    if profile.latency_sigma <= 0:
+        return profile.latency_ms / 1000
+    return rng.lognormvariate(0.0, profile.latency_sigma) * profile.latency_ms / 1000
+
+
+def _payload(header: bytes, size: int, rng: random.Random) -> bytes:
+    # Random bytes so payloads do not compress away in transit
+    return header + rng.randbytes(max(0, size - len(header)))
+
+
+def create_app(profile: MockProfile = None) -> FastAPI:
+    profile = profile or MockProfile()
+    rng = random.Random(profile.seed)
+    app = FastAPI(title="Mock Gemini/Veo Upstream")
+    app.state.profile = profile
+    app.state.stats = {"requests": 0, "throttled": 0, "errors": 0}
+    app.state.batches = {}
+
+    image = base64.b64encode(_payload(tiny_png(), profile.image_bytes, rng)).decode()
+    video = _payload(MOCK_VIDEO, profile.video_bytes, rng)
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        # Operation polls and health checks stay fast and reliable
+        if request.method != "POST":
+            return await call_next(request)
+
+        stats = app.state.stats
+        stats["requests"] += 1
+        await asyncio.sleep(sample_latency(profile, rng))
+
+        roll = rng.random()
+        if roll < profile.error_rate_429:
+            stats["throttled"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"code": 429, "message": "Resource exhausted (mock)", "status": "RESOURCE_EXHAUSTED"}},
+                headers={"Retry-After": f"{profile.retry_after:g}"}
+            )
+        if roll < profile.error_rate_429 + profile.error_rate_5xx:
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=profile.error_status,
+                content={"error": {"code": profile.error_status, "message": "Internal error (mock)"}}
+            )
+        return await call_next(request)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", **app.state.stats}
+
+    def image_response():
+        return {
+            "candidates": [{
+                "content": {"parts": [{"inline_data": {"mime_type": "image/png", "data": image}}]},
+                "finishReason": "STOP"
+            }]
+        }
+
+    @app.post("/models/{model}:generateContent")
+    async def generate_content(model: str):
+        return image_response()
+
+    @app.post("/models/{model}:batchGenerateContent")
+    async def batch_generate_content(model: str, request: Request):
+        payload = await request.json()
+        requests = payload["batch"]["input_config"]["requests"]["requests"]
+        batch_id = uuid.uuid4().hex
+        app.state.batches[batch_id] = {"polls": 0, "requests": requests}
+        return {"name": f"batches/{batch_id}", "done": False, "metadata": {"state": "BATCH_STATE_PENDING"}}
+
+    @app.get("/batches/{batch_id}")
+    async def get_batch(batch_id: str):
+        batch = app.state.batches.get(batch_id)
+        if batch is None:
+            raise HTTPException(status_code=404, detail="Batch not found")
+
+        batch["polls"] += 1
+        name = f"batches/{batch_id}"
+        if batch["polls"] < profile.polls_until_done:
+            return {"name": name, "done": False, "metadata": {"state": "BATCH_STATE_RUNNING"}}
+
+        responses = []
+        for item in batch["requests"]:
+            prompt = " ".join(part.get("text", "") for content in item["request"]["contents"] for part in content["parts"])
+            if profile.batch_fail_prompt and profile.batch_fail_prompt in prompt:
+                responses.append({"metadata": item.get("metadata"), "error": {"code": 3, "message": "Prompt rejected by mock"}})
+            else:
+                responses.append({"metadata": item.get("metadata"), "response": image_response()})
+        return {
+            "name": name,
+            "done": True,
+            "metadata": {"state": "BATCH_STATE_SUCCEEDED"},
+            "response": {"inlinedResponses": {"inlinedResponses": responses}},
+        }
+
+    register_routes(app, polls_until_done=profile.polls_until_done, video=video, fail_prompt=None)
+    return app
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser):
+    """CLI flags for every MockProfile field (shared with benchmarks/load.py)"""
+    defaults = MockProfile()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma)
+    parser.add_argument("--image-bytes", type=int, default=defaults.image_bytes)
+    parser.add_argument("--video-bytes", type=int, default=defaults.video_bytes)
+    parser.add_argument("--error-rate-429", type=float, default=defaults.error_rate_429)
+    parser.add_argument("--error-rate-5xx", type=float, default=defaults.error_rate_5xx)
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--polls-until-done", type=int, default=defaults.polls_until_done)
+    parser.add_argument("--batch-fail-prompt", default=None)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def profile_from_args(args: argparse.Namespace) -> MockProfile:
+    return MockProfile(**{name: getattr(args, name) for name in MockProfile.model_fields})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock Gemini/Veo upstream server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(profile_from_args(args)), host=args.host, port=args.port, log_level="warning")
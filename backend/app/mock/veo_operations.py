@@ -0,0 +1,94 @@
+"""
+Mock Veo long-running operations server.
+
+Run standalone and point VEO_BASE_URL at it:
+    python -m app.mock.veo_operations --port 9001
+    VEO_BASE_URL=http://127.0.0.1:9001 VEO_API_KEY=mock uvicorn main:app
+
+or mount in-process with httpx.ASGITransport(app=create_app()) in tests.
+"""
+import argparse
+import base64
+import hashlib
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+
+from fastapi import FastAPI, HTTPException, Request
+
+# Minimal MP4 header, same as VeoClient's mock video
+MOCK_VIDEO = b'\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom\x00\x00\x00\x00'
+
+
+def create_app(polls_until_done: int = 2, video: bytes = MOCK_VIDEO, fail_prompt: str = "FAIL",
+               upload_ttl: float = 48 * 3600) -> FastAPI:
+    """
+    polls_until_done: GET polls an operation answers with done=false before completing
+    fail_prompt: prompts containing this marker finish with an operation error
+    upload_ttl: seconds until an uploaded start frame expires
+    """
+    app = FastAPI(title="Mock Veo Operations")
+    register_routes(app, polls_until_done, video, fail_prompt, upload_ttl)
+    return app
+
+
+def register_routes(app: FastAPI, polls_until_done: int = 2, video: bytes = MOCK_VIDEO, fail_prompt: str = "FAIL",
+                    upload_ttl: float = 48 * 3600):
+    """Add the Veo endpoints to an app (shared with the combined mock in app.mock.upstream)"""
+    app.state.operations: Dict[str, dict] = {}
+    app.state.uploads: Dict[str, dict] = {}
+    encoded = base64.b64encode(video).decode()
+
+    @app.post("/files")
+    async def upload_file(request: Request):
+        # Start frames for image-to-video; referenced by URI afterwards
+        body = await request.body()
+        file_id = uuid.uuid4().hex
+        expires = datetime.now(timezone.utc) + timedelta(seconds=upload_ttl)
+        app.state.uploads[file_id] = {"sha256": hashlib.sha256(body).hexdigest(), "size": len(body),
+                                      "mime_type": request.headers.get("content-type")}
+        return {"file": {
+            "name": f"files/{file_id}",
+            "uri": f"{request.base_url}files/{file_id}",
+            "mimeType": request.headers.get("content-type"),
+            "expirationTime": expires.isoformat().replace("+00:00", "Z"),
+        }}
+
+    @app.post("/models/{model}:predictLongRunning")
+    async def predict_long_running(model: str, request: Request):
+        payload = await request.json()
+        op_id = uuid.uuid4().hex
+        app.state.operations[op_id] = {"polls": 0, "prompt": payload.get("prompt", ""), "model": model,
+                                       "image_url": payload.get("image_url")}
+        return {"name": f"operations/{op_id}", "done": False}
+
+    @app.get("/operations/{op_id}")
+    async def get_operation(op_id: str):
+        operation = app.state.operations.get(op_id)
+        if operation is None:
+            raise HTTPException(status_code=404, detail="Operation not found")
+
+        operation["polls"] += 1
+        name = f"operations/{op_id}"
+        if operation["polls"] < polls_until_done:
+            progress = int(operation["polls"] / polls_until_done * 100)
+            return {"name": name, "done": False, "metadata": {"progressPercent": progress}}
+        if fail_prompt and fail_prompt in operation["prompt"]:
+            return {"name": name, "done": True, "error": {"code": 3, "message": "Prompt rejected by mock"}}
+        return {"name": name, "done": True, "response": {"videos": [{"bytesBase64Encoded": encoded}]}}
+
+    @app.post("/models/{model}:generate")
+    async def generate(model: str):
+        # Synchronous variant used by VeoClient.stream_video
+        return {"predictions": [{"bytesBase64Encoded": encoded}]}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock Veo operations server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--polls-until-done", type=int, default=3)
+    args = parser.parse_args()
+    uvicorn.run(create_app(polls_until_done=args.polls_until_done), host=args.host, port=args.port)
@@ -38,11 +38,27 @@ class Scene(BaseModel):
         "extra": "ignore"
     }
 
+class ShotChange(BaseModel):
+    """与上次上传相比的单个镜头变化"""
+    scene_id: str = Field(..., description="所属场景ID")
+    shot_id: str = Field(..., description="镜头ID")
+    frames: List[str] = Field(default_factory=list, description="提示词发生变化的帧类型")
+
+class ManifestDiff(BaseModel):
+    """重新上传的项目与已存清单的差异"""
+    stale: List[ShotChange] = Field(default_factory=list, description="提示词已变化、需要重新生成的镜头")
+    unchanged: List[ShotChange] = Field(default_factory=list, description="未变化的镜头")
+    new: List[ShotChange] = Field(default_factory=list, description="新增镜头")
+    removed: List[ShotChange] = Field(default_factory=list, description="已删除的镜头")
+
 class ProjectData(BaseModel):
     project: str = Field(..., description="项目名称")
+    project_id: Optional[str] = Field(None, description="稳定的项目ID（由项目名称生成）")
+    content_hash: Optional[str] = Field(None, description="上传文件内容的SHA-256")
     core_style: Optional[Dict[str, Any]] = Field(None, description="核心风格定义")
     character_references: Optional[Dict[str, str]] = Field(None, description="角色引用")
     scenes: List[Scene] = Field(default_factory=list, description="场景列表")
+    changes: Optional[ManifestDiff] = Field(None, description="与上次上传相比的镜头变化（仅上传响应）")
 
 class GeneratedFile(BaseModel):
     file_id: str = Field(..., description="文件唯一ID")
@@ -50,6 +66,7 @@ class GeneratedFile(BaseModel):
     file_type: str = Field(..., description="文件类型(image/video)")
     file_path: str = Field(..., description="文件完整路径")
     file_url: Optional[str] = Field(None, description="文件访问URL")
+    thumbnail_url: Optional[str] = Field(None, description="缩略图/视频封面URL(WebP，缺失时按需生成)")
     file_name: str = Field(..., description="文件名")
     created_at: datetime = Field(default_factory=datetime.now)
     file_size: int = Field(..., description="文件大小(字节)")
@@ -62,3 +79,63 @@ class TaskStatus(BaseModel):
     error: Optional[str] = Field(None, description="错误信息")
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
+
+class GenerationJob(BaseModel):
+    """批量生成中的单个任务（一帧图像或一个镜头视频）"""
+    scene_id: str = Field(..., description="所属场景ID")
+    shot_id: str = Field(..., description="所属镜头ID")
+    frame_type: str = Field(..., description="帧类型(start/middle/end/video)")
+    prompt: str = Field(..., description="已处理的提示词")
+
+    @property
+    def file_type(self) -> str:
+        return "video" if self.frame_type == "video" else "image"
+
+    @property
+    def filename(self) -> str:
+        if self.file_type == "video":
+            return f"{self.scene_id}_{self.shot_id}_video.mp4"
+        return f"{self.scene_id}_{self.shot_id}_{self.frame_type}.png"
+
+class TaskRecord(BaseModel):
+    """任务存储中的单帧/视频任务记录"""
+    task_id: str = Field(..., description="任务ID")
+    batch_id: Optional[str] = Field(None, description="最近一次所属批次ID")
+    project_id: str = Field(..., description="项目ID")
+    project_name: str = Field(..., description="项目名称")
+    scene_id: str = Field(..., description="所属场景ID")
+    shot_id: str = Field(..., description="所属镜头ID")
+    frame_type: str = Field(..., description="帧类型(start/middle/end/video)")
+    prompt_hash: str = Field(..., description="提示词SHA-256")
+    status: str = Field(..., description="任务状态(queued/running/completed/failed)")
+    output_path: Optional[str] = Field(None, description="输出文件路径")
+    attempts: int = Field(0, description="已尝试次数")
+    error: Optional[str] = Field(None, description="最近一次错误信息")
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+class AssetRecord(BaseModel):
+    """资产目录中的已生成文件记录"""
+    file_id: str = Field(..., description="文件唯一ID(与生成接口返回的file_id一致)")
+    project_name: str = Field(..., description="项目名称")
+    scene_id: str = Field(..., description="所属场景ID")
+    shot_id: str = Field(..., description="所属镜头ID")
+    file_type: str = Field(..., description="文件类型(image/video)")
+    file_name: str = Field(..., description="文件名")
+    file_path: str = Field(..., description="文件完整路径")
+    file_url: Optional[str] = Field(None, description="文件访问URL")
+    sha256: Optional[str] = Field(None, description="文件内容SHA-256")
+    file_size: int = Field(..., description="文件大小(字节)")
+    created_at: datetime = Field(default_factory=datetime.now)
+
+class ShotManifest(BaseModel):
+    """单个镜头已处理提示词的哈希"""
+    scene_id: str = Field(..., description="所属场景ID")
+    shot_id: str = Field(..., description="镜头ID")
+    prompt_hashes: Dict[str, str] = Field(default_factory=dict, description="帧类型 -> 提示词SHA-256")
+
+class ProjectManifest(BaseModel):
+    """项目清单：用于重新上传时的增量比较"""
+    project: str = Field(..., description="项目名称")
+    created_at: datetime = Field(default_factory=datetime.now)
+    shots: List[ShotManifest] = Field(default_factory=list, description="镜头清单")
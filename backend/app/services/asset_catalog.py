@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import threading
+from typing import List, Optional
+
+from app.core.config import settings
+from app.models.schemas import AssetRecord, GeneratedFile
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    file_id      TEXT PRIMARY KEY,
+    project_name TEXT NOT NULL,
+    scene_id     TEXT NOT NULL,
+    shot_id      TEXT NOT NULL,
+    file_type    TEXT NOT NULL,
+    file_name    TEXT NOT NULL,
+    file_path    TEXT NOT NULL UNIQUE,
+    file_url     TEXT,
+    sha256       TEXT,
+    file_size    INTEGER NOT NULL,
+    created_at   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_assets_location ON assets (project_name, scene_id, shot_id, file_name);
+CREATE INDEX IF NOT EXISTS idx_assets_project_type ON assets (project_name, file_type);
+CREATE INDEX IF NOT EXISTS idx_assets_sha256 ON assets (sha256);
+"""
+
+COLUMNS = ("file_id, project_name, scene_id, shot_id, file_type, file_name, file_path, "
+           "file_url, sha256, file_size, created_at")
+
+
+class AssetCatalog:
+    """
+    SQLite index of generated output files, so listings never walk the output tree.
+    One row per output path: regenerating a file replaces its row (and file_id),
+    the same way the file itself is replaced on disk.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.ASSET_DB_PATH or os.path.join(settings.DATA_DIR, "assets.db")
+        self._conn: Optional[sqlite3.Connection] = None
+        # Calls arrive from the storage I/O pool; one connection, serialized
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def record(self, project_name: str, scene_id: str, generated: GeneratedFile, sha256: Optional[str]):
+        """Add or replace the catalog row of a saved output file (blocking: run via run_io)"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO assets ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (generated.file_id, project_name, scene_id, generated.shot_id, generated.file_type,
+                     generated.file_name, generated.file_path, generated.file_url, sha256,
+                     generated.file_size, generated.created_at.isoformat())
+                )
+
+    def remove(self, file_paths: List[str]):
+        """Drop the rows of deleted files (blocking)"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("DELETE FROM assets WHERE file_path = ?", [(path,) for path in file_paths])
+
+    def get(self, file_id: str) -> Optional[AssetRecord]:
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT {COLUMNS} FROM assets WHERE file_id = ?", (file_id,)
+            ).fetchone()
+        return AssetRecord(**dict(row)) if row else None
+
+    def list_assets(
+        self,
+        project: str,
+        scene_id: str = None,
+        shot_id: str = None,
+        file_type: str = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[AssetRecord]:
+        """A project's files in scene/shot/file name order (served from idx_assets_location)"""
+        where, params = self._where(project, scene_id, shot_id, file_type)
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT {COLUMNS} FROM assets {where} "
+                "ORDER BY project_name, scene_id, shot_id, file_name LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+        return [AssetRecord(**dict(row)) for row in rows]
+
+    def count_assets(self, project: str, scene_id: str = None, shot_id: str = None, file_type: str = None) -> int:
+        where, params = self._where(project, scene_id, shot_id, file_type)
+        with self._lock:
+            return self._connect().execute(f"SELECT COUNT(*) FROM assets {where}", params).fetchone()[0]
+
+    def _where(self, project: str, scene_id: str, shot_id: str, file_type: str):
+        clauses, params = ["project_name = ?"], [project]
+        for column, value in (("scene_id", scene_id), ("shot_id", shot_id), ("file_type", file_type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return f"WHERE {' AND '.join(clauses)}", params
+
+
+asset_catalog = AssetCatalog()
@@ -0,0 +1,378 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.models.schemas import GeneratedFile, GenerationJob, ProjectData, TaskStatus
+from app.services.file_storage import FileStorageService, run_io
+from app.services.generation_cache import GenerationCache, generation_cache
+from app.services.gemini_client import GeminiClient
+from app.services.gemini_batcher import GeminiBatcher, gemini_batcher
+from app.services.derivatives import DerivativeService, derivatives as derivative_service
+from app.services.manifest import ManifestStore, manifest_store
+from app.services.progress_hub import ProgressHub, progress_hub, task_update
+from app.services.status_retention import FinishedStatuses
+from app.services.single_flight import SingleFlight, coalesce_key, generation_flights
+from app.services.veo_client import VeoClient
+from app.services.task_store import TaskStore, task_store
+from app.services.veo_jobs import VeoJobManager, veo_jobs
+from loguru import logger
+
+FRAME_TYPES = ("start", "middle", "end")
+
+
+def plan_jobs(project_data: ProjectData) -> List[GenerationJob]:
+    """
+    Flatten a processed project into generation jobs.
+    Image frames come first; each shot's video depends on its start frame.
+    """
+    jobs = []
+    for scene in project_data.scenes:
+        for shot in scene.shots:
+            prompts = shot.nano_banana_pro_prompts
+            if prompts:
+                for frame_type in FRAME_TYPES:
+                    prompt = getattr(prompts, frame_type)
+                    if prompt:
+                        jobs.append(GenerationJob(
+                            scene_id=scene.scene_id,
+                            shot_id=shot.shot_id,
+                            frame_type=frame_type,
+                            prompt=prompt
+                        ))
+            if shot.veo_3_1_prompt:
+                jobs.append(GenerationJob(
+                    scene_id=scene.scene_id,
+                    shot_id=shot.shot_id,
+                    frame_type="video",
+                    prompt=shot.veo_3_1_prompt
+                ))
+    return jobs
+
+
+class BatchScheduler:
+    """
+    Runs whole-project generation as a dependency graph.
+    A single semaphore caps in-flight upstream calls across all batches.
+    Every job's progress is persisted in the task store so runs can resume.
+    """
+
+    def __init__(self, max_concurrency: int = None, cache: GenerationCache = None, jobs: VeoJobManager = None,
+                 store: TaskStore = None, hub: ProgressHub = None, derivatives: DerivativeService = None,
+                 batcher: GeminiBatcher = None, flights: SingleFlight = None, status_ttl: float = None,
+                 manifests: ManifestStore = None):
+        self.max_concurrency = max_concurrency or settings.MAX_CONCURRENT_TASKS
+        self.cache = cache or generation_cache
+        self.jobs = jobs or veo_jobs
+        self.store = store or task_store
+        self.hub = hub or progress_hub
+        self.derivatives = derivatives or derivative_service
+        self.batcher = batcher or gemini_batcher
+        self.flights = flights or generation_flights
+        self.manifests = manifests or manifest_store
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.batches: Dict[str, TaskStatus] = {}
+        self._runners: Dict[str, asyncio.Task] = {}
+        # Completed/failed/cancelled batches are dropped after TASK_STATUS_TTL
+        self._finished = FinishedStatuses(status_ttl)
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def get_batch(self, task_id: str) -> Optional[TaskStatus]:
+        return self.batches.get(task_id)
+
+    def submit(
+        self,
+        project_id: str,
+        project_data: ProjectData,
+        gemini: GeminiClient,
+        veo: VeoClient,
+        storage: FileStorageService,
+        cache_bypass: bool = False,
+        only_changed: bool = False,
+    ) -> TaskStatus:
+        """
+        Register a batch and start it in the background; returns immediately.
+        only_changed skips frames whose last run completed with the same prompt.
+        """
+        return self.submit_jobs(project_id, project_data.project, plan_jobs(project_data),
+                                gemini, veo, storage, cache_bypass, only_changed)
+
+    def submit_jobs(
+        self,
+        project_id: str,
+        project_name: str,
+        jobs: List[GenerationJob],
+        gemini: GeminiClient,
+        veo: VeoClient,
+        storage: FileStorageService,
+        cache_bypass: bool = False,
+        only_changed: bool = False,
+    ) -> TaskStatus:
+        """Start a batch from an explicit job list (also used when resuming)"""
+        status = TaskStatus(
+            task_id=str(uuid.uuid4()),
+            status="pending",
+            result={
+                "project_id": project_id,
+                "project_name": project_name,
+                "total": len(jobs),
+                "completed": 0,
+                "failed": 0,
+                "files": [],
+                "errors": [],
+                "cache_hits": 0,
+                "skipped": 0,
+            }
+        )
+        for task_id in self._finished.expired():
+            self.batches.pop(task_id, None)
+        self.batches[status.task_id] = status
+
+        runner = asyncio.create_task(
+            self._run(status, project_id, project_name, jobs, gemini, veo, storage, cache_bypass, only_changed)
+        )
+        self._runners[status.task_id] = runner
+        runner.add_done_callback(lambda _: self._runner_done(status.task_id))
+
+        logger.info(f"Batch {status.task_id} queued: {len(jobs)} jobs for project {project_id}")
+        return status
+
+    def _runner_done(self, task_id: str):
+        self._runners.pop(task_id, None)
+        self._finished.add(task_id)
+
+    async def resume(self, gemini: GeminiClient, veo: VeoClient, storage: FileStorageService) -> List[TaskStatus]:
+        """
+        Re-queue jobs a previous process left queued or running.
+        Completed jobs are never resubmitted.
+        """
+        groups = await run_io(self.store.resumable)
+        statuses = []
+        for (project_id, project_name), jobs in groups.items():
+            logger.info(f"Resuming {len(jobs)} unfinished jobs for project {project_name}")
+            statuses.append(self.submit_jobs(project_id, project_name, jobs, gemini, veo, storage))
+        return statuses
+
+    async def shutdown(self):
+        """Cancel batches still running (called from the app lifespan)"""
+        runners = list(self._runners.values())
+        for runner in runners:
+            runner.cancel()
+        if runners:
+            await asyncio.gather(*runners, return_exceptions=True)
+
+    async def _run(self, status, project_id, project_name, jobs, gemini, veo, storage, cache_bypass, only_changed=False):
+        status.status = "running"
+        status.updated_at = datetime.now()
+        if only_changed:
+            try:
+                jobs, skipped = await run_io(self.store.split_unchanged, project_name, jobs)
+            except Exception as e:
+                # Nothing was enqueued: fail the batch rather than leave it running forever
+                logger.error(f"Batch {status.task_id} could not read previous runs: {e}")
+                status.status = "failed"
+                status.error = f"Could not read previous runs: {e}"
+                status.updated_at = datetime.now()
+                return
+            status.result["total"] = len(jobs)
+            status.result["skipped"] = skipped
+        await self._track(self.store.enqueue, status.task_id, project_id, project_name, jobs)
+        for job in jobs:
+            self._publish(status, project_name, job, "queued")
+
+        image_tasks: Dict[tuple, asyncio.Task] = {}
+        tasks, task_jobs = [], []
+        for job in jobs:
+            if job.file_type == "image":
+                task = asyncio.create_task(self._run_image(status, project_name, job, gemini, storage, cache_bypass))
+                image_tasks[(job.scene_id, job.shot_id, job.frame_type)] = task
+                tasks.append(task)
+                task_jobs.append(job)
+
+        for job in jobs:
+            if job.file_type == "video":
+                start_task = image_tasks.get((job.scene_id, job.shot_id, "start"))
+                tasks.append(asyncio.create_task(
+                    self._run_video(status, project_name, job, veo, storage, start_task, cache_bypass)
+                ))
+                task_jobs.append(job)
+
+        try:
+            results = await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            status.status = "cancelled"
+            status.updated_at = datetime.now()
+            raise
+
+        # Later uploads of the project are diffed against what was actually generated
+        generated = [job for job, file in zip(task_jobs, results) if file is not None]
+        await self._track(self.manifests.record_generated, project_name, generated)
+
+        result = status.result
+        if result["total"] and result["failed"] == result["total"]:
+            status.status = "failed"
+        else:
+            status.status = "completed"
+        if result["failed"]:
+            status.error = f"{result['failed']} of {result['total']} jobs failed"
+        status.updated_at = datetime.now()
+        logger.info(f"Batch {status.task_id} {status.status}: {result['completed']}/{result['total']} succeeded")
+
+    async def _run_image(self, status, project_name, job, gemini, storage, cache_bypass) -> Optional[GeneratedFile]:
+        # Stays "queued" until an upstream slot is acquired (cache hits go straight to completed)
+        try:
+            # Shared with identical in-flight requests (another batch of the same project, /generate-image)
+            file_path, hit = await self.flights.do(
+                coalesce_key(gemini.cache_key(job.prompt) or job.prompt, project_name, job.scene_id,
+                             job.shot_id, job.frame_type, "bypass" if cache_bypass else "use"),
+                lambda: self._produce_image(status, project_name, job, gemini, storage, cache_bypass)
+            )
+            generated = await self._record_success(status, project_name, job, file_path, hit, storage)
+        except Exception as e:
+            await self._record_failure(status, project_name, job, str(e))
+            return None
+        await self._track(self.store.mark_completed, project_name, job, generated.file_path)
+        return generated
+
+    async def _produce_image(self, status, project_name, job, gemini, storage, cache_bypass):
+        # Decoded straight into the cache blob / output file, never held whole in memory
+        blob = await self.cache.get_or_stream(
+            gemini.cache_key(job.prompt),
+            lambda: self._image_stream(gemini, job.prompt, lambda: self._started(status, project_name, job)),
+            bypass=cache_bypass
+        )
+        file_path = await blob.save_to(
+            storage,
+            project_name=project_name,
+            scene_id=job.scene_id,
+            shot_id=job.shot_id,
+            filename=job.filename
+        )
+        return file_path, blob.hit
+
+    async def _run_video(self, status, project_name, job, veo, storage, start_task, cache_bypass) -> Optional[GeneratedFile]:
+        # 镜头视频等待起始帧完成，并以起始帧为条件生成
+        if start_task is not None:
+            start_file = await start_task
+            if start_file is None:
+                await self._record_failure(status, project_name, job, "Start frame generation failed")
+                return None
+            start_image_path = start_file.file_path
+        else:
+            # Start frame not part of this run (resumed or unchanged): use the one already saved
+            start_image_path = await run_io(storage.find_output_file, project_name, job.scene_id, job.shot_id,
+                                            f"{job.scene_id}_{job.shot_id}_start.png")
+        try:
+            # Only the submission takes a slot; the operation is polled by the job manager
+            async with self.semaphore:
+                await self._track(self.store.mark_running, project_name, job)
+                task = await self.jobs.submit(
+                    veo,
+                    storage,
+                    prompt=job.prompt,
+                    project_name=project_name,
+                    scene_id=job.scene_id,
+                    shot_id=job.shot_id,
+                    filename=job.filename,
+                    cache_bypass=cache_bypass,
+                    start_image_path=start_image_path
+                )
+            task = await self.jobs.wait(task.task_id)
+            if task.status != "completed":
+                raise RuntimeError(task.error or "Video generation failed")
+            generated = GeneratedFile(**task.result)
+            self._record_generated(status, generated, hit=task.result.get("cache_hit", False))
+        except Exception as e:
+            await self._record_failure(status, project_name, job, str(e))
+            return None
+        await self._track(self.store.mark_completed, project_name, job, generated.file_path)
+        return generated
+
+    def _image_stream(self, gemini: GeminiClient, prompt: str, started):
+        if self.batcher.applies_to(gemini):
+            # Many frames share one batch call, so waiting frames hold no semaphore slot;
+            # frames falling back to single requests take one
+            return self._batched_stream(self.batcher.stream_image(gemini, prompt, self.semaphore), started)
+        return self._limited_stream(gemini.stream_image(prompt), started)
+
+    async def _batched_stream(self, chunks, started):
+        # Running once handed to the batch window
+        await started()
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def _limited_stream(self, chunks, started):
+        # Only real upstream calls take a semaphore slot (held until the download ends); cache hits never wait
+        try:
+            async with self.semaphore:
+                await started()
+                async for chunk in chunks:
+                    yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def _started(self, status, project_name, job):
+        self._publish(status, project_name, job, "running")
+        await self._track(self.store.mark_running, project_name, job)
+
+    async def _record_success(self, status, project_name, job, file_path: str, hit: bool, storage) -> GeneratedFile:
+        generated = await storage.register_file_async(file_path, project_name, job.scene_id, job.shot_id, job.file_type)
+        self.derivatives.schedule(file_path)
+        self._record_generated(status, generated, hit)
+        self._publish(status, project_name, job, "completed", file=generated)
+        return generated
+
+    def _record_generated(self, status, generated: GeneratedFile, hit: bool):
+        status.result["files"].append(generated.model_dump(mode="json"))
+        status.result["completed"] += 1
+        if hit:
+            status.result["cache_hits"] += 1
+        self._update_progress(status)
+
+    async def _record_failure(self, status, project_name, job, error: str):
+        logger.error(f"Batch {status.task_id} job {job.scene_id}/{job.shot_id}/{job.frame_type} failed: {error}")
+        status.result["errors"].append({
+            "scene_id": job.scene_id,
+            "shot_id": job.shot_id,
+            "frame_type": job.frame_type,
+            "error": error,
+        })
+        status.result["failed"] += 1
+        self._update_progress(status)
+        self._publish(status, project_name, job, "failed", error=error)
+        await self._track(self.store.mark_failed, project_name, job, error)
+
+    def _publish(self, status, project_name, job, state: str, file: GeneratedFile = None, error: str = None):
+        # Video running/progress/completed updates come from the Veo job manager
+        self.hub.publish(task_update(
+            project_name, job.scene_id, job.shot_id, job.frame_type, state,
+            file=file, error=error, batch_id=status.task_id
+        ))
+
+    async def _track(self, method, *args):
+        # Task store and manifest writes run off-loop; a store failure never fails the generation itself
+        try:
+            await run_io(method, *args)
+        except Exception as e:
+            logger.warning(f"Progress record update failed: {e}")
+
+    def _update_progress(self, status):
+        result = status.result
+        done = result["completed"] + result["failed"]
+        status.progress = round(done / result["total"] * 100, 2) if result["total"] else 100.0
+        status.updated_at = datetime.now()
+
+
+batch_scheduler = BatchScheduler()
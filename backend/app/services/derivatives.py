@@ -0,0 +1,196 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import shutil
+import subprocess
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Set
+
+from app.core.config import settings
+from app.services.file_storage import run_io
+from app.services.metrics import stage_timer
+from loguru import logger
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".webm", ".mkv")
+# <name>.png -> <name>.thumb.webp, <name>.mp4 -> <name>.thumb.webp (poster)
+THUMBNAIL_SUFFIX = ".thumb.webp"
+FFMPEG_TIMEOUT = 60
+
+
+def thumbnail_path(file_path: str) -> str:
+    return f"{os.path.splitext(file_path)[0]}{THUMBNAIL_SUFFIX}"
+
+
+def is_derivative(file_path: str) -> bool:
+    return file_path.endswith(THUMBNAIL_SUFFIX)
+
+
+def is_video(file_path: str) -> bool:
+    return os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS
+
+
+def poster_fallback(video_path: str) -> Optional[str]:
+    """The shot's start frame (<scene>_<shot>_start.png next to <scene>_<shot>_video.mp4)"""
+    directory, name = os.path.split(video_path)
+    stem = os.path.splitext(name)[0]
+    if not stem.endswith("_video"):
+        return None
+    return os.path.join(directory, f"{stem[:-len('_video')]}_start.png")
+
+
+# --- Worker-process functions (module level so they pickle) ---
+
+def _save_webp(image, target: str, quality: int):
+    tmp_path = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.{uuid.uuid4().hex}.tmp")
+    try:
+        image.save(tmp_path, format="WEBP", quality=quality, method=4)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_thumbnail(image, target: str, max_size: int, quality: int):
+    # JPEG sources decode at reduced scale; other formats ignore the hint
+    image.draft("RGB", (max_size, max_size))
+    image.thumbnail((max_size, max_size))
+    if image.mode not in ("RGB", "RGBA"):
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    _save_webp(image, target, quality)
+
+
+def render_image_thumbnail(source: str, target: str, max_size: int, quality: int) -> str:
+    from PIL import Image
+
+    with Image.open(source) as image:
+        _write_thumbnail(image, target, max_size, quality)
+    return target
+
+
+def render_video_poster(source: str, target: str, max_size: int, quality: int, fallback: Optional[str]) -> str:
+    """First video frame via ffmpeg when installed, otherwise the shot's start frame"""
+    from PIL import Image
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        try:
+            result = subprocess.run(
+                [ffmpeg, "-v", "error", "-i", source, "-frames:v", "1", "-f", "image2pipe", "-vcodec", "png", "-"],
+                capture_output=True, timeout=FFMPEG_TIMEOUT, check=True
+            )
+            with Image.open(io.BytesIO(result.stdout)) as image:
+                _write_thumbnail(image, target, max_size, quality)
+            return target
+        except (OSError, subprocess.SubprocessError, ValueError):
+            pass  # Unreadable clip: fall back to the start frame
+    if fallback and os.path.exists(fallback):
+        return render_image_thumbnail(fallback, target, max_size, quality)
+    raise ValueError("no poster source (ffmpeg unavailable or failed, and no start frame)")
+
+
+class DerivativeService:
+    """
+    WebP thumbnails for frames and poster images for videos, written next to the originals.
+    Decoding/resizing/encoding is CPU-bound and runs in a process pool; renders of the
+    same target are coalesced, and stale or missing derivatives are re-rendered on demand.
+    """
+
+    def __init__(self, workers: int = None, enabled: bool = None, max_size: int = None, quality: int = None):
+        self.workers = workers or settings.DERIVATIVE_WORKERS
+        self.enabled = settings.DERIVATIVES_ENABLED if enabled is None else enabled
+        self.max_size = max_size or settings.THUMBNAIL_MAX_SIZE
+        self.quality = quality or settings.THUMBNAIL_QUALITY
+        self.rendered = 0
+        self.failed = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Started on first use; spawned (not forked) so workers never inherit the event loop's threads
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def schedule(self, file_path: str):
+        """Render in the background after a save; the request that saved the file does not wait"""
+        if not self.enabled:
+            return
+        task = asyncio.create_task(self.ensure(file_path))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def ensure(self, file_path: str) -> Optional[str]:
+        """Path of an up-to-date derivative, rendering it if missing or stale; None if it cannot be made"""
+        if not self.enabled or is_derivative(file_path):
+            return None
+        target = thumbnail_path(file_path)
+        if await run_io(self._is_fresh, file_path, target):
+            return target
+
+        pending = self._pending.get(target)
+        if pending is None:
+            pending = asyncio.ensure_future(self._render(file_path, target))
+            self._pending[target] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(target, None))
+        try:
+            # Shielded: one caller going away does not cancel a render others wait on
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Thumbnail for {file_path} failed: {e}")
+            return None
+
+    async def shutdown(self):
+        """Cancel background renders and stop the workers (called from the app lifespan)"""
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"rendered": self.rendered, "failed": self.failed, "pending": len(self._pending)}
+
+    def _is_fresh(self, file_path: str, target: str) -> bool:
+        try:
+            rendered_at = os.path.getmtime(target)
+        except FileNotFoundError:
+            return False
+        sources = [file_path]
+        if is_video(file_path):
+            fallback = poster_fallback(file_path)
+            if fallback and os.path.exists(fallback):
+                sources.append(fallback)
+        return all(os.path.getmtime(source) <= rendered_at for source in sources)
+
+    async def _render(self, file_path: str, target: str) -> str:
+        loop = asyncio.get_running_loop()
+        if is_video(file_path):
+            render = (render_video_poster, file_path, target, self.max_size, self.quality, poster_fallback(file_path))
+        else:
+            render = (render_image_thumbnail, file_path, target, self.max_size, self.quality)
+        try:
+            with stage_timer("render_thumbnail"):
+                result = await loop.run_in_executor(self.pool, *render)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge frame): start a fresh pool next time
+            self._pool = None
+            self.failed += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        self.rendered += 1
+        return result
+
+
+derivatives = DerivativeService()
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+HASH_CHUNK_SIZE = 1024 * 1024
+MAX_ENTRIES = 20000
+
+
+def _identity(stat_result: os.stat_result) -> Tuple[int, int, int, int]:
+    # Outputs are only ever replaced (new inode), never rewritten in place
+    return stat_result.st_dev, stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns
+
+
+class HashingFile:
+    """Write-through file wrapper that hashes what it writes, so the digest needs no second read"""
+
+    def __init__(self, f):
+        self.f = f
+        self.hasher = hashlib.sha256()
+
+    def write(self, chunk: bytes) -> int:
+        self.hasher.update(chunk)
+        return self.f.write(chunk)
+
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self.f, name)
+
+
+class FileHashIndex:
+    """
+    sha256 of files by path, recorded when they are written and valid while the
+    file's (device, inode, size, mtime) are unchanged. Backs the strong ETags and
+    versioned URLs of /files; files written by other processes are hashed lazily.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[tuple, str]]" = OrderedDict()
+        # Written from storage I/O threads as well as the event loop
+        self._lock = threading.Lock()
+
+    def record(self, path: str, digest: str, stat_result: os.stat_result = None):
+        stat_result = stat_result or os.stat(path)
+        with self._lock:
+            self._entries[path] = (_identity(stat_result), digest)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def lookup(self, path: str, stat_result: os.stat_result = None) -> Optional[str]:
+        """Recorded digest if the file is unchanged since, else None"""
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is None:
+            return None
+        try:
+            stat_result = stat_result or os.stat(path)
+        except FileNotFoundError:
+            return None
+        identity, digest = entry
+        return digest if identity == _identity(stat_result) else None
+
+    def digest(self, path: str, stat_result: os.stat_result = None) -> str:
+        """Recorded digest, hashing the file now if unknown or stale (blocking: run off the loop)"""
+        stat_result = stat_result or os.stat(path)
+        known = self.lookup(path, stat_result)
+        if known:
+            return known
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        self.record(path, digest, stat_result)
+        return digest
+
+    def link(self, source: str, target: str):
+        """Carry a known digest over to a hardlink or copy of source"""
+        digest = self.lookup(source)
+        if digest:
+            self.record(target, digest)
+
+
+file_hashes = FileHashIndex()
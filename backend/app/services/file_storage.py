@@ -1,41 +1,272 @@
+import asyncio
+import hashlib
 import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Optional, Set
 from app.core.config import settings
+from app.models.schemas import GeneratedFile
+from app.services.asset_catalog import AssetCatalog, asset_catalog
+from app.services.file_hashes import HashingFile, file_hashes
+from app.services.metrics import BYTES_WRITTEN, STAGE_SECONDS, stage_timer
 from loguru import logger
 
+# Bounded pool for blocking file I/O so large writes never stall the event loop
+_io_executor = ThreadPoolExecutor(max_workers=settings.STORAGE_IO_WORKERS, thread_name_prefix="storage-io")
+
+# Hex digits of the content hash used in versioned /files URLs
+VERSION_LENGTH = 16
+
+# Directories already created by this process (shared across service instances)
+_created_dirs: Set[str] = set()
+
+
+async def run_io(func: Callable, *args):
+    """Run a blocking file operation on the storage I/O pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, func, *args)
+
+
+def remove_temp(path: str):
+    """Delete a temp file left by a failed write, if it was created (blocking)"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
 class FileStorageService:
     """Service to handle file storage with structured paths"""
-    
-    def __init__(self, base_dir: str = None):
+
+    def __init__(self, base_dir: str = None, catalog: AssetCatalog = None):
         self.base_dir = base_dir or settings.OUTPUT_DIR
-        
+        self.catalog = catalog or asset_catalog
+
     def get_output_path(self, project_name: str, scene_id: str, shot_id: str, filename: str) -> str:
         """
-        Construct and ensure path exists: 
+        Construct and ensure path exists:
         output/project_name/scene_id/shot_id/filename
         """
-        # Sanitize names to be safe directory names
-        safe_project = self._sanitize(project_name)
-        safe_scene = self._sanitize(scene_id)
-        safe_shot = self._sanitize(shot_id)
-        
-        dir_path = os.path.join(self.base_dir, safe_project, safe_scene, safe_shot)
-        os.makedirs(dir_path, exist_ok=True)
-        
-        return os.path.join(dir_path, filename)
-    
+        file_path = self._build_path(project_name, scene_id, shot_id, filename)
+        self._ensure_dir(os.path.dirname(file_path))
+        return file_path
+
+    def find_output_file(self, project_name: str, scene_id: str, shot_id: str, filename: str) -> Optional[str]:
+        """Path of an already saved output file, or None"""
+        file_path = self._build_path(project_name, scene_id, shot_id, filename)
+        return file_path if os.path.isfile(file_path) else None
+
+    async def get_output_path_async(self, project_name: str, scene_id: str, shot_id: str, filename: str) -> str:
+        """Async variant of get_output_path; only uncached directories touch the I/O pool"""
+        file_path = self._build_path(project_name, scene_id, shot_id, filename)
+        dir_path = os.path.dirname(file_path)
+        if dir_path not in _created_dirs:
+            await run_io(self._ensure_dir, dir_path)
+        return file_path
+
     def save_file(self, content: bytes, project_name: str, scene_id: str, shot_id: str, filename: str) -> str:
-        """Save binary content to file"""
+        """Save binary content to file (temp file + fsync + rename)"""
         file_path = self.get_output_path(project_name, scene_id, shot_id, filename)
-        
+
         try:
-            with open(file_path, "wb") as f:
-                f.write(content)
+            self._atomic_write(file_path, content)
             logger.info(f"File saved: {file_path}")
             return file_path
         except Exception as e:
             logger.error(f"Failed to save file {file_path}: {e}")
             raise e
 
+    async def save_file_async(self, content: bytes, project_name: str, scene_id: str, shot_id: str, filename: str) -> str:
+        """Non-blocking save_file: the write runs on the storage I/O pool"""
+        file_path = await self.get_output_path_async(project_name, scene_id, shot_id, filename)
+
+        try:
+            await run_io(self._atomic_write, file_path, content)
+            logger.info(f"File saved: {file_path}")
+            return file_path
+        except Exception as e:
+            logger.error(f"Failed to save file {file_path}: {e}")
+            raise e
+
+    async def save_stream(self, chunks: AsyncIterator[bytes], project_name: str, scene_id: str, shot_id: str, filename: str) -> str:
+        """
+        Write streamed content to a temp file next to the target and rename it
+        into place, so memory stays constant and readers never see partial files
+        """
+        file_path = await self.get_output_path_async(project_name, scene_id, shot_id, filename)
+        tmp_path = self._temp_path(file_path)
+
+        # Only the writes are timed; waiting on the producer (upstream, decoding) is not
+        write_seconds = 0.0
+        try:
+            started = time.perf_counter()
+            f = HashingFile(await run_io(self._open_temp, tmp_path))
+            write_seconds += time.perf_counter() - started
+            try:
+                async for chunk in chunks:
+                    started = time.perf_counter()
+                    await run_io(f.write, chunk)
+                    write_seconds += time.perf_counter() - started
+                    BYTES_WRITTEN.inc(len(chunk), target="output")
+                started = time.perf_counter()
+                await run_io(self._sync, f)
+            finally:
+                await run_io(f.close)
+                await chunks.aclose()
+            await run_io(os.replace, tmp_path, file_path)
+            write_seconds += time.perf_counter() - started
+            STAGE_SECONDS.observe(write_seconds, stage="save_file")
+            await run_io(file_hashes.record, file_path, f.hexdigest())
+            logger.info(f"File saved: {file_path}")
+            return file_path
+        except BaseException as e:
+            await run_io(remove_temp, tmp_path)
+            logger.error(f"Failed to save file {file_path}: {e}")
+            raise e
+
+    def link_file(self, source_path: str, project_name: str, scene_id: str, shot_id: str, filename: str) -> str:
+        """Hardlink an existing blob (e.g. a cache entry) into the output tree, copying if linking fails"""
+        file_path = self.get_output_path(project_name, scene_id, shot_id, filename)
+
+        try:
+            self._atomic_link(source_path, file_path)
+            logger.info(f"File linked: {file_path}")
+            return file_path
+        except Exception as e:
+            logger.error(f"Failed to link file {file_path}: {e}")
+            raise e
+
+    async def link_file_async(self, source_path: str, project_name: str, scene_id: str, shot_id: str, filename: str) -> str:
+        """Non-blocking link_file"""
+        file_path = await self.get_output_path_async(project_name, scene_id, shot_id, filename)
+
+        try:
+            await run_io(self._atomic_link, source_path, file_path)
+            logger.info(f"File linked: {file_path}")
+            return file_path
+        except Exception as e:
+            logger.error(f"Failed to link file {file_path}: {e}")
+            raise e
+
+    def _build_path(self, project_name: str, scene_id: str, shot_id: str, filename: str) -> str:
+        # Sanitize names to be safe directory names
+        safe_project = self._sanitize(project_name)
+        safe_scene = self._sanitize(scene_id)
+        safe_shot = self._sanitize(shot_id)
+
+        return os.path.join(self.base_dir, safe_project, safe_scene, safe_shot, filename)
+
+    def _ensure_dir(self, dir_path: str):
+        if dir_path in _created_dirs:
+            return
+        os.makedirs(dir_path, exist_ok=True)
+        _created_dirs.add(dir_path)
+
+    def _open_temp(self, tmp_path: str):
+        try:
+            return open(tmp_path, "wb")
+        except FileNotFoundError:
+            # Directory removed since it was cached (e.g. by cleanup); recreate once
+            dir_path = os.path.dirname(tmp_path)
+            _created_dirs.discard(dir_path)
+            self._ensure_dir(dir_path)
+            return open(tmp_path, "wb")
+
+    def _sync(self, f):
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _atomic_write(self, file_path: str, content: bytes):
+        # Replacing (not truncating) also protects cache blobs hardlinked at file_path
+        tmp_path = self._temp_path(file_path)
+        try:
+            with stage_timer("save_file"):
+                with self._open_temp(tmp_path) as f:
+                    f.write(content)
+                    self._sync(f)
+                os.replace(tmp_path, file_path)
+            file_hashes.record(file_path, hashlib.sha256(content).hexdigest())
+            BYTES_WRITTEN.inc(len(content), target="output")
+        except BaseException:
+            remove_temp(tmp_path)
+            raise
+
+    def _atomic_link(self, source_path: str, file_path: str):
+        tmp_path = self._temp_path(file_path)
+        # Cheap off-loop check in case the cached directory was removed
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        try:
+            with stage_timer("link_file"):
+                try:
+                    os.link(source_path, tmp_path)
+                except OSError:
+                    # Cross-device or unsupported filesystem
+                    shutil.copyfile(source_path, tmp_path)
+                os.replace(tmp_path, file_path)
+            file_hashes.link(source_path, file_path)
+        except BaseException:
+            remove_temp(tmp_path)
+            raise
+
+    def _temp_path(self, file_path: str) -> str:
+        directory, filename = os.path.split(file_path)
+        return os.path.join(directory, f".{filename}.{uuid.uuid4().hex}.tmp")
+
+    def describe_file(self, file_path: str, shot_id: str, file_type: str) -> GeneratedFile:
+        """Build the GeneratedFile record returned to clients for a saved file"""
+        return GeneratedFile(
+            file_id=str(uuid.uuid4()),
+            shot_id=shot_id,
+            file_type=file_type,
+            file_path=file_path,
+            file_url=self.get_file_url(file_path),
+            thumbnail_url=self.get_thumbnail_url(file_path) if settings.DERIVATIVES_ENABLED else None,
+            file_name=os.path.basename(file_path),
+            file_size=os.path.getsize(file_path)
+        )
+
+    def register_file(self, file_path: str, project_name: str, scene_id: str, shot_id: str, file_type: str) -> GeneratedFile:
+        """describe_file plus a row in the asset catalog, so the file_id can be looked up later (blocking)"""
+        # Usually recorded while writing; hashed here for files linked from another process's cache
+        digest = file_hashes.digest(file_path)
+        generated = self.describe_file(file_path, shot_id, file_type)
+        self.catalog.record(project_name, scene_id, generated, digest)
+        return generated
+
+    async def register_file_async(self, file_path: str, project_name: str, scene_id: str, shot_id: str, file_type: str) -> GeneratedFile:
+        """Non-blocking register_file"""
+        return await run_io(self.register_file, file_path, project_name, scene_id, shot_id, file_type)
+
+    def get_file_url(self, file_path: str) -> str:
+        """
+        Map a saved file path to its URL under the /files static mount.
+        Versioned with the content hash when known, so clients may cache it as immutable.
+        """
+        rel_path = os.path.relpath(file_path, self.base_dir)
+        url = f"/files/{rel_path.replace(os.sep, '/')}"
+        digest = file_hashes.lookup(file_path)
+        return f"{url}?v={digest[:VERSION_LENGTH]}" if digest else url
+
+    def get_thumbnail_url(self, file_path: str) -> str:
+        """Thumbnail/poster endpoint for a saved file (rendered on first request if missing)"""
+        rel_path = os.path.relpath(file_path, self.base_dir)
+        return f"{settings.API_V1_STR}/thumbnails/{rel_path.replace(os.sep, '/')}"
+
+    def resolve_path(self, rel_path: str) -> Optional[str]:
+        """Map a URL-relative path back into the output tree; None if it escapes base_dir"""
+        base = os.path.realpath(self.base_dir)
+        path = os.path.realpath(os.path.join(base, rel_path))
+        if os.path.commonpath([base, path]) != base:
+            return None
+        return path
+
+    def resolve_file(self, rel_path: str) -> Optional[str]:
+        """resolve_path for an existing file; None if it escapes base_dir or is not a file (blocking)"""
+        path = self.resolve_path(rel_path)
+        return path if path is not None and os.path.isfile(path) else None
+
     def _sanitize(self, name: str) -> str:
         """Simple sanitization for directory names"""
         # Replace common unsafe chars
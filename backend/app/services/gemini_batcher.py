@@ -0,0 +1,144 @@
+import asyncio
+from contextlib import nullcontext
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.gemini_client import GeminiClient
+from loguru import logger
+
+
+class _Window:
+    """Frame requests collected for one upstream (base URL, model, key) until the batch is sent"""
+
+    def __init__(self, client: GeminiClient):
+        self.client = client
+        self.items: List[Tuple[str, asyncio.Future, Optional[asyncio.Semaphore]]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class GeminiBatcher:
+    """
+    Collects image frame requests over a short window (or until the batch is full)
+    and submits them as one batchGenerateContent call, splitting the results back
+    per frame. Frames the batch did not produce, or every frame of a batch that
+    failed as a whole, fall back to their own generateContent request, each
+    holding a slot of the caller's semaphore (the scheduler's MAX_CONCURRENT_TASKS).
+    """
+
+    def __init__(self, enabled: bool = None, max_size: int = None, max_wait: float = None):
+        self.enabled = settings.GEMINI_BATCH_ENABLED if enabled is None else enabled
+        self.max_size = max_size or settings.GEMINI_BATCH_SIZE
+        self.max_wait = settings.GEMINI_BATCH_MAX_WAIT if max_wait is None else max_wait
+        self._windows: Dict[tuple, _Window] = {}
+        self._flushes: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched = 0
+        self.fallbacks = 0
+
+    def applies_to(self, client: GeminiClient) -> bool:
+        # Mock mode (no key) has nothing to batch
+        return self.enabled and self.max_size > 1 and bool(client.api_key)
+
+    async def generate_image(self, client: GeminiClient, prompt: str, semaphore: asyncio.Semaphore = None) -> bytes:
+        if not self.applies_to(client):
+            async with semaphore or nullcontext():
+                return await client.generate_image(prompt)
+
+        future = asyncio.get_running_loop().create_future()
+        key = (client.base_url, client.model, client.api_key)
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = _Window(client)
+            window.timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush, key)
+        window.items.append((prompt, future, semaphore))
+        if len(window.items) >= self.max_size:
+            self._flush(key)
+        return await future
+
+    async def stream_image(self, client: GeminiClient, prompt: str, semaphore: asyncio.Semaphore = None) -> AsyncIterator[bytes]:
+        """Same contract as GeminiClient.stream_image (batched results arrive whole)"""
+        yield await self.generate_image(client, prompt, semaphore)
+
+    async def shutdown(self):
+        """Cancel batches in flight; waiting frames are cancelled with them (called from the app lifespan)"""
+        for key in list(self._windows):
+            window = self._windows.pop(key)
+            window.timer.cancel()
+            for _, future, _ in window.items:
+                future.cancel()
+        flushes = list(self._flushes)
+        for task in flushes:
+            task.cancel()
+        if flushes:
+            await asyncio.gather(*flushes, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "batches": self.batches,
+            "batched": self.batched,
+            "fallbacks": self.fallbacks,
+            "waiting": sum(len(w.items) for w in self._windows.values()),
+        }
+
+    def _flush(self, key: tuple):
+        window = self._windows.pop(key, None)
+        if window is None:
+            return
+        window.timer.cancel()
+        task = asyncio.create_task(self._submit(window.client, window.items))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _submit(self, client: GeminiClient, items: List[Tuple[str, asyncio.Future, Optional[asyncio.Semaphore]]]):
+        # Frames whose caller went away are not sent at all
+        items = [item for item in items if not item[1].done()]
+        if not items:
+            return
+        if len(items) == 1:
+            # A lone frame gains nothing from a batch job
+            await self._single(client, *items[0])
+            return
+        try:
+            self.batches += 1
+            results = await client.generate_batch([prompt for prompt, _, _ in items])
+        except asyncio.CancelledError:
+            for _, future, _ in items:
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.warning(f"Gemini batch of {len(items)} frames failed, sending them one by one: {e}")
+            results = [e] * len(items)
+
+        fallbacks = []
+        for (prompt, future, semaphore), result in zip(items, results):
+            if isinstance(result, Exception):
+                fallbacks.append(self._single(client, prompt, future, semaphore))
+            elif not future.done():
+                self.batched += 1
+                future.set_result(result)
+        if fallbacks:
+            self.fallbacks += len(fallbacks)
+            # A failed batch must not turn into max_size simultaneous requests: the semaphore spaces them out
+            await asyncio.gather(*fallbacks)
+
+    async def _single(self, client: GeminiClient, prompt: str, future: asyncio.Future,
+                      semaphore: Optional[asyncio.Semaphore] = None):
+        if future.done():
+            return
+        try:
+            async with semaphore or nullcontext():
+                if future.done():
+                    return  # Caller went away while waiting for a slot
+                result = await client.generate_image(prompt)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+
+gemini_batcher = GeminiBatcher()
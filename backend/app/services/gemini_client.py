@@ -1,42 +1,92 @@
+import asyncio
 import httpx
+import time
+import uuid
+from typing import AsyncIterator, Callable, List, Optional, Union
 from app.core.config import settings
+from app.services.http_pool import borrow_client
+from app.services.generation_cache import make_cache_key
+from app.services.metrics import STAGE_SECONDS, timed_stream, track_upstream
+from app.services.rate_limiter import rate_limiters
+from app.services.resilience import RetryPolicy, attempt_deadline, circuit_breakers
+from app.utils.streaming import Base64StreamDecoder, DecodeBuffer, JSONStringExtractor, describe_json
 from loguru import logger
 import base64
+import json
+
+# inline_data.data / inlineData.data; escaped occurrences inside text parts never match
+IMAGE_DATA_KEYS = ("data",)
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
 
 class GeminiClient:
     """Gemini API Client for Image Generation"""
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         self.api_key = settings.GEMINI_API_KEY
         self.base_url = settings.GEMINI_BASE_URL
         self.model = settings.GEMINI_MODEL
+        # Shared pooled client (injected from the app lifespan); None = per-call client
+        self.http_client = http_client
+        # Per-model quota shared by all clients (adapts to 429/503 responses)
+        self.limiter = rate_limiters.get(self.model, settings.GEMINI_RATE_LIMIT_RPS, settings.GEMINI_RATE_LIMIT_BURST)
+        # Transient failures are retried here; the breaker fails fast while Gemini is down
+        self.breaker = circuit_breakers.get("gemini")
+        self.retry_policy = RetryPolicy()
         
+    def _generation_config(self, **kwargs) -> dict:
+        return {
+            "temperature": kwargs.get('temperature', 0.9),
+            "topK": kwargs.get('top_k', 40),
+            "topP": kwargs.get('top_p', 0.95),
+            "maxOutputTokens": 8192,
+            "responseMimeType": "image/jpeg" # Requesting image output if supported directly
+        }
+
+    def _request_body(self, prompt: str, **kwargs) -> dict:
+        return {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }],
+            "generationConfig": self._generation_config(**kwargs)
+        }
+
+    def cache_key(self, prompt: str, **kwargs) -> Optional[str]:
+        """Content-address key for a generation; None in mock mode so mock data is never cached"""
+        if not self.api_key:
+            return None
+        return make_cache_key(self.model, prompt, self._generation_config(**kwargs))
+
     async def generate_image(self, prompt: str, **kwargs) -> bytes:
         """
-        Generate image from prompt using Gemini API
+        Generate image from prompt using Gemini API.
+        The image is decoded into one buffer sized from Content-Length (no dict, no intermediate copies).
         """
+        buffer = DecodeBuffer()
+        async for chunk in timed_stream("extract_image_data", self._stream_image(prompt, buffer.reserve, **kwargs)):
+            buffer.write(chunk)
+        return buffer.getvalue()
+
+    async def stream_image(self, prompt: str, **kwargs) -> AsyncIterator[bytes]:
+        """
+        Generate an image and yield its bytes as the response is decoded,
+        so the caller can write it straight to its destination file
+        """
+        async for chunk in timed_stream("extract_image_data", self._stream_image(prompt, None, **kwargs)):
+            yield chunk
+
+    async def _stream_image(self, prompt: str, reserve: Optional[Callable[[int], None]], **kwargs) -> AsyncIterator[bytes]:
         if not self.api_key:
             logger.warning("Gemini API Key is missing. Returning mock data.")
             # Mock behavior for development if no key
-            return self._get_mock_image()
+            yield self._get_mock_image()
+            return
             
         url = f"{self.base_url}/{self.model}:generateContent?key={self.api_key}"
         
         # Construct payload based on Gemini API docs
         # Note: Actual payload structure depends on specific model version
         # This is a generic structure for Gemini 1.5 Pro/Flash, might need adjustment for 3-pro-image-preview
-        payload = {
-            "contents": [{
-                "parts": [{"text": prompt}]
-            }],
-            "generationConfig": {
-                "temperature": kwargs.get('temperature', 0.9),
-                "topK": kwargs.get('top_k', 40),
-                "topP": kwargs.get('top_p', 0.95),
-                "maxOutputTokens": 8192,
-                "responseMimeType": "image/jpeg" # Requesting image output if supported directly
-            }
-        }
+        payload = self._request_body(prompt, **kwargs)
         
         # For image generation models specifically (like Imagen on Vertex AI or Gemini generic)
         # We might need to adjust payload. 
@@ -48,33 +98,148 @@ class GeminiClient:
         # Let's try standard structure first.
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, json=payload, timeout=30.0)
-                response.raise_for_status()
-                data = response.json()
-                
-                # Extract image data from response
-                # This part is highly dependent on the specific API response format
-                # For now, we'll try to find base64 image data
-                return self._extract_image_data(data)
+            async with borrow_client(self.http_client, settings.GEMINI_READ_TIMEOUT) as client:
+                # Retries are only possible until the response starts streaming
+                response = await self.retry_policy.call(lambda: self._post(client, url, payload), self.breaker)
+                extractor = JSONStringExtractor(IMAGE_DATA_KEYS)
+                decoder = Base64StreamDecoder()
+                decode_seconds = 0.0
+                try:
+                    content_length = response.headers.get("content-length")
+                    if reserve is not None and content_length and content_length.isdigit():
+                        # Decoded size is at most 3/4 of the base64 text
+                        reserve(int(content_length) * 3 // 4)
+                    # The base64 string is located and decoded without building the response tree
+                    async for raw in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        for piece in extractor.feed(raw):
+                            started = time.perf_counter()
+                            chunk = decoder.decode(piece)
+                            decode_seconds += time.perf_counter() - started
+                            if chunk:
+                                yield chunk
+                        if extractor.done:
+                            break
+                finally:
+                    await response.aclose()
+
+                if extractor.found:
+                    if not extractor.done:
+                        raise ValueError("Truncated base64 image data in response")
+                    decoder.flush()
+                    STAGE_SECONDS.observe(decode_seconds, stage="decode_image")
+                    return
+
+                # No inline image (e.g. a blocked prompt): the body is small, parse it for the details
+                yield self._extract_image_data(json.loads(bytes(extractor.buffer)))
                 
         except Exception as e:
             logger.error(f"Gemini API Error: {str(e)}")
             raise e
 
+    async def _post(self, client: httpx.AsyncClient, url: str, payload: dict) -> httpx.Response:
+        """One attempt: wait for quota, then send under the per-attempt deadline (body left streaming)"""
+        async with self.limiter.limit():
+            with track_upstream("gemini", "generateContent"):
+                request = client.build_request("POST", url, json=payload)
+                response = await attempt_deadline(client.send(request, stream=True), settings.GEMINI_ATTEMPT_TIMEOUT, "Gemini")
+                if response.is_error:
+                    await response.aclose()
+                response.raise_for_status()
+        return response
+
+    async def generate_batch(self, prompts: List[str], **kwargs) -> List[Union[bytes, Exception]]:
+        """
+        Generate several images with one batchGenerateContent call (inline requests).
+        The batch runs as a long-running operation that is polled until done; results
+        come back in request order, each either the image bytes or the per-request error.
+        Failures of the batch as a whole (submit, poll, timeout) are raised.
+        """
+        if not self.api_key:
+            return [self._get_mock_image() for _ in prompts]
+
+        url = f"{self.base_url}/{self.model}:batchGenerateContent"
+        payload = {
+            "batch": {
+                "display_name": f"frames-{uuid.uuid4().hex[:12]}",
+                "input_config": {"requests": {"requests": [
+                    {"request": self._request_body(prompt, **kwargs), "metadata": {"key": str(index)}}
+                    for index, prompt in enumerate(prompts)
+                ]}}
+            }
+        }
+
+        async with borrow_client(self.http_client, settings.GEMINI_READ_TIMEOUT) as client:
+            # Each submission creates a batch job: only retry requests the upstream never accepted
+            response = await self.retry_policy.call(
+                lambda: self._send_json(client, "POST", url, "batchGenerateContent", json=payload),
+                self.breaker,
+                idempotent=False
+            )
+            operation = response.json()
+            deadline = time.monotonic() + settings.GEMINI_BATCH_TIMEOUT
+            while not operation.get("done"):
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Gemini batch {operation.get('name')} not done after {settings.GEMINI_BATCH_TIMEOUT}s")
+                await asyncio.sleep(settings.GEMINI_BATCH_POLL_INTERVAL)
+                response = await self.retry_policy.call(
+                    lambda: self._send_json(client, "GET", f"{self.base_url}/{operation['name']}", "getBatch"),
+                    self.breaker
+                )
+                operation = response.json()
+
+        if operation.get("error"):
+            error = operation["error"]
+            raise ValueError(f"Gemini batch failed: {error.get('message', error) if isinstance(error, dict) else error}")
+        return self._split_batch_results(operation.get("response") or {}, len(prompts))
+
+    def _split_batch_results(self, output: dict, count: int) -> List[Union[bytes, Exception]]:
+        """Map the inlined responses back to request order by their metadata key"""
+        inlined = output.get("inlinedResponses") or output.get("inlined_responses") or []
+        if isinstance(inlined, dict):
+            inlined = inlined.get("inlinedResponses") or inlined.get("inlined_responses") or []
+
+        results: List[Union[bytes, Exception]] = [ValueError("Missing from batch response") for _ in range(count)]
+        for position, item in enumerate(inlined):
+            key = (item.get("metadata") or {}).get("key")
+            index = int(key) if key is not None and str(key).isdigit() else position
+            if not 0 <= index < count:
+                continue
+            if item.get("error"):
+                error = item["error"]
+                results[index] = ValueError(error.get("message", error) if isinstance(error, dict) else error)
+                continue
+            try:
+                results[index] = self._decode_image_data(item.get("response") or {})
+            except ValueError as e:
+                results[index] = e
+        return results
+
+    async def _send_json(self, client: httpx.AsyncClient, method: str, url: str, operation: str, **kwargs) -> httpx.Response:
+        """One small JSON request (batch submit/poll) under the quota and the per-attempt deadline"""
+        async with self.limiter.limit():
+            with track_upstream("gemini", operation):
+                request = client.build_request(method, url, **kwargs)
+                response = await attempt_deadline(client.send(request), settings.GEMINI_ATTEMPT_TIMEOUT, "Gemini")
+                response.raise_for_status()
+        return response
+
     def _extract_image_data(self, data: dict) -> bytes:
         """Extract binary image data from API response"""
+        return self._decode_image_data(data)
+
+    def _decode_image_data(self, data: dict) -> bytes:
         try:
             # Attempt to find base64 data in candidates
             # This path is hypothetical and needs to be adjusted based on actual API response
             if 'candidates' in data and data['candidates']:
                 parts = data['candidates'][0]['content']['parts']
                 for part in parts:
-                    if 'inline_data' in part:
-                        return base64.b64decode(part['inline_data']['data'])
+                    inline = part.get('inline_data') or part.get('inlineData')
+                    if inline:
+                        return base64.b64decode(inline['data'])
             
-            # Fallback or error if structure doesn't match
-            logger.error(f"Unexpected API response structure: {data}")
+            # Fallback or error if structure doesn't match (summary only: responses can be megabytes)
+            logger.error(f"Unexpected API response structure: {describe_json(data)}")
             raise ValueError("Could not extract image from response")
             
         except Exception as e:
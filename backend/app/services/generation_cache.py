@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.services.file_hashes import HashingFile, file_hashes
+from app.services.file_storage import remove_temp, run_io
+from app.services.metrics import BYTES_WRITTEN, STAGE_SECONDS
+from loguru import logger
+
+# Empty file next to each blob whose mtime records the last cache hit. Blobs are
+# hardlinked into the output tree, so touching the blob itself would change the
+# outputs' mtime too (content-hash identity, thumbnail freshness, sweeper LRU).
+ACCESS_SUFFIX = ".used"
+
+
+def make_cache_key(model: str, prompt: str, params: Dict[str, Any] = None, image_hash: str = None) -> str:
+    """Content address of a generation: hash of (model, processed prompt, params, start image hash)"""
+    material = json.dumps(
+        {"model": model, "prompt": prompt, "params": params or {}, "image": image_hash},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CachedBlob:
+    """Result of a cached generation: a blob on disk, or raw bytes/a byte stream when uncacheable"""
+
+    def __init__(
+        self,
+        key: Optional[str],
+        path: Optional[str] = None,
+        content: Optional[bytes] = None,
+        stream: Optional[AsyncIterator[bytes]] = None,
+        hit: bool = False,
+    ):
+        self.key = key
+        self.path = path
+        self.content = content
+        self.stream = stream
+        self.hit = hit
+
+    async def save_to(self, storage, project_name: str, scene_id: str, shot_id: str, filename: str) -> str:
+        """Place the result in the output tree, linking the cached blob when there is one"""
+        if self.path:
+            return await storage.link_file_async(self.path, project_name, scene_id, shot_id, filename)
+        if self.stream is not None:
+            return await storage.save_stream(self.stream, project_name, scene_id, shot_id, filename)
+        return await storage.save_file_async(self.content, project_name, scene_id, shot_id, filename)
+
+
+class GenerationCache:
+    """
+    Disk-backed, size-bounded LRU cache of generated images and videos.
+    Blobs live under DATA_DIR/cache/<key[:2]>/<key>, outside the public /files tree.
+    The LRU timestamp is the blob's mtime or, once it has been hit, the mtime of
+    its access sidecar, so ordering survives restarts.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None, enabled: bool = None):
+        self.cache_dir = cache_dir or settings.CACHE_DIR or os.path.join(settings.DATA_DIR, "cache")
+        self.max_bytes = max_bytes if max_bytes is not None else settings.CACHE_MAX_BYTES
+        self.enabled = settings.CACHE_ENABLED if enabled is None else enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._index: Optional[OrderedDict] = None  # key -> size, least recent first
+        self._total_bytes = 0
+        # Lookups and writes run on the storage I/O pool
+        self._lock = threading.RLock()
+
+    def _blob_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _ensure_index(self) -> OrderedDict:
+        """Load the LRU index from disk on first use (blocking)"""
+        with self._lock:
+            if self._index is not None:
+                return self._index
+
+            blobs, used = {}, {}
+            if os.path.isdir(self.cache_dir):
+                for prefix in os.listdir(self.cache_dir):
+                    prefix_dir = os.path.join(self.cache_dir, prefix)
+                    if not os.path.isdir(prefix_dir):
+                        continue
+                    for name in os.listdir(prefix_dir):
+                        if name.endswith(".tmp"):
+                            continue
+                        st = os.stat(os.path.join(prefix_dir, name))
+                        if name.endswith(ACCESS_SUFFIX):
+                            used[name[:-len(ACCESS_SUFFIX)]] = st.st_mtime
+                        else:
+                            blobs[name] = st
+            entries = sorted((max(st.st_mtime, used.get(key, 0)), key, st.st_size) for key, st in blobs.items())
+
+            self._index = OrderedDict()
+            self._total_bytes = 0
+            for _, key, size in entries:
+                self._index[key] = size
+                self._total_bytes += size
+            return self._index
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the blob path for a key and mark it most recently used (blocking: see get_async)"""
+        path = self._blob_path(key)
+        with self._lock:
+            index = self._ensure_index()
+            if key not in index:
+                try:
+                    # Written by another worker process sharing this cache directory
+                    size = os.stat(path).st_size
+                except FileNotFoundError:
+                    self.misses += 1
+                    return None
+                self._register(key, size)
+
+            if not os.path.exists(path):
+                # Removed behind our back
+                self._total_bytes -= index.pop(key)
+                self.misses += 1
+                return None
+
+            index.move_to_end(key)
+            self.hits += 1
+        self._touch(path)
+        return path
+
+    async def get_async(self, key: str) -> Optional[str]:
+        """Non-blocking get: the stat and access-time update run on the storage I/O pool"""
+        return await run_io(self.get, key)
+
+    def put(self, key: str, content: bytes) -> str:
+        """Store a blob atomically and evict least recently used entries over budget (blocking)"""
+        self._ensure_index()
+        path = self._blob_path(key)
+        self._write_blob(path, content)
+        self._register(key, len(content))
+        return path
+
+    async def put_async(self, key: str, content: bytes) -> str:
+        """Non-blocking put: the blob write and any evictions run on the storage I/O pool"""
+        return await run_io(self.put, key, content)
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes]) -> str:
+        """Stream a blob into the cache without holding it in memory"""
+        await run_io(self._ensure_index)
+        path = self._blob_path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        size = 0
+        # Only the writes are timed, as in FileStorageService.save_stream
+        write_seconds = 0.0
+        try:
+            started = time.perf_counter()
+            f = HashingFile(await run_io(self._open_blob, tmp_path))
+            write_seconds += time.perf_counter() - started
+            try:
+                async for chunk in chunks:
+                    started = time.perf_counter()
+                    await run_io(f.write, chunk)
+                    write_seconds += time.perf_counter() - started
+                    size += len(chunk)
+                    BYTES_WRITTEN.inc(len(chunk), target="cache")
+            finally:
+                await run_io(f.close)
+                await chunks.aclose()
+            started = time.perf_counter()
+            await run_io(os.replace, tmp_path, path)
+            STAGE_SECONDS.observe(write_seconds + time.perf_counter() - started, stage="save_cache_blob")
+            await run_io(file_hashes.record, path, f.hexdigest())
+        except BaseException:
+            await run_io(remove_temp, tmp_path)
+            raise
+
+        await run_io(self._register, key, size)
+        return path
+
+    def _touch(self, path: str):
+        access_path = path + ACCESS_SUFFIX
+        try:
+            os.utime(access_path)
+        except FileNotFoundError:
+            try:
+                open(access_path, "ab").close()
+            except FileNotFoundError:
+                pass  # Blob evicted meanwhile
+
+    def _open_blob(self, tmp_path: str):
+        os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
+        return open(tmp_path, "wb")
+
+    def _write_blob(self, path: str, content: bytes):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with self._open_blob(tmp_path) as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        file_hashes.record(path, hashlib.sha256(content).hexdigest())
+        BYTES_WRITTEN.inc(len(content), target="cache")
+
+    def _register(self, key: str, size: int):
+        with self._lock:
+            index = self._index
+            if key in index:
+                self._total_bytes -= index.pop(key)
+            index[key] = size
+            self._total_bytes += size
+            self._evict(keep=key)
+
+    def _evict(self, keep: str = None):
+        index = self._index
+        while self._total_bytes > self.max_bytes and index:
+            key = next(iter(index))
+            if key == keep:
+                # A single blob larger than the budget is kept until the next put
+                break
+            size = index.pop(key)
+            self._total_bytes -= size
+            self.evictions += 1
+            for path in (self._blob_path(key), self._blob_path(key) + ACCESS_SUFFIX):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            logger.debug(f"Cache evicted {key} ({size} bytes)")
+
+    async def get_or_generate(
+        self,
+        key: Optional[str],
+        generate: Callable[[], Awaitable[bytes]],
+        bypass: bool = False,
+    ) -> CachedBlob:
+        """
+        Serve from cache or call the upstream and store the result.
+        `bypass` skips the lookup but still refreshes the cached blob.
+        A `None` key (e.g. mock mode without an API key) disables caching.
+        """
+        if not self.enabled or key is None:
+            return CachedBlob(key, content=await generate())
+
+        if not bypass:
+            path = await self.get_async(key)
+            if path:
+                logger.info(f"Cache hit: {key[:12]}")
+                return CachedBlob(key, path=path, hit=True)
+
+        content = await generate()
+        return CachedBlob(key, path=await self.put_async(key, content))
+
+    async def get_or_stream(
+        self,
+        key: Optional[str],
+        stream: Callable[[], AsyncIterator[bytes]],
+        bypass: bool = False,
+    ) -> CachedBlob:
+        """Streaming variant of get_or_generate for large outputs such as videos"""
+        if not self.enabled or key is None:
+            return CachedBlob(key, stream=stream())
+
+        if not bypass:
+            path = await self.get_async(key)
+            if path:
+                logger.info(f"Cache hit: {key[:12]}")
+                return CachedBlob(key, path=path, hit=True)
+
+        return CachedBlob(key, path=await self.put_stream(key, stream()))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Running counters only, safe to call on the event loop. Entries and size are
+        None until the index has been loaded (first cache use, or stats_async).
+        """
+        index = self._index
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(index) if index is not None else None,
+            "size_bytes": self._total_bytes if index is not None else None,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    async def stats_async(self) -> Dict[str, Any]:
+        """Full stats: loads the index on the storage I/O pool first if needed"""
+        await run_io(self._ensure_index)
+        return self.stats()
+
+
+generation_cache = GenerationCache()
@@ -0,0 +1,80 @@
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+from app.core.config import settings
+from loguru import logger
+
+# HTTP/2 requires the optional `h2` package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def build_limits() -> httpx.Limits:
+    """Connection pool limits tied to the configured task concurrency"""
+    return httpx.Limits(
+        max_connections=settings.MAX_CONCURRENT_TASKS * 2,
+        max_keepalive_connections=settings.MAX_CONCURRENT_TASKS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def build_timeout(read_timeout: float) -> httpx.Timeout:
+    """Separate connect/read timeouts; write and pool waits share the connect budget"""
+    return httpx.Timeout(
+        connect=settings.HTTP_CONNECT_TIMEOUT,
+        read=read_timeout,
+        write=settings.HTTP_CONNECT_TIMEOUT,
+        pool=settings.HTTP_CONNECT_TIMEOUT,
+    )
+
+
+def create_http_client(read_timeout: float) -> httpx.AsyncClient:
+    """Create a pooled keep-alive client for one upstream"""
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        limits=build_limits(),
+        timeout=build_timeout(read_timeout),
+    )
+
+
+@asynccontextmanager
+async def borrow_client(client: Optional[httpx.AsyncClient], read_timeout: float) -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Yield the shared client if one was injected, otherwise a short-lived one.
+    The fallback keeps the API clients usable outside the FastAPI app (scripts, tests).
+    """
+    if client is not None:
+        yield client
+        return
+    async with create_http_client(read_timeout) as temp_client:
+        yield temp_client
+
+
+class HTTPClientPool:
+    """One pooled httpx client per upstream, opened and closed by the app lifespan"""
+
+    def __init__(self):
+        self.gemini: Optional[httpx.AsyncClient] = None
+        self.veo: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        if self.gemini is None:
+            self.gemini = create_http_client(settings.GEMINI_READ_TIMEOUT)
+        if self.veo is None:
+            self.veo = create_http_client(settings.VEO_READ_TIMEOUT)
+        logger.info(
+            f"HTTP pools started (http2={HTTP2_AVAILABLE}, "
+            f"max_connections={settings.MAX_CONCURRENT_TASKS * 2})"
+        )
+
+    async def close(self):
+        for name in ("gemini", "veo"):
+            client = getattr(self, name)
+            if client is not None:
+                await client.aclose()
+                setattr(self, name, None)
+        logger.info("HTTP pools closed")
+
+
+http_pool = HTTPClientPool()
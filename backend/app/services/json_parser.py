@@ -1,105 +1,158 @@
-import json
 from typing import Dict, Any, List
-from app.models.schemas import ProjectData, Scene, Shot, NanoBananaPrompts
+from app.models.schemas import ProjectData, ProjectManifest, Scene
+from app.services.manifest import project_slug, prompt_hash
 from app.services.prompt_processor import PromptProcessorService
+from app.services.json_stream import StreamingProjectParser, UploadFormatError
+from app.services.metrics import stage_timer
 
 class JSONParserService:
     """JSON文件解析服务"""
     
+    # 读取文件时的分块大小
+    CHUNK_SIZE = 64 * 1024
+
     def parse_project_json(self, file_path: str) -> ProjectData:
         """解析项目JSON文件"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # 手动构建 ProjectData 以处理结构差异
-        
+        with stage_timer("parse_project_json"):
+            parser = self.create_stream_parser()
+            with open(file_path, 'rb') as f:
+                while chunk := f.read(self.CHUNK_SIZE):
+                    parser.feed(chunk)
+            return self.build_project(parser.close())
+
+    def create_stream_parser(self) -> StreamingProjectParser:
+        """增量解析器：场景在读取过程中逐个规整为字典，模型在 build_project 中一次性校验"""
+        return StreamingProjectParser(build_scene=self.normalize_scene)
+
+    def build_project(self, data: Dict[str, Any], process_prompts: bool = False) -> ProjectData:
+        """
+        由顶层字段和已规整的场景列表组装 ProjectData
+        整个文档只做一次 Pydantic 校验（而不是逐个构造 Shot/Scene）；
+        process_prompts=True 时在校验前直接在字典上处理提示词，等价于再调用 process_all_prompts
+        """
         # 1. 提取基础信息
         project_name = data.get('project', 'Untitled Project')
+        project_id = project_slug(project_name)
         core_style = data.get('core_style', {})
         character_references = data.get('character_references', {})
+        for field, value in (('core_style', core_style), ('character_references', character_references)):
+            if not isinstance(value, dict):
+                raise UploadFormatError(f"Invalid project JSON: '{field}' must be an object")
+
+        # 场景在项目名称读取前就已规整，此处补上项目ID
+        scenes = data.get('scenes', [])
+        for scene in scenes:
+            scene['project_id'] = project_id
+
+        if process_prompts:
+            with stage_timer("process_all_prompts"):
+                self.process_scene_prompts(scenes, self.create_processor(core_style, character_references))
+
+        return ProjectData.model_validate({
+            'project': project_name,
+            'project_id': project_id,
+            'core_style': core_style,
+            'character_references': character_references,
+            'scenes': scenes,
+        })
+
+    def build_scene(self, raw_scene: Dict[str, Any]) -> Scene:
+        """手动构建 Scene 以处理结构差异"""
+        return Scene.model_validate(self.normalize_scene(raw_scene))
+
+    def normalize_scene(self, raw_scene: Dict[str, Any]) -> Dict[str, Any]:
+        """把原始场景规整为 Scene 结构的字典（尚未校验）"""
+        scene_id = raw_scene.get('scene_id')
         
-        # 2. 构建场景列表
-        scenes_list = []
-        raw_scenes = data.get('scenes', [])
+        # 构建镜头列表
+        shots_list = []
+        raw_shots = raw_scene.get('shots', [])
+        if not isinstance(raw_shots, list) or not all(isinstance(s, dict) for s in raw_shots):
+            raise UploadFormatError("Invalid project JSON: 'shots' must be a list of objects")
         
-        for scene_idx, raw_scene in enumerate(raw_scenes):
-            scene_id = raw_scene.get('scene_id')
+        for shot_idx, raw_shot in enumerate(raw_shots):
+            # 处理 nano_banana_pro_prompts 列表转对象
+            prompts_list = raw_shot.get('nano_banana_pro_prompts', [])
+            prompts_dict = {}
+            if isinstance(prompts_list, list):
+                for p in prompts_list:
+                    if not isinstance(p, dict):
+                        raise UploadFormatError("Invalid project JSON: each nano_banana_pro_prompts item must be an object")
+                    frame = p.get('frame')
+                    text = p.get('prompt')
+                    if frame and text:
+                        prompts_dict[frame] = text
+            elif isinstance(prompts_list, dict):
+                prompts_dict = prompts_list
             
-            # 构建镜头列表
-            shots_list = []
-            raw_shots = raw_scene.get('shots', [])
-            
-            for shot_idx, raw_shot in enumerate(raw_shots):
-                # 处理 nano_banana_pro_prompts 列表转对象
-                prompts_list = raw_shot.get('nano_banana_pro_prompts', [])
-                prompts_dict = {}
-                if isinstance(prompts_list, list):
-                    for p in prompts_list:
-                        frame = p.get('frame')
-                        text = p.get('prompt')
-                        if frame and text:
-                            prompts_dict[frame] = text
-                elif isinstance(prompts_list, dict):
-                    prompts_dict = prompts_list
-                
+            shots_list.append({
+                'shot_id': raw_shot.get('shot_id'),
+                'scene_id': scene_id, # 注入 scene_id
+                'name': raw_shot.get('description', ''), # description 映射到 name
+                'description': raw_shot.get('description'),
+                'order_index': shot_idx + 1,
                 # 确保有 start/middle/end
-                nano_prompts = NanoBananaPrompts(
-                    start=prompts_dict.get('start', ''),
-                    middle=prompts_dict.get('middle', ''),
-                    end=prompts_dict.get('end', '')
-                )
-                
-                shot = Shot(
-                    shot_id=raw_shot.get('shot_id'),
-                    scene_id=scene_id, # 注入 scene_id
-                    name=raw_shot.get('description', ''), # description 映射到 name
-                    description=raw_shot.get('description'),
-                    order_index=shot_idx + 1,
-                    nano_banana_pro_prompts=nano_prompts,
-                    veo_3_1_prompt=raw_shot.get('veo_3_1_prompt')
-                )
-                shots_list.append(shot)
-            
-            scene = Scene(
-                scene_id=scene_id,
-                project_id="project_001", # 默认ID，实际可能需要生成
-                scene_title=raw_scene.get('scene_title'),
-                timestamp=raw_scene.get('timestamp'),
-                shots=shots_list
-            )
-            scenes_list.append(scene)
-            
-        project_data = ProjectData(
-            project=project_name,
-            core_style=core_style,
-            character_references=character_references,
-            scenes=scenes_list
-        )
+                'nano_banana_pro_prompts': {
+                    'start': prompts_dict.get('start', ''),
+                    'middle': prompts_dict.get('middle', ''),
+                    'end': prompts_dict.get('end', ''),
+                },
+                'veo_3_1_prompt': raw_shot.get('veo_3_1_prompt'),
+            })
         
-        return project_data
+        return {
+            'scene_id': scene_id,
+            'scene_title': raw_scene.get('scene_title'),
+            'timestamp': raw_scene.get('timestamp'),
+            'shots': shots_list,
+        }
+
+    def create_processor(self, core_style: Dict[str, Any], character_references: Dict[str, str]) -> PromptProcessorService:
+        return PromptProcessorService(core_style=core_style, character_references=character_references)
     
     def process_all_prompts(self, project_data: ProjectData) -> ProjectData:
         """
         处理项目中的所有Prompt
         返回一个新的ProjectData对象，其中的prompts已经被处理
+        （导出为字典处理后一次性重新校验，避免逐字段赋值的开销）
         """
-        # 初始化处理器
-        processor = PromptProcessorService(
-            core_style=project_data.core_style,
-            character_references=project_data.character_references
-        )
-        
-        # 遍历所有场景和镜头
+        with stage_timer("process_all_prompts"):
+            data = project_data.model_dump()
+            processor = self.create_processor(project_data.core_style, project_data.character_references)
+            self.process_scene_prompts(data['scenes'], processor)
+            return ProjectData.model_validate(data)
+
+    def process_scene_prompts(self, scenes: List[Dict[str, Any]], processor: PromptProcessorService):
+        """在 Scene 结构的字典上原地处理 nano_banana_pro_prompts 和 veo_3_1_prompt"""
+        process = processor.process_prompt
+        for scene in scenes:
+            for shot in scene['shots']:
+                prompts = shot.get('nano_banana_pro_prompts')
+                if prompts:
+                    prompts['start'] = process(prompts['start'])
+                    prompts['middle'] = process(prompts['middle'])
+                    prompts['end'] = process(prompts['end'])
+
+                if shot.get('veo_3_1_prompt'):
+                    shot['veo_3_1_prompt'] = process(shot['veo_3_1_prompt'])
+
+    def build_manifest(self, project_data: ProjectData) -> ProjectManifest:
+        """
+        生成每个镜头已处理提示词的哈希清单（在 process_all_prompts 之后调用）。
+        哈希基于展开后的提示词，因此样式块或角色引用的修改只影响实际引用它的镜头。
+        """
+        shots = []
         for scene in project_data.scenes:
             for shot in scene.shots:
-                # 处理 nano_banana_pro_prompts
-                if shot.nano_banana_pro_prompts:
-                    shot.nano_banana_pro_prompts.start = processor.process_prompt(shot.nano_banana_pro_prompts.start)
-                    shot.nano_banana_pro_prompts.middle = processor.process_prompt(shot.nano_banana_pro_prompts.middle)
-                    shot.nano_banana_pro_prompts.end = processor.process_prompt(shot.nano_banana_pro_prompts.end)
-                
-                # 处理 veo_3_1_prompt
+                hashes = {}
+                prompts = shot.nano_banana_pro_prompts
+                if prompts:
+                    for frame, prompt in (('start', prompts.start), ('middle', prompts.middle), ('end', prompts.end)):
+                        if prompt:
+                            hashes[frame] = prompt_hash(prompt)
                 if shot.veo_3_1_prompt:
-                    shot.veo_3_1_prompt = processor.process_prompt(shot.veo_3_1_prompt)
-                    
-        return project_data
+                    hashes['video'] = prompt_hash(shot.veo_3_1_prompt)
+                shots.append({'scene_id': scene.scene_id, 'shot_id': shot.shot_id, 'prompt_hashes': hashes})
+
+        # 与 build_project 相同：一次性校验整个清单
+        return ProjectManifest.model_validate({'project': project_data.project, 'shots': shots})
@@ -0,0 +1,287 @@
+import codecs
+import hashlib
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+JSON_WHITESPACE = " \t\n\r"
+# Below this much pending text a failed decode is retried on every chunk
+MIN_RETRY_STEP = 64 * 1024
+# A decode error this close to the buffer end may be a token cut mid-way (e.g. "tru", "\\u12")
+TRUNCATION_MARGIN = 6
+
+
+class UploadTooLargeError(Exception):
+    """Raised while reading an upload once it exceeds the configured size limit"""
+
+
+class UploadFormatError(ValueError):
+    """Raised for uploads that are not a single, well-formed project .json file"""
+
+
+class StreamingProjectParser:
+    """
+    Incremental parser for the project JSON document.
+
+    Top-level fields are decoded as they arrive; the `scenes` array is decoded
+    one element at a time and handed to `build_scene`, so only the scene being
+    parsed is ever held as raw text/dicts. The raw bytes are hashed on the way
+    through, giving the upload's content address without a second pass.
+    """
+
+    def __init__(self, build_scene: Callable[[Dict[str, Any]], Any]):
+        self.build_scene = build_scene
+        self.fields: Dict[str, Any] = {}
+        self.scenes: List[Any] = []
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._retry_at = 0
+        self._eof = False
+        self._hasher = hashlib.sha256()
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 of the bytes fed so far"""
+        return self._hasher.hexdigest()
+
+    def feed(self, chunk: bytes):
+        self._hasher.update(chunk)
+        self._buf += self._decode_text(chunk)
+        if len(self._buf) >= self._retry_at:
+            self._parse()
+
+    def close(self) -> Dict[str, Any]:
+        """Finish parsing; returns the top-level fields with `scenes` built"""
+        self._buf += self._decode_text(b"", final=True)
+        self._eof = True
+        self._parse()
+        if self._state != "done":
+            raise UploadFormatError("Invalid JSON: unexpected end of document")
+        return {**self.fields, "scenes": self.scenes}
+
+    def _decode_text(self, chunk: bytes, final: bool = False) -> str:
+        try:
+            return self._text_decoder.decode(chunk, final=final)
+        except UnicodeDecodeError as e:
+            raise UploadFormatError(f"Invalid JSON: not UTF-8 ({e.reason})")
+
+    def _parse(self):
+        while self._step():
+            pass
+        # Drop consumed text so the buffer stays around one pending value
+        if self._pos:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+
+    def _peek(self) -> Optional[str]:
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in JSON_WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return buf[pos] if pos < len(buf) else None
+
+    def _expect(self, allowed: str) -> Optional[str]:
+        char = self._peek()
+        if char is None:
+            return None
+        if char not in allowed:
+            raise UploadFormatError(f"Invalid JSON: expected one of {allowed!r} at '{char}'")
+        self._pos += 1
+        return char
+
+    def _decode_value(self):
+        """Decode one complete JSON value at the cursor; returns (ok, value)"""
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError as e:
+            if self._eof or not self._may_be_truncated(e):
+                raise UploadFormatError(f"Invalid JSON: {e}")
+            # Probably incomplete: wait until the pending text has grown enough
+            pending = len(self._buf) - self._pos
+            self._retry_at = len(self._buf) + max(pending, MIN_RETRY_STEP)
+            return False, None
+        if end >= len(self._buf) and not self._eof:
+            # A scalar at the buffer edge (e.g. a number) may still continue
+            return False, None
+        self._pos = end
+        self._retry_at = 0
+        return True, value
+
+    def _may_be_truncated(self, e: json.JSONDecodeError) -> bool:
+        """Whether a decode error could go away once more of the document arrives"""
+        # An unterminated string reports where it started, which can be anywhere
+        if e.msg.startswith("Unterminated string"):
+            return True
+        return len(self._buf) - e.pos <= TRUNCATION_MARGIN
+
+    def _step(self) -> bool:
+        state = self._state
+
+        if state == "start":
+            if self._expect("{") is None:
+                return False
+            self._state = "first_key"
+            return True
+
+        if state in ("first_key", "key"):
+            char = self._peek()
+            if char is None:
+                return False
+            if char == "}" and state == "first_key":
+                self._pos += 1
+                self._state = "done"
+                return True
+            if char != '"':
+                raise UploadFormatError(f"Invalid JSON: expected object key at '{char}'")
+            ok, key = self._decode_value()
+            if not ok:
+                return False
+            self._key = key
+            self._state = "colon"
+            return True
+
+        if state == "colon":
+            if self._expect(":") is None:
+                return False
+            self._state = "value"
+            return True
+
+        if state == "value":
+            char = self._peek()
+            if char is None:
+                return False
+            if self._key == "scenes":
+                if char != "[":
+                    raise UploadFormatError("Invalid project JSON: 'scenes' must be a list")
+                self._pos += 1
+                self.scenes = []
+                self._state = "first_scene"
+                return True
+            ok, value = self._decode_value()
+            if not ok:
+                return False
+            self.fields[self._key] = value
+            self._state = "after_value"
+            return True
+
+        if state in ("first_scene", "scene"):
+            char = self._peek()
+            if char is None:
+                return False
+            if char == "]" and state == "first_scene":
+                self._pos += 1
+                self._state = "after_value"
+                return True
+            ok, raw_scene = self._decode_value()
+            if not ok:
+                return False
+            if not isinstance(raw_scene, dict):
+                raise UploadFormatError("Invalid project JSON: each scene must be an object")
+            self.scenes.append(self.build_scene(raw_scene))
+            self._state = "after_scene"
+            return True
+
+        if state == "after_scene":
+            char = self._expect(",]")
+            if char is None:
+                return False
+            self._state = "scene" if char == "," else "after_value"
+            return True
+
+        if state == "after_value":
+            char = self._expect(",}")
+            if char is None:
+                return False
+            self._state = "key" if char == "," else "done"
+            return True
+
+        if state == "done":
+            if self._peek() is not None:
+                raise UploadFormatError("Invalid JSON: extra data after document")
+            return False
+
+        raise RuntimeError(f"Unknown parser state: {state}")
+
+
+async def read_upload_stream(
+    stream: AsyncIterator[bytes],
+    content_type: str,
+    parser: StreamingProjectParser,
+    max_size: int,
+) -> Optional[str]:
+    """
+    Feed an upload body into `parser` as it arrives, enforcing `max_size`.
+    Accepts a raw JSON body or a multipart form with one .json file part.
+    Returns the uploaded filename (None for raw JSON bodies).
+    """
+    mime, params = parse_options_header(content_type)
+    received = 0
+
+    if mime != b"multipart/form-data":
+        async for chunk in stream:
+            received += len(chunk)
+            if received > max_size:
+                raise UploadTooLargeError(f"Upload exceeds {max_size} bytes")
+            parser.feed(chunk)
+        return None
+
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise UploadFormatError("Missing boundary in multipart upload")
+
+    part = {"headers": {}, "field": b"", "value": b"", "is_file": False}
+    upload = {"filename": None}
+
+    def on_part_begin():
+        part.update(headers={}, field=b"", value=b"", is_file=False)
+
+    def on_header_field(data, start, end):
+        part["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["field"].lower()] = part["value"]
+        part["field"], part["value"] = b"", b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        if b"filename" not in options:
+            return
+        if upload["filename"] is not None:
+            raise UploadFormatError("Only one file can be uploaded")
+        filename = options[b"filename"].decode("utf-8", errors="replace")
+        if not filename.endswith(".json"):
+            raise UploadFormatError("Only JSON files are allowed")
+        upload["filename"] = filename
+        part["is_file"] = True
+
+    def on_part_data(data, start, end):
+        if part["is_file"]:
+            parser.feed(data[start:end])
+
+    multipart_parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+
+    async for chunk in stream:
+        received += len(chunk)
+        if received > max_size:
+            raise UploadTooLargeError(f"Upload exceeds {max_size} bytes")
+        multipart_parser.write(chunk)
+    multipart_parser.finalize()
+
+    if upload["filename"] is None:
+        raise UploadFormatError("No JSON file found in upload")
+    return upload["filename"]
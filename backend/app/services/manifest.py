@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from app.core.config import settings
+from app.models.schemas import GenerationJob, ManifestDiff, ProjectManifest, ShotChange, ShotManifest
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def project_slug(project_name: str) -> str:
+    """Stable, URL-safe project id: sanitized name for readability plus a hash so distinct names never collide"""
+    safe = "".join(c for c in project_name if c.isalnum() or c in "-_")[:64] or "project"
+    digest = hashlib.sha1(project_name.encode("utf-8")).hexdigest()[:10]
+    return f"{safe}-{digest}"
+
+
+def diff_manifests(previous: Optional[ProjectManifest], current: ProjectManifest) -> ManifestDiff:
+    """
+    Compare per-shot prompt hashes. Hashes are taken over the expanded prompts,
+    so a core_style or character_references edit only marks the shots whose
+    prompts actually use it as stale.
+    """
+    diff = ManifestDiff()
+    old_shots = {(s.scene_id, s.shot_id): s for s in previous.shots} if previous else {}
+
+    for shot in current.shots:
+        old = old_shots.pop((shot.scene_id, shot.shot_id), None)
+        if old is None:
+            diff.new.append(ShotChange(scene_id=shot.scene_id, shot_id=shot.shot_id, frames=list(shot.prompt_hashes)))
+            continue
+        frames = [
+            frame for frame in {**old.prompt_hashes, **shot.prompt_hashes}
+            if old.prompt_hashes.get(frame) != shot.prompt_hashes.get(frame)
+        ]
+        target = diff.stale if frames else diff.unchanged
+        target.append(ShotChange(scene_id=shot.scene_id, shot_id=shot.shot_id, frames=frames))
+
+    diff.removed = [
+        ShotChange(scene_id=old.scene_id, shot_id=old.shot_id, frames=list(old.prompt_hashes))
+        for old in old_shots.values()
+    ]
+    return diff
+
+
+class ManifestStore:
+    """
+    Manifest of what was last generated per project, one JSON file each.
+    Uploads are diffed against it; batches merge in the frames they complete.
+    """
+
+    def __init__(self, base_dir: str = None):
+        self.base_dir = base_dir or os.path.join(settings.DATA_DIR, "manifests")
+        # Batches of the same project may finish concurrently on the storage I/O pool
+        self._lock = threading.Lock()
+
+    def _path(self, project_name: str) -> str:
+        return os.path.join(self.base_dir, f"{project_slug(project_name)}.json")
+
+    def load(self, project_name: str) -> Optional[ProjectManifest]:
+        try:
+            with open(self._path(project_name), "rb") as f:
+                return ProjectManifest.model_validate(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def save(self, manifest: ProjectManifest):
+        path = self._path(manifest.project)
+        os.makedirs(self.base_dir, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(manifest.model_dump_json())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def record_generated(self, project_name: str, jobs: List[GenerationJob]):
+        """Merge the prompt hashes of successfully generated frames into the stored manifest (blocking)"""
+        if not jobs:
+            return
+        with self._lock:
+            manifest = self.load(project_name) or ProjectManifest(project=project_name)
+            shots = {(shot.scene_id, shot.shot_id): shot for shot in manifest.shots}
+            for job in jobs:
+                shot = shots.get((job.scene_id, job.shot_id))
+                if shot is None:
+                    shot = shots[(job.scene_id, job.shot_id)] = ShotManifest(scene_id=job.scene_id, shot_id=job.shot_id)
+                    manifest.shots.append(shot)
+                shot.prompt_hashes[job.frame_type] = prompt_hash(job.prompt)
+            manifest.created_at = datetime.now()
+            self.save(manifest)
+
+
+manifest_store = ManifestStore()
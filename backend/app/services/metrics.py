@@ -0,0 +1,270 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+from app.core.config import settings
+
+NAMESPACE = "s2iv"
+
+# Seconds; covers sub-millisecond parsing up to multi-minute video generation
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.registry = registry
+        self.name = f"{NAMESPACE}_{name}"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Updates also come from the storage I/O threads
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last = +Inf)], sum, count
+        self.series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the block (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        series = self.series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series[0]), series[1], series[2]) for key, series in self.series.items()]
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# A collector returns (name, kind, help, [(labels, value), ...]) read from existing state at scrape time
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus registry (text exposition format 0.0.4).
+    Hot paths only do a dict update under a lock; counters that services
+    already keep (cache hits, limiter/breaker state) are read at scrape time.
+    """
+
+    def __init__(self, enabled: bool = None):
+        self.enabled = settings.METRICS_ENABLED if enabled is None else enabled
+        self.metrics: List[_Metric] = []
+        self.collectors: List[Collector] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(self, name, documentation, labelnames, buckets=buckets))
+
+    def register_collector(self, collector: Collector):
+        self.collectors.append(collector)
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines += metric.header() + metric.render()
+        for collector in self.collectors:
+            for name, kind, documentation, samples in collector():
+                full_name = f"{NAMESPACE}_{name}"
+                lines += [f"# HELP {full_name} {documentation}", f"# TYPE {full_name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{full_name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# Pipeline stages (parse, prompt expansion, decode, disk writes)
+STAGE_SECONDS = metrics.histogram("stage_duration_seconds", "Time spent per processing stage", ("stage",))
+# One observation per upstream attempt (retries are observed separately)
+UPSTREAM_SECONDS = metrics.histogram(
+    "upstream_request_duration_seconds", "Upstream request latency per attempt", ("upstream", "operation", "outcome")
+)
+UPSTREAM_IN_FLIGHT = metrics.gauge("upstream_requests_in_flight", "Upstream requests awaiting a response", ("upstream",))
+UPSTREAM_RETRIES = metrics.counter("upstream_retries_total", "Upstream attempts retried after a transient failure", ("upstream",))
+HTTP_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "API request latency", ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "API requests being handled")
+BYTES_WRITTEN = metrics.counter("storage_bytes_written_total", "Bytes written to the output tree and cache", ("target",))
+STORAGE_FILES_REMOVED = metrics.counter("storage_files_removed_total", "Files removed by the storage sweeper", ("reason",))
+STORAGE_RECLAIMED = metrics.counter("storage_reclaimed_bytes_total", "Bytes reclaimed by the storage sweeper", ("reason",))
+
+
+def stage_timer(stage: str):
+    return STAGE_SECONDS.time(stage=stage)
+
+
+async def timed_stream(stage: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Pass a byte stream through, observing the time spent producing its chunks
+    (not the time the consumer spends between them) once it completes
+    """
+    seconds = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                seconds += time.perf_counter() - started
+            yield chunk
+    finally:
+        await chunks.aclose()
+    STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def upstream_outcome(error: Optional[BaseException], status_code: Optional[int] = None) -> str:
+    """Bounded label for an attempt: 2xx/4xx/429/5xx/timeout/cancelled/error"""
+    if error is None and status_code is not None:
+        return "429" if status_code == 429 else f"{status_code // 100}xx"
+    response = getattr(error, "response", None)
+    if response is not None:
+        return upstream_outcome(None, response.status_code)
+    if isinstance(error, (TimeoutError, httpx.TimeoutException)):
+        return "timeout"
+    if isinstance(error, asyncio.CancelledError):
+        return "cancelled"
+    return "error"
+
+
+@contextmanager
+def track_upstream(upstream: str, operation: str) -> Iterator[None]:
+    """In-flight gauge plus per-attempt latency histogram around one upstream request"""
+    started = time.perf_counter()
+    UPSTREAM_IN_FLIGHT.inc(upstream=upstream)
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        UPSTREAM_IN_FLIGHT.dec(upstream=upstream)
+        outcome = upstream_outcome(error) if error is not None else "2xx"
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, upstream=upstream, operation=operation, outcome=outcome)
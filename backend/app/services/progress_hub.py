@@ -0,0 +1,134 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.models.schemas import GeneratedFile, TaskStatus
+from app.services.manifest import project_slug
+
+# Projects whose latest task states are kept for clients that connect (or reconnect) late
+SNAPSHOT_PROJECTS = 32
+
+
+def task_update(
+    project_name: str,
+    scene_id: str,
+    shot_id: str,
+    frame_type: str,
+    status: str,
+    progress: float = 0.0,
+    file: Optional[GeneratedFile] = None,
+    error: Optional[str] = None,
+    batch_id: Optional[str] = None,
+) -> TaskStatus:
+    """Per-frame status pushed to subscribers; task_id is "<scene>-<shot>-<frame>" as used by the UI"""
+    return TaskStatus(
+        task_id=f"{scene_id}-{shot_id}-{frame_type}",
+        status=status,
+        progress=100.0 if status == "completed" else progress,
+        result={
+            "project_id": project_slug(project_name),
+            "project_name": project_name,
+            "scene_id": scene_id,
+            "shot_id": shot_id,
+            "frame_type": frame_type,
+            "batch_id": batch_id,
+            "file": file.model_dump(mode="json") if file else None,
+        },
+        error=error
+    )
+
+
+class ProgressSubscriber:
+    """
+    One client's pending updates, keyed by task.
+    A slow client never makes the queue grow past one entry per task: newer
+    states replace older ones it has not read yet. If more than `max_pending`
+    distinct tasks are waiting, the subscriber is marked overflowed and dropped.
+    """
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[str, str]" = OrderedDict()
+        self.coalesced = 0
+        self.overflowed = False
+        self._ready = asyncio.Event()
+
+    def push(self, task_id: str, data: str):
+        if task_id in self.pending:
+            self.pending[task_id] = data
+            self.coalesced += 1
+        elif len(self.pending) >= self.max_pending:
+            self.overflowed = True
+        else:
+            self.pending[task_id] = data
+        self._ready.set()
+
+    def prime(self, snapshot: Dict[str, str]):
+        # Latest states on connect are not limited by max_pending (bounded by the project's task count)
+        self.pending.update(snapshot)
+        self._ready.set()
+
+    async def next_batch(self, timeout: float) -> List[str]:
+        """Wait up to `timeout` for updates; returns [] on timeout"""
+        if not self.pending and not self.overflowed:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return []
+        batch = list(self.pending.values())
+        self.pending.clear()
+        return batch
+
+
+class ProgressHub:
+    """
+    Fans task status updates out to every subscriber of a project, keyed by the
+    stable project_id (the same id as /projects/{project_id}).
+    """
+
+    def __init__(self, max_pending: int = None):
+        self.max_pending = max_pending or settings.PROGRESS_MAX_PENDING
+        self.subscribers: Dict[str, Set[ProgressSubscriber]] = {}
+        self.snapshots: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+
+    def publish(self, update: TaskStatus):
+        """Deliver an update built by task_update to the subscribers of its project"""
+        project_id = update.result["project_id"]
+        # Serialized once, whatever the number of subscribers
+        data = update.model_dump_json()
+
+        snapshot = self.snapshots.get(project_id)
+        if snapshot is None:
+            snapshot = self.snapshots[project_id] = {}
+            while len(self.snapshots) > SNAPSHOT_PROJECTS:
+                self.snapshots.popitem(last=False)
+        else:
+            self.snapshots.move_to_end(project_id)
+        snapshot[update.task_id] = data
+
+        for subscriber in self.subscribers.get(project_id, ()):
+            subscriber.push(update.task_id, data)
+
+    def subscribe(self, project_id: str) -> ProgressSubscriber:
+        """Register a subscriber, primed with the latest known state of each task"""
+        subscriber = ProgressSubscriber(self.max_pending)
+        snapshot = self.snapshots.get(project_id)
+        if snapshot:
+            subscriber.prime(snapshot)
+        self.subscribers.setdefault(project_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, project_id: str, subscriber: ProgressSubscriber):
+        subscribers = self.subscribers.get(project_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[project_id]
+
+    def stats(self) -> Dict[str, int]:
+        return {project: len(subscribers) for project, subscribers in self.subscribers.items()}
+
+
+progress_hub = ProgressHub()
@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.models.schemas import ProjectData, ProjectManifest, Shot
+
+# Bump when parsing or prompt processing changes its output, so stale entries on disk are ignored
+REGISTRY_VERSION = 1
+
+
+class RegisteredProject:
+    """A processed upload: the project (without per-upload `changes`) and its prompt manifest"""
+
+    def __init__(self, project: ProjectData, manifest: ProjectManifest):
+        self.project = project
+        self.manifest = manifest
+        self.shots: Dict[str, List[Shot]] = {}
+        for scene in project.scenes:
+            for shot in scene.shots:
+                self.shots.setdefault(shot.shot_id, []).append(shot)
+
+    def find_shots(self, shot_id: str, scene_id: Optional[str] = None) -> List[Shot]:
+        shots = self.shots.get(shot_id, [])
+        return [shot for shot in shots if shot.scene_id == scene_id] if scene_id else shots
+
+
+class ProjectRegistry:
+    """
+    Parsed and prompt-processed uploads memoized by the SHA-256 of the uploaded file.
+    A bounded in-memory LRU sits over one JSON file per upload on disk, and each
+    stable project id points at the content hash of its latest upload.
+    """
+
+    def __init__(self, base_dir: str = None, max_entries: int = None):
+        self.base_dir = base_dir or settings.PROJECT_REGISTRY_DIR or os.path.join(settings.DATA_DIR, "projects")
+        self.max_entries = max_entries or settings.PROJECT_CACHE_SIZE
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, RegisteredProject]" = OrderedDict()
+        self._latest: Dict[str, str] = {}
+        # Accessed from storage I/O threads
+        self._lock = threading.Lock()
+
+    def get(self, content_hash: str) -> Optional[RegisteredProject]:
+        """Memoized result for an upload, from memory or disk (blocking: run via run_io)"""
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is not None:
+                self._entries.move_to_end(content_hash)
+                self.hits += 1
+                return entry
+
+        entry = self._load(content_hash)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(content_hash, entry)
+        return entry
+
+    def put(self, content_hash: str, project: ProjectData, manifest: ProjectManifest) -> RegisteredProject:
+        """Memoize a processed upload and make it the latest version of its project (blocking)"""
+        project = project.model_copy(update={"changes": None, "content_hash": content_hash})
+        entry = RegisteredProject(project, manifest)
+        # Same layout as json.dumps({"version", "project", "manifest"}) without the intermediate dicts
+        record = (f'{{"version": {REGISTRY_VERSION}, "project": {project.model_dump_json()}, '
+                  f'"manifest": {manifest.model_dump_json()}}}')
+        self._write(self._upload_path(content_hash), record)
+        with self._lock:
+            self._remember(content_hash, entry)
+        self.set_latest(project.project_id, content_hash)
+        return entry
+
+    def set_latest(self, project_id: str, content_hash: str):
+        if self._latest.get(project_id) == content_hash:
+            return
+        self._write(self._latest_path(project_id), content_hash)
+        self._latest[project_id] = content_hash
+
+    def get_project(self, project_id: str) -> Optional[RegisteredProject]:
+        """Latest upload of a project (blocking)"""
+        content_hash = self._latest.get(project_id)
+        if content_hash is None:
+            try:
+                with open(self._latest_path(project_id), "r", encoding="utf-8") as f:
+                    content_hash = f.read().strip()
+            except (FileNotFoundError, ValueError):
+                return None
+            self._latest[project_id] = content_hash
+        return self.get(content_hash)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _remember(self, content_hash: str, entry: RegisteredProject):
+        self._entries[content_hash] = entry
+        self._entries.move_to_end(content_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, content_hash: str) -> Optional[RegisteredProject]:
+        try:
+            with open(self._upload_path(content_hash), "rb") as f:
+                record = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if record.get("version") != REGISTRY_VERSION:
+            return None
+        return RegisteredProject(
+            ProjectData.model_validate(record["project"]),
+            ProjectManifest.model_validate(record["manifest"])
+        )
+
+    def _upload_path(self, content_hash: str) -> str:
+        if not content_hash.isalnum():
+            raise ValueError(f"Invalid content hash: {content_hash!r}")
+        return os.path.join(self.base_dir, "uploads", content_hash[:2], f"{content_hash}.json")
+
+    def _latest_path(self, project_id: str) -> str:
+        # Ids come from project_slug; anything else (e.g. from a URL) is rejected
+        if not project_id or not all(c.isalnum() or c in "-_" for c in project_id):
+            raise ValueError(f"Invalid project id: {project_id!r}")
+        return os.path.join(self.base_dir, "latest", project_id)
+
+    def _write(self, path: str, text: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+project_registry = ProjectRegistry()
@@ -1,13 +1,21 @@
 import re
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
 class PromptProcessorService:
     """提示词处理服务"""
     
+    # 匹配 ([Ref: Name]) 格式的引用
+    REF_PATTERN = r'\(\[Ref:\s*(?P<ref_name>[^\]]+)\]\)'
+
     def __init__(self, core_style: Dict[str, Any] = None, character_references: Dict[str, str] = None):
         self.core_style = core_style or {}
         self.character_references = character_references or {}
         self.style_blocks = self._flatten_style_blocks(self.core_style)
+        # 每个项目只编译一次
+        self._ref_pattern = re.compile(self.REF_PATTERN)
+        self._steps, self._steps_by_text, self._style_pattern = self._compile_style_blocks()
+        # 占位符不含方括号时，同一时刻出现的占位符互不重叠，可用一次扫描找出下一个要执行的替换
+        self._can_skip = all("[" not in key and "]" not in key for key in self.style_blocks)
     
     def _flatten_style_blocks(self, core_style: Dict[str, Any]) -> Dict[str, str]:
         """
@@ -29,59 +37,90 @@ class PromptProcessorService:
                 blocks[block_name] = str(content)
         return blocks
     
+    def _compile_style_blocks(self) -> Tuple[List[Tuple[re.Pattern, str]], Dict[str, List[int]], Optional[re.Pattern]]:
+        """
+        旧实现按 key 顺序逐个做忽略大小写的替换（[key]，含下划线时再替换 [key with spaces]）。
+        这里把这些替换编译为有序步骤，并编译一个覆盖全部占位符的交替正则，
+        用来跳过当前文本中不会生效的步骤。
+        """
+        steps: List[Tuple[re.Pattern, str]] = []
+        steps_by_text: Dict[str, List[int]] = {}
+        for key, value in self.style_blocks.items():
+            placeholders = [f"[{key}]"]
+            if "_" in key:
+                placeholders.append(f"[{key.replace('_', ' ')}]")
+            # re.sub 会把替换值当作模板处理转义，这里预先求出字面结果
+            literal = re.sub("x", value, "x")
+            for placeholder in placeholders:
+                steps_by_text.setdefault(placeholder.lower(), []).append(len(steps))
+                steps.append((re.compile(re.escape(placeholder), re.IGNORECASE), literal))
+
+        if not steps:
+            return [], {}, None
+        alternation = "|".join(re.escape(ph) for ph in sorted(steps_by_text, key=len, reverse=True))
+        return steps, steps_by_text, re.compile(alternation, re.IGNORECASE)
+
     def process_prompt(self, prompt: str) -> str:
-        """处理单个提示词"""
+        """
+        处理单个提示词：先替换样式块，再在结果上替换引用（与旧实现相同的顺序和结果）
+        """
         if not prompt:
             return ""
-            
-        # 1. 替换样式块占位符
-        prompt = self.replace_style_blocks(prompt)
-        
-        # 2. 替换引用映射
-        prompt = self.replace_references(prompt)
-        
-        return prompt
+        if "[" not in prompt:
+            return prompt
+        return self.replace_references(self.replace_style_blocks(prompt))
     
     def replace_style_blocks(self, prompt: str) -> str:
         """
         替换样式块占位符，支持多种格式：
         [universal_style_block]
         [Universal Style Block]
+        逐步替换的语义不变（替换结果可与前后文本组成后续 key 的占位符），
+        但只执行当前文本中确实出现的步骤，每次用一次交替正则扫描找出下一个。
         """
-        # 简单的字符串替换可能不够灵活，但对于明确的占位符通常足够
-        # 先尝试直接替换 keys
-        for key, value in self.style_blocks.items():
-            # Case insensitive replace for brackets
-            # e.g. [universal_style_block]
-            pattern = re.compile(re.escape(f"[{key}]"), re.IGNORECASE)
-            prompt = pattern.sub(value, prompt)
-            
-            # 同时也处理下划线和空格的差异
-            # 如果 key 是 universal_style_block，我们也要匹配 [Universal Style Block]
-            if "_" in key:
-                alt_key = key.replace("_", " ")
-                pattern_alt = re.compile(re.escape(f"[{alt_key}]"), re.IGNORECASE)
-                prompt = pattern_alt.sub(value, prompt)
+        if self._style_pattern is None:
+            return prompt
+        if not self._can_skip:
+            for pattern, literal in self._steps:
+                prompt = pattern.sub(lambda _m, v=literal: v, prompt)
+            return prompt
 
+        step = self._next_step(prompt, 0)
+        while step is not None:
+            pattern, literal = self._steps[step]
+            prompt = pattern.sub(lambda _m, v=literal: v, prompt)
+            step = self._next_step(prompt, step + 1)
         return prompt
+
+    def _next_step(self, prompt: str, first: int) -> Optional[int]:
+        """The earliest step (from `first` on) whose placeholder occurs in prompt"""
+        best = None
+        for match in self._style_pattern.finditer(prompt):
+            text = match.group(0)
+            candidates = self._steps_by_text.get(text.lower())
+            if candidates is None:
+                # Case-insensitive matches lower() does not map back (e.g. "ſ" for "s")
+                candidates = [i for i, (pattern, _) in enumerate(self._steps) if pattern.fullmatch(text)]
+            for step in candidates:
+                if step >= first:
+                    if best is None or step < best:
+                        best = step
+                    break
+        return best
     
     def replace_references(self, prompt: str) -> str:
         """替换引用结构 ([Ref: Name])"""
-        # 匹配 ([Ref: Name]) 格式的引用
-        pattern = r'\(\[Ref:\s*([^\]]+)\]\)'
+        return self._ref_pattern.sub(self._resolve_reference, prompt)
+
+    def _resolve_reference(self, match: re.Match) -> str:
+        ref_name = match.group("ref_name").strip()
+        # 尝试直接匹配
+        if ref_name in self.character_references:
+            return self.character_references[ref_name]
         
-        def replace_match(match):
-            ref_name = match.group(1).strip()
-            # 尝试直接匹配
-            if ref_name in self.character_references:
-                return self.character_references[ref_name]
+        # 尝试转小写匹配 (JSON key 通常是小写 snake_case, 但引用可能是 Title Case)
+        ref_lower = ref_name.lower().replace(" ", "_")
+        if ref_lower in self.character_references:
+            return self.character_references[ref_lower]
             
-            # 尝试转小写匹配 (JSON key 通常是小写 snake_case, 但引用可能是 Title Case)
-            ref_lower = ref_name.lower().replace(" ", "_")
-            if ref_lower in self.character_references:
-                return self.character_references[ref_lower]
-                
-            return match.group(0) # 如果没找到，保持原样
-        
-        return re.sub(pattern, replace_match, prompt)
-
+        return match.group(0) # 如果没找到，保持原样
@@ -0,0 +1,197 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Deque, Dict, Optional
+
+import httpx
+from app.core.config import settings
+from loguru import logger
+
+# Upstream statuses that mean "slow down" rather than "this request is wrong"
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str], default: float) -> float:
+    """Retry-After as seconds (delta-seconds or HTTP-date); `default` when absent or invalid"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket (requests/second with a burst) plus an AIMD concurrency limit.
+
+    Every success raises the limit by 1/limit (about +1 per round of requests);
+    a 429/503 halves it once per round, drains the bucket and pauses all new
+    requests until Retry-After has passed.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_concurrency: int = None, min_concurrency: int = None,
+                 decrease_factor: float = None, enabled: bool = None):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_concurrency = max_concurrency or settings.RATE_LIMIT_MAX_CONCURRENCY
+        self.min_concurrency = min_concurrency or settings.RATE_LIMIT_MIN_CONCURRENCY
+        self.decrease_factor = decrease_factor or settings.RATE_LIMIT_DECREASE_FACTOR
+        self.enabled = settings.RATE_LIMIT_ENABLED if enabled is None else enabled
+
+        self.concurrency = float(self.max_concurrency)
+        self.tokens = float(self.burst)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.successes = 0
+        self.throttled = 0
+        # time.monotonic (not loop.time) so state survives across event loops
+        self._refilled_at = time.monotonic()
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @asynccontextmanager
+    async def limit(self) -> AsyncIterator[None]:
+        """Hold a slot around one upstream request and feed its outcome back into the limits"""
+        if not self.enabled:
+            yield
+            return
+        await self._acquire()
+        started_at = time.monotonic()
+        try:
+            yield
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in THROTTLE_STATUSES:
+                self.on_throttle(
+                    parse_retry_after(e.response.headers.get("Retry-After"), settings.RATE_LIMIT_DEFAULT_RETRY_AFTER),
+                    started_at
+                )
+            raise
+        else:
+            self.on_success()
+        finally:
+            self._release()
+
+    def on_success(self):
+        self.successes += 1
+        previous = int(self.concurrency)
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+        if int(self.concurrency) > previous:
+            self._wake()
+
+    def on_throttle(self, retry_after: float, started_at: float = None):
+        now = time.monotonic()
+        self.throttled += 1
+        retry_after = min(retry_after, settings.RATE_LIMIT_MAX_COOLDOWN)
+        self.blocked_until = max(self.blocked_until, now + retry_after)
+        self.tokens = 0.0
+        self._refilled_at = now
+        # Requests already in flight when we backed off describe the old limit: decrease once
+        if started_at is None or started_at >= self._last_decrease:
+            self.concurrency = max(self.min_concurrency, self.concurrency * self.decrease_factor)
+            self._last_decrease = now
+            logger.warning(
+                f"Upstream {self.name} throttled: concurrency limit {self.concurrency:.2f}, "
+                f"pausing {retry_after:.1f}s"
+            )
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "name": self.name,
+            "enabled": self.enabled,
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "concurrency_limit": int(self.concurrency),
+            "concurrency_target": round(self.concurrency, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "blocked_for": round(max(0.0, self.blocked_until - now), 2),
+            "successes": self.successes,
+            "throttled": self.throttled,
+        }
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _try_acquire(self) -> float:
+        """Take a slot and a token; otherwise return how long to wait (inf = until a slot frees)"""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= int(self.concurrency):
+            return math.inf
+        if self.rate > 0:  # rate <= 0 disables the bucket, leaving only the concurrency limit
+            self._refill(now)
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            self.tokens -= 1
+        self.in_flight += 1
+        return 0.0
+
+    async def _acquire(self):
+        while True:
+            wait = self._try_acquire()
+            if wait == 0:
+                return
+            if wait != math.inf:
+                await asyncio.sleep(wait)
+                continue
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Pass a wakeup we were given but can no longer use
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def _release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+
+class RateLimiterRegistry:
+    """One adaptive limiter per upstream model, shared by every client instance"""
+
+    def __init__(self):
+        self.limiters: Dict[str, AdaptiveRateLimiter] = {}
+
+    def get(self, model: str, rate: float, burst: int) -> AdaptiveRateLimiter:
+        limiter = self.limiters.get(model)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(model, rate, burst)
+            self.limiters[model] = limiter
+        return limiter
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {model: limiter.stats() for model, limiter in self.limiters.items()}
+
+
+rate_limiters = RateLimiterRegistry()
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import mimetypes
+import os
+import time
+import uuid
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.services.file_storage import run_io
+from app.services.veo_client import VeoClient
+from loguru import logger
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class ReferenceUploadCache:
+    """
+    Start frames uploaded to Veo, keyed by upstream and image content hash.
+    The same frame used by several takes or re-runs is uploaded once and then
+    referenced by URI until shortly before the upstream copy expires. Entries
+    are kept in one small JSON file so they survive restarts.
+    """
+
+    def __init__(self, path: str = None, refresh_margin: float = None):
+        self.path = path or settings.REFERENCE_UPLOADS_PATH or os.path.join(settings.DATA_DIR, "reference_uploads.json")
+        self.refresh_margin = settings.VEO_UPLOAD_REFRESH_MARGIN if refresh_margin is None else refresh_margin
+        self._entries: Optional[Dict[str, dict]] = None
+        self._pending: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.uploads = 0
+
+    async def get_url(self, client: VeoClient, image_path: str, image_hash: str) -> Optional[str]:
+        """URI of the uploaded start frame, uploading it if unknown or about to expire; None in mock mode"""
+        if not client.api_key:
+            return None
+        key = f"{client.base_url} {image_hash}"
+        entries = await self._load()
+        entry = entries.get(key)
+        if entry is not None and entry["expires_at"] - self.refresh_margin > time.time():
+            self.hits += 1
+            return entry["uri"]
+
+        # Concurrent takes of the same frame share one upload
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(self._upload(client, key, image_path))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "uploads": self.uploads, "entries": len(self._entries or {})}
+
+    async def _upload(self, client: VeoClient, key: str, image_path: str) -> str:
+        image = await run_io(_read, image_path)
+        mime_type = mimetypes.guess_type(image_path)[0] or "image/png"
+        uploaded = await client.upload_image(image, mime_type, os.path.basename(image_path))
+        self.uploads += 1
+        logger.info(f"Uploaded start frame {os.path.basename(image_path)} as {uploaded['uri']}")
+
+        now = time.time()
+        entries = await self._load()
+        entries[key] = {"uri": uploaded["uri"], "expires_at": uploaded["expires_at"]}
+        for stale in [k for k, e in entries.items() if e["expires_at"] <= now]:
+            del entries[stale]
+        try:
+            await run_io(self._save, dict(entries))
+        except OSError as e:
+            # Only the reuse across restarts is lost
+            logger.warning(f"Could not persist reference uploads: {e}")
+        return uploaded["uri"]
+
+    async def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            entries = await run_io(self._read_entries)
+            if self._entries is None:
+                self._entries = entries
+        return self._entries
+
+    def _read_entries(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self, entries: Dict[str, dict]):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+reference_uploads = ReferenceUploadCache()
@@ -0,0 +1,185 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+from app.core.config import settings
+from app.services.metrics import UPSTREAM_RETRIES
+from app.services.rate_limiter import THROTTLE_STATUSES
+from loguru import logger
+
+T = TypeVar("T")
+
+# Upstream statuses worth retrying; 429 is retried but does not count against the breaker
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# Failures raised before the request could reach the upstream (safe even for non-idempotent calls)
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the upstream while its circuit breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class UpstreamTimeoutError(TimeoutError):
+    """A single attempt exceeded its deadline"""
+
+
+async def attempt_deadline(awaitable: Awaitable[T], seconds: float, name: str) -> T:
+    """Bound one attempt end to end (connect + send + wait for response)"""
+    try:
+        return await asyncio.wait_for(awaitable, timeout=seconds)
+    except asyncio.TimeoutError:
+        raise UpstreamTimeoutError(f"{name} attempt exceeded its {seconds:.0f}s deadline")
+
+
+def is_retryable(error: Exception, idempotent: bool = True) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        # Throttling means the request was rejected, not processed
+        return status in (RETRYABLE_STATUSES if idempotent else THROTTLE_STATUSES)
+    if not idempotent:
+        return isinstance(error, NOT_SENT_ERRORS)
+    return isinstance(error, (httpx.TransportError, TimeoutError))
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """Failures that say the service is unhealthy (client errors and throttling do not)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive upstream failures;
+    open -> half_open after `reset_timeout`, letting a single probe through;
+    the probe's outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or settings.BREAKER_RESET_TIMEOUT
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        if self.state == "open" and self.retry_in() == 0:
+            self.state = "half_open"
+            self._probe_in_flight = False
+        if self.state == "closed":
+            return
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError(self.name, self.retry_in())
+
+    def record_success(self):
+        if self.state != "closed":
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.total_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        # A half-open probe that ended without a verdict (e.g. a 4xx) frees the slot
+        self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_in": round(self.retry_in(), 2) if self.state == "open" else 0.0,
+            "total_failures": self.total_failures,
+            "rejected": self.rejected,
+        }
+
+
+class RetryPolicy:
+    """Bounded retries with decorrelated-jitter backoff"""
+
+    def __init__(self, max_attempts: int = None, base_delay: float = None, max_delay: float = None):
+        self.max_attempts = max(1, max_attempts or settings.RETRY_MAX_ATTEMPTS)
+        self.base_delay = settings.RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = settings.RETRY_MAX_DELAY if max_delay is None else max_delay
+
+    def next_delay(self, previous: float) -> float:
+        return min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous * 3)))
+
+    async def call(self, attempt: Callable[[], Awaitable[T]], breaker: CircuitBreaker, idempotent: bool = True) -> T:
+        """Run `attempt` through the breaker, retrying transient failures"""
+        delay = self.base_delay
+        for attempt_number in range(1, self.max_attempts + 1):
+            breaker.allow()
+            try:
+                result = await attempt()
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            except Exception as e:
+                if is_upstream_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.release_probe()
+                if attempt_number == self.max_attempts or not is_retryable(e, idempotent):
+                    raise
+                delay = self.next_delay(delay)
+                UPSTREAM_RETRIES.inc(upstream=breaker.name)
+                logger.warning(
+                    f"{breaker.name} attempt {attempt_number}/{self.max_attempts} failed ({e!r}); "
+                    f"retrying in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+
+class BreakerRegistry:
+    """One circuit breaker per upstream service"""
+
+    def __init__(self):
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name)
+            self.breakers[name] = breaker
+        return breaker
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
+
+circuit_breakers = BreakerRegistry()
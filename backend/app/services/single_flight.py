@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing stays per process
+    fcntl = None
+
+T = TypeVar("T")
+
+
+def coalesce_key(*parts: Any) -> str:
+    """Identity of a generation request: (model-level key or prompt, project, scene, shot, frame, ...)"""
+    material = json.dumps(parts, ensure_ascii=False, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class FileLock:
+    """
+    Exclusive flock on one lock file, shared by every worker process on the host.
+    The holder deletes the file on release, so lock files do not pile up.
+    """
+
+    def __init__(self, path: str, poll_interval: float = None):
+        self.path = path
+        self.poll_interval = poll_interval or settings.SINGLE_FLIGHT_LOCK_POLL
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """Take the lock if free (never blocks)"""
+        if fcntl is None:
+            self._fd = -1
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        while True:
+            fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            # The previous holder may have deleted the file between our open and flock: lock the new one instead
+            try:
+                current = os.stat(self.path).st_ino == os.fstat(fd).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                self._fd = fd
+                return True
+            os.close(fd)
+
+    async def acquire(self):
+        """Wait until the lock is free; other processes are not notified, so this polls"""
+        delay = self.poll_interval
+        while not self.try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.poll_interval * 10)
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        if fd is None or fd < 0:
+            return
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: the first caller runs the call, later
+    ones with the same key await the same task. A caller that goes away (a closed
+    request) does not cancel the call for the others. With lock_dir set the call
+    also holds a per-key file lock, extending this to other worker processes;
+    the call should then re-check shared state (e.g. the generation cache) first.
+    """
+
+    def __init__(self, lock_dir: str = None):
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.coalesced = 0
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    def lock_for(self, key: str) -> Optional[FileLock]:
+        if self.lock_dir is None:
+            return None
+        return FileLock(os.path.join(self.lock_dir, key[:2], f"{key}.lock"))
+
+    async def do(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, call))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def shutdown(self):
+        """Cancel calls still running (called from the app lifespan)"""
+        tasks = list(self._calls.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._calls), "coalesced": self.coalesced}
+
+    async def _run(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        lock = self.lock_for(key)
+        if lock is None:
+            return await call()
+        await lock.acquire()
+        try:
+            return await call()
+        finally:
+            lock.release()
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here in case every caller went away
+
+
+def default_lock_dir() -> Optional[str]:
+    if not settings.SINGLE_FLIGHT_FILE_LOCKS:
+        return None
+    return settings.SINGLE_FLIGHT_LOCK_DIR or os.path.join(settings.DATA_DIR, "locks")
+
+
+generation_flights = SingleFlight(lock_dir=default_lock_dir())
@@ -0,0 +1,36 @@
+import time
+from collections import OrderedDict
+from typing import List
+
+from app.core.config import settings
+
+
+class FinishedStatuses:
+    """
+    Ids of tasks that reached a final state, oldest first. Their statuses stay
+    queryable for `ttl` seconds (clients poll for the result), after which the
+    owner drops them from its in-memory dicts.
+    """
+
+    def __init__(self, ttl: float = None):
+        self.ttl = settings.TASK_STATUS_TTL if ttl is None else ttl
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+
+    def add(self, task_id: str):
+        self._finished[task_id] = time.monotonic()
+        self._finished.move_to_end(task_id)
+
+    def expired(self) -> List[str]:
+        """Pop and return the ids whose retention has run out"""
+        cutoff = time.monotonic() - self.ttl
+        expired = []
+        while self._finished:
+            task_id, finished_at = next(iter(self._finished.items()))
+            if finished_at > cutoff:
+                break
+            self._finished.popitem(last=False)
+            expired.append(task_id)
+        return expired
+
+    def __len__(self) -> int:
+        return len(self._finished)
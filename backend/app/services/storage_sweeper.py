@@ -0,0 +1,238 @@
+import asyncio
+import os
+import time
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.asset_catalog import AssetCatalog, asset_catalog
+from app.services.derivatives import is_derivative, thumbnail_path
+from app.services.file_storage import run_io
+from app.services.metrics import STORAGE_FILES_REMOVED, STORAGE_RECLAIMED
+from app.services.single_flight import FileLock, default_lock_dir
+from loguru import logger
+
+# Files removed per I/O pool call while evicting
+EVICT_BATCH = 256
+
+REASONS = ("temp", "lru")
+
+
+class _Pass:
+    """What one sweep found and removed"""
+
+    def __init__(self, now: float):
+        self.now = now
+        self.files = {reason: 0 for reason in REASONS}
+        self.bytes = {reason: 0 for reason in REASONS}
+        self.outputs: List[Tuple[float, int, str]] = []  # (last used, size, path) of surviving outputs
+        self.output_bytes = 0
+        self.removed_outputs: List[str] = []
+
+    def report(self, started: float) -> dict:
+        return {
+            "removed_files": dict(self.files),
+            "reclaimed_bytes": dict(self.bytes),
+            "output_bytes": self.output_bytes,
+            "duration": round(time.perf_counter() - started, 3),
+            "finished_at": time.time(),
+        }
+
+
+class StorageSweeper:
+    """
+    Background maintenance of OUTPUT_DIR: deletes abandoned temp files and evicts
+    least recently used outputs while the tree is over its size budget. Each project directory (and each eviction batch)
+    is one call on the storage I/O pool, so a pass never blocks the event loop.
+    The generation cache has its own budget and is only swept for temp files.
+    """
+
+    def __init__(self, base_dir: str = None, interval: float = None, temp_ttl: float = None,
+                 max_bytes: int = None, min_age: float = None,
+                 catalog: AssetCatalog = None, lock_dir: str = None, cache_dir: str = None):
+        self.base_dir = base_dir or settings.OUTPUT_DIR
+        self.cache_dir = cache_dir or settings.CACHE_DIR or os.path.join(settings.DATA_DIR, "cache")
+        self.interval = interval or settings.SWEEP_INTERVAL
+        self.temp_ttl = settings.TEMP_FILE_TTL if temp_ttl is None else temp_ttl
+        self.max_bytes = settings.OUTPUT_MAX_BYTES if max_bytes is None else max_bytes
+        self.min_age = settings.SWEEP_MIN_AGE if min_age is None else min_age
+        self.catalog = catalog or asset_catalog
+        self.lock_dir = lock_dir if lock_dir is not None else default_lock_dir()
+        self.passes = 0
+        self.last_report: Optional[dict] = None
+        self.totals = {reason: {"files": 0, "bytes": 0} for reason in REASONS}
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Sweep every `interval` seconds until shutdown (called from the app lifespan)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def sweep(self) -> Optional[dict]:
+        """One pass; None if another worker process is sweeping the same tree"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            lock = FileLock(os.path.join(self.lock_dir, "storage-sweep.lock")) if self.lock_dir else None
+            if lock is not None and not await run_io(lock.try_acquire):
+                return None
+            try:
+                return await self._sweep()
+            finally:
+                if lock is not None:
+                    lock.release()
+
+    def stats(self) -> dict:
+        return {
+            "passes": self.passes,
+            "totals": self.totals,
+            "last": self.last_report,
+            "config": {
+                "temp_ttl": self.temp_ttl,
+                "max_bytes": self.max_bytes,
+                "interval": self.interval,
+            },
+        }
+
+    async def _loop(self):
+        while True:
+            # First pass one interval after startup, away from resume and the first uploads
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Storage sweep failed: {e}")
+
+    async def _sweep(self) -> dict:
+        started = time.perf_counter()
+        sweep_pass = _Pass(time.time())
+        cache_dir = os.path.realpath(self.cache_dir)
+        data_dir = os.path.realpath(settings.DATA_DIR)
+        cache_inside = False
+
+        for name in sorted(await run_io(self._list, self.base_dir)):
+            path = os.path.join(self.base_dir, name)
+            real_path = os.path.realpath(path)
+            if real_path == data_dir:
+                continue
+            if real_path == cache_dir or name.startswith("."):
+                cache_inside = cache_inside or real_path == cache_dir
+                # Cache blobs are bounded by CACHE_MAX_BYTES; only abandoned writes are removed here
+                await run_io(self._sweep_tree, path, sweep_pass, False)
+            else:
+                await run_io(self._sweep_tree, path, sweep_pass, True)
+        if not cache_inside:
+            # The cache normally lives under DATA_DIR, which the loop above skips
+            await run_io(self._sweep_tree, cache_dir, sweep_pass, False)
+
+        if self.max_bytes and sweep_pass.output_bytes > self.max_bytes:
+            await self._evict(sweep_pass)
+        if sweep_pass.removed_outputs:
+            await run_io(self.catalog.remove, sweep_pass.removed_outputs)
+
+        report = sweep_pass.report(started)
+        self._account(report)
+        return report
+
+    def _list(self, path: str) -> List[str]:
+        try:
+            return os.listdir(path)
+        except FileNotFoundError:
+            return []
+
+    def _sweep_tree(self, top: str, sweep_pass: _Pass, outputs: bool):
+        """Temp TTL and output accounting for one top-level directory (blocking)"""
+        if os.path.isfile(top):
+            # Loose files at the top of the tree: only abandoned temp files are touched
+            self._sweep_files(os.path.dirname(top), [os.path.basename(top)], sweep_pass, False)
+            return
+        for dirpath, _, filenames in os.walk(top):
+            self._sweep_files(dirpath, filenames, sweep_pass, outputs)
+
+    def _sweep_files(self, dirpath: str, filenames: List[str], sweep_pass: _Pass, outputs: bool):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if name.endswith(".tmp"):
+                if sweep_pass.now - st.st_mtime > self.temp_ttl:
+                    self._remove(path, st, "temp", sweep_pass)
+                continue
+            if not outputs or name.startswith(".") or is_derivative(path):
+                continue
+            # atime is only as fresh as the mount allows (relatime: about daily), never older than mtime
+            sweep_pass.outputs.append((max(st.st_atime, st.st_mtime), st.st_size, path))
+            sweep_pass.output_bytes += st.st_size
+
+    async def _evict(self, sweep_pass: _Pass):
+        excess = sweep_pass.output_bytes - self.max_bytes
+        newest_allowed = sweep_pass.now - self.min_age
+        candidates = sorted(entry for entry in sweep_pass.outputs if entry[0] < newest_allowed)
+        for start in range(0, len(candidates), EVICT_BATCH):
+            if excess <= 0:
+                break
+            batch = []
+            for last_used, size, path in candidates[start:start + EVICT_BATCH]:
+                if excess <= 0:
+                    break
+                batch.append(path)
+                excess -= size
+            freed = await run_io(self._evict_batch, batch, sweep_pass)
+            sweep_pass.output_bytes -= freed
+        if excess > 0:
+            logger.warning(f"Output tree still {excess} bytes over budget (remaining files are newer than {self.min_age:.0f}s)")
+
+    def _evict_batch(self, paths: List[str], sweep_pass: _Pass) -> int:
+        freed = 0
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            self._remove(path, st, "lru", sweep_pass)
+            freed += st.st_size
+        return freed
+
+    def _remove(self, path: str, st: os.stat_result, reason: str, sweep_pass: _Pass):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        reclaimed = st.st_size
+        if reason != "temp":
+            sweep_pass.removed_outputs.append(path)
+            thumbnail = thumbnail_path(path)
+            try:
+                reclaimed += os.stat(thumbnail).st_size
+                os.remove(thumbnail)
+            except FileNotFoundError:
+                pass
+        sweep_pass.files[reason] += 1
+        sweep_pass.bytes[reason] += reclaimed
+
+    def _account(self, report: dict):
+        self.passes += 1
+        self.last_report = report
+        for reason in REASONS:
+            files, reclaimed = report["removed_files"][reason], report["reclaimed_bytes"][reason]
+            self.totals[reason]["files"] += files
+            self.totals[reason]["bytes"] += reclaimed
+            STORAGE_FILES_REMOVED.inc(files, reason=reason)
+            STORAGE_RECLAIMED.inc(reclaimed, reason=reason)
+        total_files = sum(report["removed_files"].values())
+        if total_files:
+            logger.info(
+                f"Storage sweep removed {total_files} files, reclaimed {sum(report['reclaimed_bytes'].values())} bytes "
+                f"({report['removed_files']}) in {report['duration']}s"
+            )
+
+
+storage_sweeper = StorageSweeper()
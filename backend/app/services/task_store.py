@@ -0,0 +1,214 @@
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.schemas import GenerationJob, TaskRecord
+from app.services.manifest import prompt_hash
+
+# Statuses a restarted process should pick up again
+RESUMABLE_STATUSES = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id      TEXT PRIMARY KEY,
+    batch_id     TEXT,
+    project_id   TEXT NOT NULL,
+    project_name TEXT NOT NULL,
+    scene_id     TEXT NOT NULL,
+    shot_id      TEXT NOT NULL,
+    frame_type   TEXT NOT NULL,
+    prompt       TEXT NOT NULL,
+    prompt_hash  TEXT NOT NULL,
+    status       TEXT NOT NULL,
+    output_path  TEXT,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    error        TEXT,
+    created_at   TEXT NOT NULL,
+    updated_at   TEXT NOT NULL,
+    UNIQUE (project_name, scene_id, shot_id, frame_type)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_project_status ON tasks (project_name, status);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_updated ON tasks (status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_batch ON tasks (batch_id);
+"""
+
+LIST_COLUMNS = (
+    "task_id, batch_id, project_id, project_name, scene_id, shot_id, frame_type, "
+    "prompt_hash, status, output_path, attempts, error, created_at, updated_at"
+)
+
+
+class TaskStore:
+    """
+    SQLite-backed record of every frame/video task in a generation run.
+    One row per (project, scene, shot, frame): re-running a frame updates its row,
+    so the table always reflects the latest known state of each output.
+    """
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.TASK_DB_PATH or os.path.join(settings.DATA_DIR, "tasks.db")
+        self._conn: Optional[sqlite3.Connection] = None
+        # Calls arrive from the storage I/O pool; one connection, serialized
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def enqueue(self, batch_id: str, project_id: str, project_name: str, jobs: List[GenerationJob]):
+        """Record jobs as queued; attempts are kept unless the prompt changed"""
+        now = datetime.now().isoformat()
+        rows = [
+            (str(uuid.uuid4()), batch_id, project_id, project_name, job.scene_id, job.shot_id,
+             job.frame_type, job.prompt, prompt_hash(job.prompt), now, now)
+            for job in jobs
+        ]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO tasks (task_id, batch_id, project_id, project_name, scene_id, shot_id,
+                                       frame_type, prompt, prompt_hash, status, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?)
+                    ON CONFLICT (project_name, scene_id, shot_id, frame_type) DO UPDATE SET
+                        batch_id = excluded.batch_id,
+                        project_id = excluded.project_id,
+                        prompt = excluded.prompt,
+                        attempts = CASE WHEN tasks.prompt_hash = excluded.prompt_hash THEN tasks.attempts ELSE 0 END,
+                        prompt_hash = excluded.prompt_hash,
+                        status = 'queued',
+                        error = NULL,
+                        updated_at = excluded.updated_at
+                    """,
+                    rows
+                )
+
+    def mark_running(self, project_name: str, job: GenerationJob):
+        self._update(project_name, job, "status = 'running', attempts = attempts + 1")
+
+    def mark_completed(self, project_name: str, job: GenerationJob, output_path: str):
+        self._update(project_name, job, "status = 'completed', output_path = ?, error = NULL", output_path)
+
+    def mark_failed(self, project_name: str, job: GenerationJob, error: str):
+        self._update(project_name, job, "status = 'failed', error = ?", error)
+
+    def _update(self, project_name: str, job: GenerationJob, assignments: str, *values):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    f"UPDATE tasks SET {assignments}, updated_at = ? "
+                    "WHERE project_name = ? AND scene_id = ? AND shot_id = ? AND frame_type = ?",
+                    (*values, datetime.now().isoformat(), project_name, job.scene_id, job.shot_id, job.frame_type)
+                )
+
+    def list_tasks(
+        self,
+        project: str = None,
+        status: str = None,
+        scene_id: str = None,
+        shot_id: str = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[TaskRecord]:
+        """Filter on indexed columns, most recently updated first"""
+        clauses, params = [], []
+        for column, value in (("project_name", project), ("status", status),
+                              ("scene_id", scene_id), ("shot_id", shot_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT {LIST_COLUMNS} FROM tasks {where} ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+        return [TaskRecord(**dict(row)) for row in rows]
+
+    def split_unchanged(self, project_name: str, jobs: List[GenerationJob]) -> Tuple[List[GenerationJob], int]:
+        """
+        Drop jobs whose last run completed with the same prompt and whose output still exists.
+        A shot's video is conditioned on its start frame, so it is kept whenever that frame runs again.
+        Returns (jobs to run, number skipped).
+        """
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT scene_id, shot_id, frame_type, prompt_hash, output_path FROM tasks "
+                "WHERE project_name = ? AND status = 'completed'",
+                (project_name,)
+            ).fetchall()
+        done = {
+            (row["scene_id"], row["shot_id"], row["frame_type"]): (row["prompt_hash"], row["output_path"])
+            for row in rows
+        }
+
+        def unchanged(job: GenerationJob) -> bool:
+            previous = done.get((job.scene_id, job.shot_id, job.frame_type))
+            return bool(previous and previous[0] == prompt_hash(job.prompt) and previous[1] and os.path.exists(previous[1]))
+
+        rerun = {i for i, job in enumerate(jobs) if not unchanged(job)}
+        new_starts = {(jobs[i].scene_id, jobs[i].shot_id) for i in rerun if jobs[i].frame_type == "start"}
+        changed = [
+            job for i, job in enumerate(jobs)
+            if i in rerun or (job.frame_type == "video" and (job.scene_id, job.shot_id) in new_starts)
+        ]
+        return changed, len(jobs) - len(changed)
+
+    def resumable(self, max_attempts: int = None) -> Dict[Tuple[str, str], List[GenerationJob]]:
+        """
+        Jobs left queued/running by a previous process, grouped by (project_id, project_name).
+        Jobs already started `max_attempts` times are marked failed instead of resumed,
+        so a frame that takes the process down is not retried on every restart.
+        """
+        max_attempts = settings.TASK_MAX_ATTEMPTS if max_attempts is None else max_attempts
+        placeholders = ", ".join("?" for _ in RESUMABLE_STATUSES)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                if max_attempts:
+                    conn.execute(
+                        f"UPDATE tasks SET status = 'failed', error = ?, updated_at = ? "
+                        f"WHERE status IN ({placeholders}) AND attempts >= ?",
+                        (f"Gave up after {max_attempts} interrupted attempts", datetime.now().isoformat(),
+                         *RESUMABLE_STATUSES, max_attempts)
+                    )
+                rows = conn.execute(
+                    f"SELECT project_id, project_name, scene_id, shot_id, frame_type, prompt FROM tasks "
+                    f"WHERE status IN ({placeholders}) ORDER BY project_name, created_at",
+                    RESUMABLE_STATUSES
+                ).fetchall()
+
+        groups: Dict[Tuple[str, str], List[GenerationJob]] = {}
+        for row in rows:
+            groups.setdefault((row["project_id"], row["project_name"]), []).append(GenerationJob(
+                scene_id=row["scene_id"],
+                shot_id=row["shot_id"],
+                frame_type=row["frame_type"],
+                prompt=row["prompt"]
+            ))
+        return groups
+
+
+task_store = TaskStore()
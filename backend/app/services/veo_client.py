@@ -1,89 +1,275 @@
 import httpx
+import time
+from datetime import datetime
+from typing import AsyncIterator, Optional
 from app.core.config import settings
+from app.services.http_pool import borrow_client
+from app.services.generation_cache import make_cache_key
+from app.services.metrics import STAGE_SECONDS, stage_timer, timed_stream, track_upstream
+from app.services.rate_limiter import rate_limiters
+from app.services.resilience import RetryPolicy, attempt_deadline, circuit_breakers
+from app.utils.streaming import Base64StreamDecoder, JSONStringExtractor
 from loguru import logger
 import json
 import base64
+import uuid
+
+# Response fields that carry the whole video as base64
+VIDEO_DATA_KEYS = ("bytesBase64Encoded", "video_content")
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
 
 class VeoClient:
     """Veo API Client for Video Generation"""
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         self.api_key = settings.VEO_API_KEY
         self.base_url = settings.VEO_BASE_URL
         self.model = settings.VEO_MODEL
+        # Shared pooled client (injected from the app lifespan); None = per-call client
+        self.http_client = http_client
+        # Per-model quota shared by all clients (adapts to 429/503 responses)
+        self.limiter = rate_limiters.get(self.model, settings.VEO_RATE_LIMIT_RPS, settings.VEO_RATE_LIMIT_BURST)
+        # Transient failures are retried here; the breaker fails fast while Veo is down
+        self.breaker = circuit_breakers.get("veo")
+        self.retry_policy = RetryPolicy()
         
+    def _generation_params(self, **kwargs) -> dict:
+        return {
+            "duration_seconds": kwargs.get('duration', 5),
+            "aspect_ratio": kwargs.get('aspect_ratio', "16:9")
+        }
+
+    def cache_key(self, prompt: str, image_hash: str = None, **kwargs) -> Optional[str]:
+        """Content-address key for a generation; None in mock mode so mock data is never cached"""
+        if not self.api_key:
+            return None
+        return make_cache_key(self.model, prompt, self._generation_params(**kwargs), image_hash)
+
     async def generate_video(self, prompt: str, image_url: str = None, **kwargs) -> bytes:
         """
         Generate video from prompt (and optional image) using Veo API
         """
+        return b"".join([chunk async for chunk in self.stream_video(prompt, image_url, **kwargs)])
+
+    async def stream_video(self, prompt: str, image_url: str = None, **kwargs) -> AsyncIterator[bytes]:
+        """
+        Generate a video and yield its bytes as they are downloaded/decoded,
+        so memory stays constant regardless of clip size
+        """
         if not self.api_key:
             logger.warning("Veo API Key is missing. Returning mock data.")
-            return self._get_mock_video()
+            yield self._get_mock_video()
+            return
             
         url = f"{self.base_url}/{self.model}:generate"
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        headers = self._headers()
         
         payload = {
             "prompt": prompt,
-            "duration_seconds": kwargs.get('duration', 5),
-            "aspect_ratio": kwargs.get('aspect_ratio', "16:9")
+            **self._generation_params(**kwargs)
         }
         
         if image_url:
             payload['image_url'] = image_url
             
         try:
-            async with httpx.AsyncClient() as client:
+            async with borrow_client(self.http_client, settings.VEO_READ_TIMEOUT) as client:
                 # Video generation is usually long-running. 
                 # This might return a job ID or wait (if short).
                 # Assuming sync return for simplicity or blocking wait.
-                response = await client.post(url, json=payload, headers=headers, timeout=120.0)
-                response.raise_for_status()
-                data = response.json()
-                
+                # Retries are only possible until the response starts streaming
+                response = await self.retry_policy.call(
+                    lambda: self._send(client, "POST", url, stream=True, json=payload, headers=headers), self.breaker
+                )
+                try:
+                    # Inline base64 video is decoded straight out of the response stream
+                    extractor = JSONStringExtractor(VIDEO_DATA_KEYS)
+                    decoder = Base64StreamDecoder()
+                    decode_seconds = 0.0
+                    async for raw in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        for piece in extractor.feed(raw):
+                            started = time.perf_counter()
+                            chunk = decoder.decode(piece)
+                            decode_seconds += time.perf_counter() - started
+                            if chunk:
+                                yield chunk
+                        if extractor.done:
+                            break
+                finally:
+                    await response.aclose()
+
+                if extractor.found:
+                    if not extractor.done:
+                        raise ValueError("Truncated base64 video data in response")
+                    decoder.flush()
+                    STAGE_SECONDS.observe(decode_seconds, stage="decode_video")
+                    return
+
                 # Assume response contains video URL or data
-                return await self._extract_video_data(data)
+                data = json.loads(bytes(extractor.buffer))
+                async for chunk in timed_stream("extract_video_data", self._stream_video_data(data, client)):
+                    yield chunk
                 
         except Exception as e:
             logger.error(f"Veo API Error: {str(e)}")
             raise e
 
-    async def _extract_video_data(self, data: dict) -> bytes:
+    async def _send(self, client: httpx.AsyncClient, method: str, url: str, stream: bool = False, **kwargs) -> httpx.Response:
+        """One attempt: wait for quota, then send under the per-attempt deadline"""
+        async with self.limiter.limit():
+            # Streamed calls are timed up to the response headers
+            with track_upstream("veo", url.rsplit(":", 1)[-1]):
+                request = client.build_request(method, url, **kwargs)
+                response = await attempt_deadline(client.send(request, stream=stream), settings.VEO_ATTEMPT_TIMEOUT, "Veo")
+                if response.is_error and stream:
+                    await response.aclose()
+                response.raise_for_status()
+        return response
+
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    async def submit_video(self, prompt: str, image_url: str = None, **kwargs) -> dict:
+        """
+        Start a long-running video generation and return its operation handle
+        ({"name": ..., "done": bool, "response"/"error": ...})
+        """
+        if not self.api_key:
+            logger.warning("Veo API Key is missing. Returning mock operation.")
+            return {
+                "name": f"operations/mock-{uuid.uuid4().hex}",
+                "done": True,
+                "response": {"video_content": base64.b64encode(self._get_mock_video()).decode()}
+            }
+
+        url = f"{self.base_url}/{self.model}:predictLongRunning"
+        payload = {
+            "prompt": prompt,
+            **self._generation_params(**kwargs)
+        }
+        if image_url:
+            payload['image_url'] = image_url
+
+        try:
+            async with borrow_client(self.http_client, settings.VEO_READ_TIMEOUT) as client:
+                # Each submission creates an operation: only retry requests the upstream never accepted
+                response = await self.retry_policy.call(
+                    lambda: self._send(client, "POST", url, json=payload, headers=self._headers()),
+                    self.breaker,
+                    idempotent=False
+                )
+                return response.json()
+        except Exception as e:
+            logger.error(f"Veo API Error: {str(e)}")
+            raise e
+
+    async def upload_image(self, image: bytes, mime_type: str = None, display_name: str = None) -> dict:
+        """
+        Upload a start frame once so generations can reference it by URI instead of
+        carrying it inline. Returns {"uri": ..., "expires_at": <epoch seconds>}.
+        """
+        mime_type = mime_type or "image/png"
+        if not self.api_key:
+            return {"uri": f"mock://files/{uuid.uuid4().hex}", "expires_at": time.time() + settings.VEO_UPLOAD_TTL}
+
+        url = f"{self.base_url}/files"
+        headers = {**self._headers(), "Content-Type": mime_type}
+        if display_name:
+            headers["X-Goog-Upload-File-Name"] = display_name
+        async with borrow_client(self.http_client, settings.VEO_READ_TIMEOUT) as client:
+            response = await self.retry_policy.call(
+                lambda: self._send(client, "POST", url, content=image, headers=headers),
+                self.breaker
+            )
+            data = response.json()
+        uploaded = data.get("file", data)
+        if not uploaded.get("uri"):
+            raise ValueError(f"Veo upload returned no file URI: {data}")
+        return {"uri": uploaded["uri"], "expires_at": self._expiration(uploaded.get("expirationTime"))}
+
+    def _expiration(self, value: Optional[str]) -> float:
+        """RFC 3339 expirationTime to epoch seconds; the configured TTL when absent or unparseable"""
+        if value:
+            try:
+                return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+            except ValueError:
+                logger.warning(f"Unparseable upload expirationTime {value!r}; assuming {settings.VEO_UPLOAD_TTL}s")
+        return time.time() + settings.VEO_UPLOAD_TTL
+
+    async def get_operation(self, name: str) -> dict:
+        """Fetch the current state of a long-running operation"""
+        url = f"{self.base_url}/{name}"
+        async with borrow_client(self.http_client, settings.VEO_READ_TIMEOUT) as client:
+            with track_upstream("veo", "getOperation"):
+                response = await client.get(url, headers=self._headers())
+                response.raise_for_status()
+            return response.json()
+
+    async def stream_operation_result(self, operation: dict) -> AsyncIterator[bytes]:
+        """Yield the video produced by a finished operation"""
+        if operation.get('error'):
+            error = operation['error']
+            message = error.get('message', error) if isinstance(error, dict) else error
+            raise ValueError(f"Veo operation failed: {message}")
+        async for chunk in timed_stream("extract_video_data", self._stream_video_data(operation.get('response') or {})):
+            yield chunk
+
+    async def _stream_video_data(self, data: dict, client: Optional[httpx.AsyncClient] = None) -> AsyncIterator[bytes]:
         """
         Extract video data from API response.
-        Supports direct base64 data or downloading from a URL.
+        Supports direct base64 data or downloading from a URL (in chunks).
         """
         try:
             # Case 1: Video URL provided
             if 'video_url' in data:
                 video_url = data['video_url']
-                async with httpx.AsyncClient() as client:
-                    resp = await client.get(video_url)
-                    resp.raise_for_status()
-                    return resp.content
+                async with borrow_client(client or self.http_client, settings.VEO_READ_TIMEOUT) as http:
+                    async with http.stream("GET", video_url) as resp:
+                        resp.raise_for_status()
+                        async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                            yield chunk
+                return
             
             # Case 2: Base64 encoded content (hypothetical structure)
             if 'video_content' in data:
-                 return base64.b64decode(data['video_content'])
+                yield self._decode_video(data['video_content'])
+                return
 
             # Case 3: Google Cloud / Vertex AI specific structure (e.g. predictions[0].bytesBase64Encoded)
             if 'predictions' in data and len(data['predictions']) > 0:
-                 prediction = data['predictions'][0]
-                 if 'bytesBase64Encoded' in prediction:
-                     return base64.b64decode(prediction['bytesBase64Encoded'])
+                prediction = data['predictions'][0]
+                if 'bytesBase64Encoded' in prediction:
+                    yield self._decode_video(prediction['bytesBase64Encoded'])
+                    return
+
+            # Case 4: Long-running operation results (videos[0] or generatedSamples[0].video)
+            samples = data.get('videos') or data.get('generateVideoResponse', {}).get('generatedSamples') or []
+            if samples:
+                sample = samples[0].get('video', samples[0])
+                if 'bytesBase64Encoded' in sample:
+                    yield self._decode_video(sample['bytesBase64Encoded'])
+                    return
+                if 'uri' in sample:
+                    async for chunk in self._stream_video_data({'video_url': sample['uri']}, client):
+                        yield chunk
+                    return
 
             # Fallback
             logger.warning(f"Could not find video data in response: {data.keys()}")
-            return b"" 
 
         except Exception as e:
             logger.error(f"Failed to extract video data: {str(e)}")
             raise ValueError(f"Failed to extract video data: {str(e)}")
 
+    def _decode_video(self, encoded: str) -> bytes:
+        # Inline results (incl. finished operations) are decoded in one piece
+        with stage_timer("decode_video"):
+            return base64.b64decode(encoded)
+
     def _get_mock_video(self) -> bytes:
         """Return a mock video bytes (using a small valid mp4 header if possible, or just dummy)"""
         # Minimal MP4 header for testing file creation
@@ -0,0 +1,364 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+import httpx
+from app.core.config import settings
+from app.models.schemas import TaskStatus
+from app.services.file_hashes import file_hashes
+from app.services.file_storage import FileStorageService, run_io
+from app.services.generation_cache import GenerationCache, generation_cache
+from app.services.derivatives import DerivativeService, derivatives as derivative_service
+from app.services.progress_hub import ProgressHub, progress_hub, task_update
+from app.services.reference_uploads import ReferenceUploadCache, reference_uploads
+from app.services.single_flight import FileLock, SingleFlight, coalesce_key, generation_flights
+from app.services.status_retention import FinishedStatuses
+from app.services.veo_client import VeoClient
+from loguru import logger
+
+
+class VeoJob:
+    """A submitted Veo generation waiting on its long-running operation"""
+
+    def __init__(self, status: TaskStatus, client: VeoClient, storage: FileStorageService, operation_name: str,
+                 cache_key: Optional[str], project_name: str, scene_id: str, shot_id: str, filename: str):
+        loop = asyncio.get_running_loop()
+        self.status = status
+        self.client = client
+        self.storage = storage
+        self.operation_name = operation_name
+        self.cache_key = cache_key
+        self.project_name = project_name
+        self.scene_id = scene_id
+        self.shot_id = shot_id
+        self.filename = filename
+        self.interval = settings.VEO_POLL_INITIAL_INTERVAL
+        self.next_poll_at = loop.time() + self.interval
+        self.deadline = loop.time() + settings.VEO_JOB_TIMEOUT
+        self.polls = 0
+        self.done = asyncio.Event()
+        # Identical requests share this job while it runs; the file lock covers other workers
+        self.coalesce_key: Optional[str] = None
+        self.lock: Optional[FileLock] = None
+
+    def started(self, operation_name: str):
+        """Operation submitted (possibly after waiting for another worker): timers start now"""
+        now = asyncio.get_running_loop().time()
+        self.operation_name = operation_name
+        self.next_poll_at = now + self.interval
+        self.deadline = now + settings.VEO_JOB_TIMEOUT
+
+    def backoff(self, now: float):
+        self.interval = min(self.interval * settings.VEO_POLL_BACKOFF, settings.VEO_POLL_MAX_INTERVAL)
+        self.next_poll_at = now + self.interval
+
+
+class VeoJobManager:
+    """
+    Submits Veo generations as long-running operations and tracks them.
+    One background loop polls every outstanding operation with per-job
+    exponential backoff; finished videos are streamed into storage.
+    """
+
+    def __init__(self, cache: GenerationCache = None, max_concurrency: int = None, hub: ProgressHub = None,
+                 derivatives: DerivativeService = None, uploads: ReferenceUploadCache = None,
+                 flights: SingleFlight = None, status_ttl: float = None):
+        self.cache = cache or generation_cache
+        self.uploads = uploads or reference_uploads
+        # Cross-worker file locks come from the shared flights; in-process submits coalesce here
+        self.flights = flights or generation_flights
+        self._submits = SingleFlight()
+        self._inflight: Dict[str, VeoJob] = {}
+        self.coalesced = 0
+        self.hub = hub or progress_hub
+        self.derivatives = derivatives or derivative_service
+        self.max_concurrency = max_concurrency or settings.MAX_CONCURRENT_TASKS
+        self.statuses: Dict[str, TaskStatus] = {}
+        self.jobs: Dict[str, VeoJob] = {}
+        # Final statuses are dropped after TASK_STATUS_TTL
+        self._finished = FinishedStatuses(status_ttl)
+        self._pending: Dict[str, VeoJob] = {}
+        self._finalizers: Set[asyncio.Task] = set()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def get_status(self, task_id: str) -> Optional[TaskStatus]:
+        return self.statuses.get(task_id)
+
+    async def submit(
+        self,
+        client: VeoClient,
+        storage: FileStorageService,
+        prompt: str,
+        project_name: str,
+        scene_id: str,
+        shot_id: str,
+        filename: str,
+        image_url: str = None,
+        cache_bypass: bool = False,
+        start_image_path: str = None,
+    ) -> TaskStatus:
+        """
+        Start a generation (or serve it from cache) and return its status immediately.
+        start_image_path conditions the video on that frame; its content hash is part of the cache key.
+        A request identical to one still running (same clip, same shot) gets that task's status.
+        """
+        image_hash = await run_io(file_hashes.digest, start_image_path) if start_image_path else None
+        cache_key = client.cache_key(prompt, image_hash=image_hash)
+        key = coalesce_key(cache_key or prompt, image_hash, project_name, scene_id, shot_id, filename, cache_bypass)
+        running = self._inflight.get(key)
+        if running is not None:
+            self.coalesced += 1
+            return running.status
+        return await self._submits.do(key, lambda: self._submit(
+            client, storage, prompt, project_name, scene_id, shot_id, filename,
+            image_url, cache_bypass, start_image_path, image_hash, cache_key, key
+        ))
+
+    async def _submit(self, client, storage, prompt, project_name, scene_id, shot_id, filename,
+                      image_url, cache_bypass, start_image_path, image_hash, cache_key, key) -> TaskStatus:
+        self._prune()
+        status = TaskStatus(task_id=str(uuid.uuid4()), status="pending")
+        self.statuses[status.task_id] = status
+        if not cache_bypass and await self._serve_cached(status, storage, cache_key, project_name, scene_id, shot_id, filename):
+            self._finished.add(status.task_id)
+            return status
+
+        job = VeoJob(status, client, storage, "", cache_key, project_name, scene_id, shot_id, filename)
+        job.coalesce_key = key
+        self.jobs[status.task_id] = job
+        self._inflight[key] = job
+
+        lock = self.flights.lock_for(key)
+        if lock is not None and not lock.try_acquire():
+            # Another worker is generating this clip: wait for it off the request path
+            status.status = "running"
+            status.result = {"waiting_for": "another worker"}
+            status.updated_at = datetime.now()
+            self._publish(job, "running")
+            self._spawn(self._after_peer(job, lock, prompt, image_url, start_image_path, image_hash))
+            return status
+
+        job.lock = lock
+        try:
+            await self._start(job, prompt, image_url, start_image_path, image_hash)
+        except BaseException:
+            # Surfaced to the caller as before; nothing is left registered
+            self.statuses.pop(status.task_id, None)
+            self._finish(job)
+            raise
+        return status
+
+    async def _serve_cached(self, status, storage, cache_key, project_name, scene_id, shot_id, filename) -> bool:
+        if not (self.cache.enabled and cache_key):
+            return False
+        cached_path = await self.cache.get_async(cache_key)
+        if not cached_path:
+            return False
+        file_path = await storage.link_file_async(cached_path, project_name, scene_id, shot_id, filename)
+        await self._complete(status, storage, file_path, project_name, scene_id, shot_id, cache_hit=True)
+        return True
+
+    async def _start(self, job: VeoJob, prompt: str, image_url: str, start_image_path: str, image_hash: str):
+        if start_image_path and not image_url:
+            image_url = await self.uploads.get_url(job.client, start_image_path, image_hash)
+        operation = await job.client.submit_video(prompt=prompt, image_url=image_url)
+        job.started(operation.get("name", ""))
+        status = job.status
+        status.status = "running"
+        status.result = {"operation": job.operation_name}
+        status.updated_at = datetime.now()
+        self._publish(job, "running")
+
+        if operation.get("done"):
+            self._spawn_finalize(job, operation)
+        else:
+            self._pending[status.task_id] = job
+            self._ensure_loop()
+            self._wakeup.set()
+
+        logger.info(f"Veo task {status.task_id} submitted (operation={job.operation_name})")
+
+    async def _after_peer(self, job: VeoJob, lock: FileLock, prompt: str, image_url: str,
+                          start_image_path: str, image_hash: str):
+        try:
+            await lock.acquire()
+            job.lock = lock
+            # The other worker's clip is in the shared cache unless it failed (a bypass request accepts it too)
+            if await self._serve_cached(job.status, job.storage, job.cache_key, job.project_name,
+                                        job.scene_id, job.shot_id, job.filename):
+                self._finish(job)
+                return
+            await self._start(job, prompt, image_url, start_image_path, image_hash)
+        except asyncio.CancelledError:
+            self._finish(job)
+            raise
+        except Exception as e:
+            self._fail(job, str(e))
+
+    async def wait(self, task_id: str) -> TaskStatus:
+        """Wait until a task reaches a final state"""
+        job = self.jobs.get(task_id)
+        if job is not None:
+            await job.done.wait()
+        return self.statuses[task_id]
+
+    async def shutdown(self):
+        """Stop polling and cancel in-flight downloads (called from the app lifespan)"""
+        tasks = list(self._finalizers)
+        if self._loop_task is not None:
+            tasks.append(self._loop_task)
+            self._loop_task = None
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Bounds concurrent polls and downloads; created lazily on the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _ensure_loop(self):
+        if self._loop_task is None or self._loop_task.done():
+            self._wakeup = asyncio.Event()
+            self._loop_task = asyncio.create_task(self._poll_loop())
+
+    async def _poll_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = loop.time()
+            due = [job for job in self._pending.values() if job.next_poll_at <= now]
+            if not due:
+                delay = min(job.next_poll_at for job in self._pending.values()) - now
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await asyncio.gather(*(self._poll(job) for job in due))
+
+    async def _poll(self, job: VeoJob):
+        loop = asyncio.get_running_loop()
+        if loop.time() > job.deadline:
+            self._pending.pop(job.status.task_id, None)
+            self._fail(job, f"Timed out after {settings.VEO_JOB_TIMEOUT}s waiting for {job.operation_name}")
+            return
+
+        try:
+            async with self.semaphore:
+                operation = await job.client.get_operation(job.operation_name)
+        except httpx.HTTPStatusError as e:
+            if 400 <= e.response.status_code < 500 and e.response.status_code != 429:
+                # The operation is gone or malformed: polling again will not help
+                self._pending.pop(job.status.task_id, None)
+                self._fail(job, f"Polling failed: {e}")
+                return
+            logger.warning(f"Veo poll for {job.operation_name} failed, retrying: {e}")
+            job.backoff(loop.time())
+            return
+        except Exception as e:
+            logger.warning(f"Veo poll for {job.operation_name} failed, retrying: {e}")
+            job.backoff(loop.time())
+            return
+
+        job.polls += 1
+        if operation.get("done"):
+            self._pending.pop(job.status.task_id, None)
+            self._spawn_finalize(job, operation)
+            return
+
+        progress = (operation.get("metadata") or {}).get("progressPercent")
+        if isinstance(progress, (int, float)) and progress != job.status.progress:
+            job.status.progress = float(progress)
+            self._publish(job, "running")
+        job.status.updated_at = datetime.now()
+        job.backoff(loop.time())
+
+    def _spawn_finalize(self, job: VeoJob, operation: dict):
+        self._spawn(self._finalize(job, operation))
+
+    def _spawn(self, coro):
+        # Tracked so shutdown can cancel them
+        task = asyncio.create_task(coro)
+        self._finalizers.add(task)
+        task.add_done_callback(self._finalizers.discard)
+
+    async def _finalize(self, job: VeoJob, operation: dict):
+        try:
+            async with self.semaphore:
+                # Store the finished video in the cache (when cacheable) while streaming it to disk
+                blob = await self.cache.get_or_stream(
+                    job.cache_key,
+                    lambda: job.client.stream_operation_result(operation),
+                    bypass=True
+                )
+                file_path = await blob.save_to(
+                    job.storage,
+                    project_name=job.project_name,
+                    scene_id=job.scene_id,
+                    shot_id=job.shot_id,
+                    filename=job.filename
+                )
+            await self._complete(job.status, job.storage, file_path, job.project_name, job.scene_id, job.shot_id)
+            logger.info(f"Veo task {job.status.task_id} completed after {job.polls} polls")
+        except Exception as e:
+            self._fail(job, str(e))
+        finally:
+            self._finish(job)
+
+    async def _complete(self, status: TaskStatus, storage: FileStorageService, file_path: str,
+                  project_name: str, scene_id: str, shot_id: str, cache_hit: bool = False):
+        generated = await storage.register_file_async(file_path, project_name, scene_id, shot_id, "video")
+        self.derivatives.schedule(file_path)
+        status.status = "completed"
+        status.progress = 100.0
+        status.result = {
+            **generated.model_dump(mode="json"),
+            "cache_hit": cache_hit,
+        }
+        status.updated_at = datetime.now()
+        self.hub.publish(task_update(project_name, scene_id, shot_id, "video", "completed", file=generated))
+
+    def _fail(self, job: VeoJob, error: str):
+        logger.error(f"Veo task {job.status.task_id} failed: {error}")
+        job.status.status = "failed"
+        job.status.error = error
+        job.status.updated_at = datetime.now()
+        self._publish(job, "failed", error=error)
+        self._finish(job)
+
+    def _finish(self, job: VeoJob):
+        """Final state reached: waiters wake up and new identical requests start a new job"""
+        job.done.set()
+        if self.jobs.pop(job.status.task_id, None) is not None and job.status.task_id in self.statuses:
+            self._finished.add(job.status.task_id)
+        if job.coalesce_key and self._inflight.get(job.coalesce_key) is job:
+            del self._inflight[job.coalesce_key]
+        if job.lock is not None:
+            job.lock.release()
+            job.lock = None
+
+    def _prune(self):
+        for task_id in self._finished.expired():
+            self.statuses.pop(task_id, None)
+
+    def _publish(self, job: VeoJob, state: str, error: str = None):
+        self.hub.publish(task_update(
+            job.project_name, job.scene_id, job.shot_id, "video", state,
+            progress=job.status.progress, error=error
+        ))
+
+
+veo_jobs = VeoJobManager()
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.asset_catalog import asset_catalog
+from app.services.gemini_client import GeminiClient
+from app.services.generation_cache import generation_cache
+from app.services.manifest import manifest_store
+from app.services.project_registry import project_registry
+from app.services.rate_limiter import AdaptiveRateLimiter
+from app.services.reference_uploads import reference_uploads
+from app.services.resilience import CircuitBreaker, RetryPolicy
+from app.services.single_flight import generation_flights
+from app.services.storage_sweeper import storage_sweeper
+from app.services.task_store import task_store
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    """Point the app's state stores (used by the lifespan and routes) at a per-test DATA_DIR"""
+    data_dir = tmp_path / "data"
+    monkeypatch.setattr(settings, "DATA_DIR", str(data_dir))
+    for store, name in ((task_store, "tasks.db"), (asset_catalog, "assets.db")):
+        store.close()
+        monkeypatch.setattr(store, "db_path", str(data_dir / name))
+    monkeypatch.setattr(manifest_store, "base_dir", str(data_dir / "manifests"))
+    monkeypatch.setattr(project_registry, "base_dir", str(data_dir / "projects"))
+    monkeypatch.setattr(project_registry, "_entries", OrderedDict())
+    monkeypatch.setattr(project_registry, "_latest", {})
+    monkeypatch.setattr(reference_uploads, "path", str(data_dir / "reference_uploads.json"))
+    monkeypatch.setattr(reference_uploads, "_entries", None)
+    monkeypatch.setattr(generation_cache, "cache_dir", str(data_dir / "cache"))
+    monkeypatch.setattr(generation_cache, "_index", None)
+    monkeypatch.setattr(storage_sweeper, "cache_dir", str(data_dir / "cache"))
+    monkeypatch.setattr(storage_sweeper, "lock_dir", str(data_dir / "locks"))
+    if generation_flights.lock_dir is not None:
+        monkeypatch.setattr(generation_flights, "lock_dir", str(data_dir / "locks"))
+    yield data_dir
+    task_store.close()
+    asset_catalog.close()
+
+
+@pytest.fixture
+def make_gemini_client():
+    """Build a GeminiClient over a test transport, with rate limiting and retries disabled"""
+    def make(transport: httpx.AsyncBaseTransport, client_class=GeminiClient) -> GeminiClient:
+        client = client_class(http_client=httpx.AsyncClient(transport=transport))
+        client.api_key = "mock"
+        client.base_url = "http://mock-upstream"
+        client.limiter = AdaptiveRateLimiter(client.model, rate=0, burst=1, enabled=False)
+        client.breaker = CircuitBreaker("gemini-test")
+        client.retry_policy = RetryPolicy(max_attempts=1)
+        return client
+    return make
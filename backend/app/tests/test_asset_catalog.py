@@ -0,0 +1,89 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_asset_catalog, get_file_storage, get_gemini_client, get_generation_cache
+from app.models.schemas import GeneratedFile
+from app.services.asset_catalog import AssetCatalog
+from app.services.file_storage import FileStorageService
+from app.services.generation_cache import GenerationCache
+from main import app
+
+
+def generated(scene: str, shot: str, frame: str, file_id: str = None) -> GeneratedFile:
+    name = f"{scene}_{shot}_{frame}.png"
+    return GeneratedFile(
+        file_id=file_id or f"{scene}-{shot}-{frame}",
+        shot_id=shot,
+        file_type="video" if frame == "video" else "image",
+        file_path=f"/out/Demo/{scene}/{shot}/{name}",
+        file_name=name,
+        file_size=100,
+        created_at=datetime(2024, 1, 1),
+    )
+
+
+def test_catalog_queries_and_replacement(tmp_path):
+    catalog = AssetCatalog(str(tmp_path / "assets.db"))
+    for scene in ("S1", "S2"):
+        for shot in ("1", "2"):
+            for frame in ("start", "end", "video"):
+                catalog.record("Demo", scene, generated(scene, shot, frame), "ab" * 32)
+    other = generated("S1", "1", "start", file_id="other").model_copy(update={"file_path": "/out/Other/S1/1/S1_1_start.png"})
+    catalog.record("Other", "S1", other, None)
+
+    assert catalog.count_assets("Demo") == 12
+    shot = catalog.list_assets("Demo", scene_id="S2", shot_id="1")
+    assert [a.file_name for a in shot] == ["S2_1_end.png", "S2_1_start.png", "S2_1_video.png"]
+    assert [a.file_id for a in catalog.list_assets("Demo", file_type="video", limit=2, offset=1)] == ["S1-2-video", "S2-1-video"]
+
+    # Regenerating a frame replaces its row; the old file_id no longer resolves
+    catalog.record("Demo", "S1", generated("S1", "1", "start", file_id="new"), "cd" * 32)
+    assert catalog.count_assets("Demo") == 12
+    assert catalog.get("S1-1-start") is None
+    assert catalog.get("new").sha256 == "cd" * 32
+
+    # Listing is answered from the index without sorting
+    plan = " ".join(row[-1] for row in catalog._connect().execute(
+        "EXPLAIN QUERY PLAN SELECT file_id FROM assets WHERE project_name = ? AND scene_id = ? "
+        "ORDER BY project_name, scene_id, shot_id, file_name LIMIT 100", ("Demo", "S1")))
+    assert "idx_assets_location" in plan and "TEMP B-TREE" not in plan
+    catalog.close()
+
+
+class FakeGemini:
+    model = "fake"
+
+    def cache_key(self, prompt, **kwargs):
+        return None
+
+    async def stream_image(self, prompt, **kwargs):
+        yield b"\x89PNG fake"
+
+
+def test_generated_files_are_listed_and_found_by_id(tmp_path):
+    catalog = AssetCatalog(str(tmp_path / "assets.db"))
+    storage = FileStorageService(base_dir=str(tmp_path / "out"), catalog=catalog)
+    app.dependency_overrides[get_gemini_client] = lambda: FakeGemini()
+    app.dependency_overrides[get_file_storage] = lambda: storage
+    app.dependency_overrides[get_generation_cache] = lambda: GenerationCache(cache_dir=str(tmp_path / ".cache"), enabled=False)
+    app.dependency_overrides[get_asset_catalog] = lambda: catalog
+    try:
+        with TestClient(app) as client:
+            files = [
+                client.post("/api/generate-image", json={
+                    "project_name": "Demo", "scene_id": "1", "shot_id": shot, "prompt": "harbour", "frame_type": "start"
+                }).json()
+                for shot in ("1", "2")
+            ]
+            listing = client.get("/api/projects/Demo/assets", params={"shot_id": "2"})
+            found = client.get(f"/api/assets/{files[0]['file_id']}")
+            missing = client.get("/api/assets/unknown")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert listing.headers["X-Total-Count"] == "1"
+    assert [a["file_id"] for a in listing.json()] == [files[1]["file_id"]]
+    assert found.json()["file_path"] == files[0]["file_path"]
+    assert found.json()["scene_id"] == "1" and len(found.json()["sha256"]) == 64
+    assert missing.status_code == 404
@@ -0,0 +1,179 @@
+import asyncio
+import sqlite3
+
+from app.models.schemas import ProjectData, Scene, Shot, NanoBananaPrompts
+from app.services.batch_scheduler import BatchScheduler, plan_jobs
+from app.services.file_storage import FileStorageService
+from app.services.manifest import ManifestStore
+from app.services.progress_hub import ProgressHub
+from app.services.task_store import TaskStore
+from app.services.veo_jobs import VeoJobManager
+
+
+class FakeUpstream:
+    """Records call order and peak concurrency instead of calling the API"""
+
+    api_key = None  # mock mode: no start-frame uploads
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = []
+
+    async def _call(self, name):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.calls.append(name)
+        self.in_flight -= 1
+        return b"data"
+
+    def cache_key(self, prompt, **kwargs):
+        return None
+
+    async def stream_image(self, prompt, **kwargs):
+        yield await self._call(prompt)
+
+    async def submit_video(self, prompt, image_url=None, **kwargs):
+        await self._call(prompt)
+        return {"name": f"operations/{prompt}", "done": True, "response": {}}
+
+    async def stream_operation_result(self, operation):
+        yield b"video"
+
+
+def make_project(shot_count=4):
+    shots = [
+        Shot(
+            shot_id=f"{i}",
+            scene_id="S1",
+            nano_banana_pro_prompts=NanoBananaPrompts(start=f"{i}-start", middle=f"{i}-middle", end=f"{i}-end"),
+            veo_3_1_prompt=f"{i}-video"
+        )
+        for i in range(shot_count)
+    ]
+    return ProjectData(project="BatchTest", scenes=[Scene(scene_id="S1", shots=shots)])
+
+
+def test_plan_jobs():
+    jobs = plan_jobs(make_project(2))
+    assert len(jobs) == 8
+    assert [j.frame_type for j in jobs[:4]] == ["start", "middle", "end", "video"]
+    assert jobs[3].filename == "S1_0_video.mp4"
+
+
+def test_batch_respects_dependencies_and_concurrency(tmp_path):
+    async def run():
+        upstream = FakeUpstream()
+        scheduler = BatchScheduler(max_concurrency=3, jobs=VeoJobManager(),
+                                   store=TaskStore(str(tmp_path / "tasks.db")),
+                                   manifests=ManifestStore(str(tmp_path / "manifests")))
+        storage = FileStorageService(base_dir=str(tmp_path))
+        status = scheduler.submit("p1", make_project(), upstream, upstream, storage)
+        assert status.status == "pending"
+        await scheduler._runners[status.task_id]
+        return upstream, scheduler.get_batch(status.task_id)
+
+    upstream, status = asyncio.run(run())
+    assert status.status == "completed"
+    assert status.progress == 100.0
+    assert status.result["completed"] == 16
+    assert upstream.peak <= 3
+    for i in range(4):
+        assert upstream.calls.index(f"{i}-start") < upstream.calls.index(f"{i}-video")
+
+
+def test_finished_batches_are_dropped_after_retention(tmp_path):
+    async def run():
+        upstream = FakeUpstream()
+        scheduler = BatchScheduler(jobs=VeoJobManager(), store=TaskStore(str(tmp_path / "tasks.db")), status_ttl=0,
+                                   manifests=ManifestStore(str(tmp_path / "manifests")))
+        storage = FileStorageService(base_dir=str(tmp_path))
+        first = scheduler.submit("p1", make_project(), upstream, upstream, storage)
+        await scheduler._runners[first.task_id]
+        assert scheduler.get_batch(first.task_id).status == "completed"
+
+        second = scheduler.submit("p1", make_project(), upstream, upstream, storage)
+        await scheduler._runners[second.task_id]
+        return scheduler, first, second
+
+    scheduler, first, second = asyncio.run(run())
+    assert scheduler.get_batch(first.task_id) is None
+    assert list(scheduler.batches) == [second.task_id]
+
+
+def test_finished_batch_records_generated_frames_in_manifest(tmp_path):
+    class FailingEnd(FakeUpstream):
+        async def stream_image(self, prompt, **kwargs):
+            if prompt == "0-end":
+                raise RuntimeError("upstream error")
+            yield await self._call(prompt)
+
+    manifests = ManifestStore(str(tmp_path / "manifests"))
+
+    async def run():
+        upstream = FailingEnd()
+        scheduler = BatchScheduler(jobs=VeoJobManager(), store=TaskStore(str(tmp_path / "tasks.db")), manifests=manifests)
+        storage = FileStorageService(base_dir=str(tmp_path))
+        status = scheduler.submit("p1", make_project(2), upstream, upstream, storage)
+        await scheduler._runners[status.task_id]
+
+    asyncio.run(run())
+    shots = {shot.shot_id: shot.prompt_hashes for shot in manifests.load("BatchTest").shots}
+    # The failed frame stays out, so the next upload still reports it as stale
+    assert set(shots["0"]) == {"start", "middle", "video"}
+    assert set(shots["1"]) == {"start", "middle", "end", "video"}
+
+
+def test_frames_run_only_once_they_hold_a_slot(tmp_path):
+    class RecordingHub(ProgressHub):
+        def __init__(self):
+            super().__init__()
+            self.events = []
+
+        def publish(self, update):
+            self.events.append((update.task_id, update.status))
+            super().publish(update)
+
+    hub = RecordingHub()
+
+    class Upstream(FakeUpstream):
+        def __init__(self):
+            super().__init__()
+            self.running_at_call = []
+
+        async def stream_image(self, prompt, **kwargs):
+            self.running_at_call.append(sum(1 for task_id, state in hub.events if state == "running"))
+            yield await self._call(prompt)
+
+    async def run():
+        scheduler = BatchScheduler(max_concurrency=1, jobs=VeoJobManager(hub=hub), hub=hub,
+                                   store=TaskStore(str(tmp_path / "tasks.db")),
+                                   manifests=ManifestStore(str(tmp_path / "manifests")))
+        upstream = Upstream()
+        status = scheduler.submit("p1", make_project(2), upstream, upstream, FileStorageService(base_dir=str(tmp_path)))
+        await scheduler._runners[status.task_id]
+        return upstream
+
+    upstream = asyncio.run(run())
+    # One slot: each frame turns "running" just before its own upstream call, the rest stay "queued"
+    assert upstream.running_at_call == [1, 2, 3, 4, 5, 6]
+
+
+def test_batch_fails_when_previous_runs_cannot_be_read(tmp_path):
+    class BrokenStore(TaskStore):
+        def split_unchanged(self, project_name, jobs):
+            raise sqlite3.OperationalError("database is locked")
+
+    async def run():
+        scheduler = BatchScheduler(jobs=VeoJobManager(), store=BrokenStore(str(tmp_path / "tasks.db")),
+                                   manifests=ManifestStore(str(tmp_path / "manifests")))
+        upstream = FakeUpstream()
+        status = scheduler.submit("p1", make_project(1), upstream, upstream, FileStorageService(base_dir=str(tmp_path)),
+                                  only_changed=True)
+        await scheduler._runners[status.task_id]
+        return scheduler.get_batch(status.task_id)
+
+    status = asyncio.run(run())
+    assert status.status == "failed"
+    assert "database is locked" in status.error
@@ -0,0 +1,90 @@
+import asyncio
+import os
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.api.deps import get_derivatives, get_file_storage
+from app.services.derivatives import DerivativeService, thumbnail_path
+from app.services.file_storage import FileStorageService
+from main import app
+
+
+def make_frame(path: str, size=(1280, 720)):
+    Image.new("RGB", size, (200, 80, 40)).save(path, format="PNG")
+
+
+def test_frame_thumbnail_is_rendered_and_reused(tmp_path):
+    frame = str(tmp_path / "S1_1_start.png")
+    make_frame(frame)
+    service = DerivativeService(workers=1, enabled=True, max_size=320)
+
+    async def run():
+        try:
+            first = await service.ensure(frame)
+            second = await service.ensure(frame)
+            return first, second
+        finally:
+            await service.shutdown()
+
+    first, second = asyncio.run(run())
+    assert first == second == thumbnail_path(frame)
+    assert service.rendered == 1
+    with Image.open(first) as thumb:
+        assert thumb.format == "WEBP"
+        assert thumb.size == (320, 180)
+
+
+def test_video_poster_falls_back_to_start_frame_without_ffmpeg(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", "")  # no ffmpeg
+    make_frame(str(tmp_path / "S1_1_start.png"))
+    video = tmp_path / "S1_1_video.mp4"
+    video.write_bytes(b"\x00\x00\x00\x18ftypmp42not-a-real-clip")
+    orphan = tmp_path / "S1_2_video.mp4"
+    orphan.write_bytes(b"no start frame")
+    service = DerivativeService(workers=1, enabled=True, max_size=160)
+
+    async def run():
+        try:
+            return await service.ensure(str(video)), await service.ensure(str(orphan))
+        finally:
+            await service.shutdown()
+
+    poster, missing = asyncio.run(run())
+    assert poster == str(tmp_path / "S1_1_video.thumb.webp")
+    with Image.open(poster) as thumb:
+        assert thumb.size == (160, 90)
+    assert missing is None
+    assert service.failed == 1
+
+
+def test_thumbnail_endpoint_regenerates_missing_thumbnail(tmp_path):
+    storage = FileStorageService()
+    storage.base_dir = str(tmp_path)
+    shot_dir = tmp_path / "demo" / "S1" / "1"
+    shot_dir.mkdir(parents=True)
+    frame = str(shot_dir / "S1_1_end.png")
+    make_frame(frame)
+    service = DerivativeService(workers=1, enabled=True)
+
+    generated = storage.describe_file(frame, "1", "image")
+    assert generated.thumbnail_url == "/api/thumbnails/demo/S1/1/S1_1_end.png"
+
+    app.dependency_overrides[get_file_storage] = lambda: storage
+    app.dependency_overrides[get_derivatives] = lambda: service
+    try:
+        with TestClient(app) as client:
+            response = client.get(generated.thumbnail_url)
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "image/webp"
+
+            os.remove(thumbnail_path(frame))
+            assert client.get(generated.thumbnail_url).status_code == 200
+            assert os.path.exists(thumbnail_path(frame))
+
+            assert client.get("/api/thumbnails/demo/S1/1/missing.png").status_code == 404
+            assert client.get("/api/thumbnails/..%2F..%2Fetc%2Fpasswd").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+        asyncio.run(service.shutdown())
+    assert service.rendered == 2
@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+
+from app.core.config import settings
+from app.mock.upstream import MockProfile, create_app
+from app.services.gemini_batcher import GeminiBatcher
+from app.services.gemini_client import GeminiClient
+
+
+def test_frames_are_batched_and_rejected_frames_fall_back(monkeypatch, make_gemini_client):
+    monkeypatch.setattr(settings, "GEMINI_BATCH_POLL_INTERVAL", 0)
+    mock_app = create_app(MockProfile(latency_ms=0, image_bytes=2048, polls_until_done=2, batch_fail_prompt="REJECT"))
+    client = make_gemini_client(httpx.ASGITransport(app=mock_app))
+    batcher = GeminiBatcher(enabled=True, max_size=4, max_wait=0.05)
+    prompts = ["frame 1", "frame 2", "frame 3 REJECT", "frame 4", "frame 5"]
+
+    async def run():
+        return await asyncio.gather(*(batcher.generate_image(client, p) for p in prompts))
+
+    images = asyncio.run(run())
+
+    assert all(len(image) == 2048 and image.startswith(b"\x89PNG") for image in images)
+    # One full batch of 4, then the lone 5th frame (after the window) goes out on its own
+    assert len(mock_app.state.batches) == 1
+    assert batcher.stats() == {"batches": 1, "batched": 3, "fallbacks": 1, "waiting": 0}
+    # batch submit + rejected frame + lone frame
+    assert mock_app.state.stats["requests"] == 3
+
+
+def test_failed_batch_falls_back_to_single_requests(make_gemini_client):
+    class FlakyBatchClient(GeminiClient):
+        in_flight = peak = 0
+
+        async def generate_batch(self, prompts, **kwargs):
+            raise httpx.ConnectError("batch endpoint down")
+
+        async def generate_image(self, prompt, **kwargs):
+            FlakyBatchClient.in_flight += 1
+            FlakyBatchClient.peak = max(FlakyBatchClient.peak, FlakyBatchClient.in_flight)
+            try:
+                await asyncio.sleep(0.01)
+                return await super().generate_image(prompt, **kwargs)
+            finally:
+                FlakyBatchClient.in_flight -= 1
+
+    mock_app = create_app(MockProfile(latency_ms=0, image_bytes=1024))
+    client = make_gemini_client(httpx.ASGITransport(app=mock_app), FlakyBatchClient)
+    batcher = GeminiBatcher(enabled=True, max_size=8, max_wait=0.01)
+
+    async def run():
+        semaphore = asyncio.Semaphore(2)
+        return await asyncio.gather(*(batcher.generate_image(client, f"shot {i}", semaphore) for i in range(5)))
+
+    images = asyncio.run(run())
+    assert [len(image) for image in images] == [1024] * 5
+    assert batcher.stats()["fallbacks"] == 5
+    assert mock_app.state.stats["requests"] == 5
+    # The fallbacks share the caller's concurrency cap
+    assert FlakyBatchClient.peak == 2
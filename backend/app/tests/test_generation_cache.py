@@ -0,0 +1,77 @@
+import asyncio
+import os
+
+from app.services.file_storage import FileStorageService
+from app.services.generation_cache import GenerationCache, make_cache_key
+
+
+def test_cache_key_is_content_addressed():
+    key = make_cache_key("model-a", "prompt", {"temperature": 0.9})
+    assert key == make_cache_key("model-a", "prompt", {"temperature": 0.9})
+    assert key != make_cache_key("model-b", "prompt", {"temperature": 0.9})
+    assert key != make_cache_key("model-a", "prompt", {"temperature": 0.5})
+    assert key != make_cache_key("model-a", "prompt", {"temperature": 0.9}, image_hash="abc")
+
+
+def test_hit_miss_bypass_and_hardlink(tmp_path):
+    cache = GenerationCache(cache_dir=str(tmp_path / "cache"), max_bytes=1024, enabled=True)
+    storage = FileStorageService(base_dir=str(tmp_path / "out"))
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        return b"image-bytes"
+
+    async def run():
+        first = await cache.get_or_generate("k1", generate)
+        second = await cache.get_or_generate("k1", generate)
+        third = await cache.get_or_generate("k1", generate, bypass=True)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert not first.hit and second.hit and not third.hit
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+
+    path = asyncio.run(second.save_to(storage, "P", "S1", "1", "S1_1_start.png"))
+    assert os.path.samefile(path, second.path)
+
+    # Overwriting the output must not modify the cached blob
+    storage.save_file(b"other", "P", "S1", "1", "S1_1_start.png")
+    with open(second.path, "rb") as f:
+        assert f.read() == b"image-bytes"
+
+
+def test_lru_eviction(tmp_path):
+    cache = GenerationCache(cache_dir=str(tmp_path), max_bytes=20, enabled=True)
+    cache.put("aa1", b"x" * 8)
+    cache.put("aa2", b"x" * 8)
+    assert cache.get("aa1")  # aa1 becomes most recently used
+    cache.put("aa3", b"x" * 8)
+
+    assert cache.get("aa2") is None
+    assert cache.get("aa1") and cache.get("aa3")
+    assert cache.stats()["evictions"] == 1
+
+    # Index is rebuilt from disk on restart
+    reloaded = GenerationCache(cache_dir=str(tmp_path), max_bytes=20, enabled=True)
+    # stats() never walks the directory; stats_async loads the index off the event loop
+    assert reloaded.stats()["entries"] is None
+    assert asyncio.run(reloaded.stats_async())["entries"] == 2
+
+
+def test_hit_leaves_linked_outputs_untouched(tmp_path):
+    cache = GenerationCache(cache_dir=str(tmp_path), max_bytes=20, enabled=True)
+    first = cache.put("aa1", b"x" * 8)
+    second = cache.put("aa2", b"x" * 8)
+    os.utime(first, (1000, 1000))
+    os.utime(second, (2000, 2000))
+    assert asyncio.run(cache.get_async("aa1")) == first
+    # The access time goes to a sidecar, so outputs hardlinked to the blob keep their mtime
+    assert os.stat(first).st_mtime == 1000
+
+    # ... and still counts for LRU order after a restart
+    reloaded = GenerationCache(cache_dir=str(tmp_path), max_bytes=20, enabled=True)
+    reloaded.put("aa3", b"x" * 8)
+    assert reloaded.get("aa2") is None
+    assert reloaded.get("aa1") and not os.path.exists(os.path.join(str(tmp_path), "aa", "aa2.used"))
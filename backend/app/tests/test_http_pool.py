@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+
+from main import app
+from app.api.deps import get_file_storage
+from app.services.file_storage import FileStorageService
+from app.services.http_pool import http_pool
+
+
+def test_pool_lifecycle_and_injection(tmp_path):
+    app.dependency_overrides[get_file_storage] = lambda: FileStorageService(base_dir=str(tmp_path))
+    try:
+        with TestClient(app) as client:
+            # Lifespan opened one shared client per upstream
+            gemini_pool = http_pool.gemini
+            assert gemini_pool is not None
+            assert http_pool.veo is not None
+
+            for frame in ("start", "end"):
+                resp = client.post("/api/generate-image", json={
+                    "project_name": "PoolTest",
+                    "scene_id": "S1",
+                    "shot_id": "1.1",
+                    "prompt": "test",
+                    "frame_type": frame,
+                })
+                assert resp.status_code == 200
+                # Requests reuse the same pooled client
+                assert http_pool.gemini is gemini_pool
+
+        # Lifespan shutdown closed the pools
+        assert http_pool.gemini is None
+        assert http_pool.veo is None
+        assert gemini_pool.is_closed
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,85 @@
+import asyncio
+import base64
+import json
+import os
+
+import httpx
+import pytest
+from loguru import logger
+
+from app.utils.streaming import DecodeBuffer, describe_json
+
+
+class ChunkedBody(httpx.AsyncByteStream):
+    def __init__(self, body: bytes, chunk_size: int = 1000):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    async def __aiter__(self):
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+
+def body_transport(body: bytes, with_length: bool = True) -> httpx.MockTransport:
+    def handler(request):
+        headers = {"Content-Length": str(len(body))} if with_length else {}
+        return httpx.Response(200, headers=headers, stream=ChunkedBody(body))
+
+    return httpx.MockTransport(handler)
+
+
+def gemini_body(image: bytes) -> bytes:
+    encoded = base64.b64encode(image).decode()
+    return json.dumps({
+        "candidates": [{"content": {"parts": [
+            {"text": 'Here is "data": "not this"'},
+            {"inlineData": {"mimeType": "image/png", "data": encoded}},
+        ]}, "finishReason": "STOP"}],
+        "usageMetadata": {"totalTokenCount": 1290},
+    }).replace("/", "\\/").encode()  # escaped slashes, as some encoders emit
+
+
+def test_generate_image_decodes_streamed_inline_data(make_gemini_client):
+    image = os.urandom(50_000)
+
+    for with_length in (True, False):
+        assert asyncio.run(make_gemini_client(body_transport(gemini_body(image), with_length)).generate_image("p")) == image
+
+
+def test_stream_image_yields_incrementally(make_gemini_client):
+    image = os.urandom(50_000)
+
+    async def run():
+        return [chunk async for chunk in make_gemini_client(body_transport(gemini_body(image))).stream_image("p")]
+
+    chunks = asyncio.run(run())
+    assert len(chunks) > 10
+    assert b"".join(chunks) == image
+
+
+def test_missing_image_logs_structural_summary_only(make_gemini_client):
+    body = json.dumps({
+        "candidates": [{"finishReason": "SAFETY", "content": {"parts": [{"text": "x" * 100_000}]}}]
+    }).encode()
+    messages = []
+    sink = logger.add(messages.append, level="ERROR")
+    try:
+        with pytest.raises(ValueError, match="Could not extract image"):
+            asyncio.run(make_gemini_client(body_transport(body)).generate_image("p"))
+    finally:
+        logger.remove(sink)
+
+    assert messages
+    assert all(len(message) < 1000 for message in messages)
+    assert any("SAFETY" in message and "<str 100000 chars>" in message for message in messages)
+
+
+def test_decode_buffer_and_json_summary():
+    buffer = DecodeBuffer()
+    buffer.reserve(6)
+    for chunk in (b"abc", b"de", b"fgh"):
+        buffer.write(chunk)
+    assert buffer.getvalue() == b"abcdefgh"
+
+    summary = describe_json({"a": [1, 2, 3], "b": "y" * 500, "c": {"d": {"e": {"f": {"g": 1}}}}}, max_depth=3)
+    assert summary == "{'a': [1, ...2 more], 'b': <str 500 chars>, 'c': {'d': {'e': {...1 keys}}}}"
@@ -0,0 +1,137 @@
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from benchmarks.parser import synthetic_script
+from app.core.config import settings
+from app.services.json_parser import JSONParserService
+from app.services.json_stream import UploadFormatError
+from app.services.manifest import manifest_store, project_slug
+from app.services.project_registry import ProjectRegistry
+from app.services.prompt_processor import PromptProcessorService
+from app.models.schemas import ProjectData
+
+INPUT_JSON = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../../../input/Visual_Development_Prompts_Nano_Veo.json"
+))
+
+
+def load_bytes():
+    with open(INPUT_JSON, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096, 1 << 20])
+def test_stream_parser_matches_whole_document(chunk_size):
+    raw = load_bytes()
+    service = JSONParserService()
+    parser = service.create_stream_parser()
+    for i in range(0, len(raw), chunk_size):
+        parser.feed(raw[i:i + chunk_size])
+    project = service.build_project(parser.close())
+
+    data = json.loads(raw)
+    assert project.project == data["project"]
+    assert project.core_style == data["core_style"]
+    assert [s.scene_id for s in project.scenes] == [s["scene_id"] for s in data["scenes"]]
+    assert project.model_dump() == service.parse_project_json(INPUT_JSON).model_dump()
+
+
+
+def legacy_build_project(service, data):
+    """Reference: one model per scene, then prompts rewritten field by field on the models"""
+    project = ProjectData(
+        project=data["project"],
+        project_id=project_slug(data["project"]),
+        core_style=data.get("core_style", {}),
+        character_references=data.get("character_references", {}),
+        scenes=[service.build_scene(scene) for scene in data["scenes"]],
+    )
+    processor = PromptProcessorService(project.core_style, project.character_references)
+    for scene in project.scenes:
+        scene.project_id = project.project_id
+        for shot in scene.shots:
+            prompts = shot.nano_banana_pro_prompts
+            prompts.start = processor.process_prompt(prompts.start)
+            prompts.middle = processor.process_prompt(prompts.middle)
+            prompts.end = processor.process_prompt(prompts.end)
+            if shot.veo_3_1_prompt:
+                shot.veo_3_1_prompt = processor.process_prompt(shot.veo_3_1_prompt)
+    return project
+
+
+@pytest.mark.parametrize("shots", [None, 300])
+def test_one_pass_build_matches_per_model_build(shots):
+    raw = load_bytes() if shots is None else json.dumps(synthetic_script(shots)).encode("utf-8")
+    service = JSONParserService()
+    parser = service.create_stream_parser()
+    parser.feed(raw)
+    project = service.build_project(parser.close(), process_prompts=True)
+
+    expected = legacy_build_project(service, json.loads(raw))
+    assert project.model_dump() == expected.model_dump()
+
+def test_stream_parser_rejects_truncated_document():
+    service = JSONParserService()
+    parser = service.create_stream_parser()
+    parser.feed(load_bytes()[:-10])
+    with pytest.raises(UploadFormatError):
+        parser.close()
+
+
+def test_upload_multipart_and_raw_body(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest_store, "base_dir", str(tmp_path))
+    monkeypatch.setattr("main.project_registry", ProjectRegistry(base_dir=str(tmp_path / "projects")))
+    with TestClient(app) as client:
+        multipart = client.post("/api/upload-json", files={"file": ("script.json", load_bytes(), "application/json")})
+        raw = client.post("/api/upload-json", content=load_bytes(), headers={"Content-Type": "application/json"})
+        wrong_type = client.post("/api/upload-json", files={"file": ("script.txt", b"{}", "text/plain")})
+
+    assert multipart.status_code == 200
+    # Uploads are diffed against what was generated, so nothing changes until a batch runs
+    first_changes, second_changes = multipart.json().pop("changes"), raw.json().pop("changes")
+    assert first_changes["unchanged"] == [] and len(first_changes["new"]) > 0
+    assert second_changes == first_changes
+    assert {**multipart.json(), "changes": None} == {**raw.json(), "changes": None}
+    assert "[Universal Style Block]" not in json.dumps(multipart.json()["scenes"])
+    assert wrong_type.status_code == 400
+
+
+@pytest.mark.parametrize("body", [
+    b'{"project": "P", "scenes": [',
+    b'{"project": "P", "scenes": {"S1": {}}}',
+    b'{"project": "P", "scenes": ["S1"]}',
+    b'{"project": "P", "scenes": [{"scene_id": "S1", "shots": [{"shot_id": "1", "nano_banana_pro_prompts": ["start"]}]}]}',
+    b'{"project": "P", "core_style": "noir", "scenes": []}',
+    b'{"project": "P", "scenes": [{"scene_id": 1, "shots": []}]}',
+    b'\xff\xfe{}',
+])
+def test_malformed_upload_is_rejected_with_400(tmp_path, monkeypatch, body):
+    monkeypatch.setattr("main.project_registry", ProjectRegistry(base_dir=str(tmp_path / "projects")))
+    with TestClient(app) as client:
+        resp = client.post("/api/upload-json", content=body, headers={"Content-Type": "application/json"})
+    assert resp.status_code == 400
+    assert "Invalid" in resp.json()["detail"]
+
+
+def test_upload_size_limit(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+    with TestClient(app) as client:
+        resp = client.post("/api/upload-json", files={"file": ("script.json", load_bytes(), "application/json")})
+    assert resp.status_code == 413
+
+
+def test_stream_parser_rejects_syntax_error_before_eof():
+    service = JSONParserService()
+    parser = service.create_stream_parser()
+    filler = json.dumps({"scene_id": "S1", "shots": []}).encode("utf-8") + b", "
+    fed = 0
+    with pytest.raises(UploadFormatError, match="delimiter"):
+        parser.feed(b'{"project": "broken", "core_style": {"look" "noir", ')
+        for fed in range(100000):
+            parser.feed(filler)
+    # Reported while the upload is still arriving, not once all of it is buffered
+    assert fed < 10
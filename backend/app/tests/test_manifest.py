@@ -0,0 +1,91 @@
+import copy
+import json
+import os
+
+from app.models.schemas import GenerationJob
+from app.services.json_parser import JSONParserService
+from app.services.manifest import ManifestStore, diff_manifests
+from app.services.task_store import TaskStore
+
+INPUT_JSON = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../../../input/Visual_Development_Prompts_Nano_Veo.json"
+))
+
+
+def build_manifest(raw: dict):
+    service = JSONParserService()
+    parser = service.create_stream_parser()
+    parser.feed(json.dumps(raw).encode())
+    project = service.process_all_prompts(service.build_project(parser.close()))
+    return service.build_manifest(project)
+
+
+def test_reference_and_style_edits_only_invalidate_shots_that_use_them(tmp_path):
+    with open(INPUT_JSON, encoding="utf-8") as f:
+        raw = json.load(f)
+    store = ManifestStore(str(tmp_path))
+    store.save(build_manifest(raw))
+    previous = store.load(raw["project"])
+
+    edited = copy.deepcopy(raw)
+    edited["character_references"]["murata"] += " (revised)"
+    diff = diff_manifests(previous, build_manifest(edited))
+    assert [c.shot_id for c in diff.stale] == ["0:10", "4:05"]
+    assert len(diff.unchanged) == len(previous.shots) - 2
+    assert diff.new == [] and diff.removed == []
+
+    edited = copy.deepcopy(raw)
+    edited["core_style"]["video_style_block"]["revision"] = "2"
+    diff = diff_manifests(previous, build_manifest(edited))
+    assert len(diff.stale) == len(previous.shots)
+    assert {frame for change in diff.stale for frame in change.frames} == {"video"}
+
+    edited = copy.deepcopy(raw)
+    removed_shot = edited["scenes"][0]["shots"].pop(0)
+    edited["scenes"][0]["shots"].append({**removed_shot, "shot_id": "9:99"})
+    diff = diff_manifests(previous, build_manifest(edited))
+    assert [c.shot_id for c in diff.new] == ["9:99"]
+    assert [c.shot_id for c in diff.removed] == [removed_shot["shot_id"]]
+    assert diff.stale == []
+
+
+def test_split_unchanged_skips_completed_frames_with_same_prompt(tmp_path):
+    output = tmp_path / "S1_1_start.png"
+    output.write_bytes(b"png")
+    jobs = [
+        GenerationJob(scene_id="S1", shot_id="1", frame_type="start", prompt="same"),
+        GenerationJob(scene_id="S1", shot_id="1", frame_type="end", prompt="old"),
+    ]
+    store = TaskStore(str(tmp_path / "tasks.db"))
+    store.enqueue("b1", "p1", "Demo", jobs)
+    store.mark_completed("Demo", jobs[0], str(output))
+    store.mark_completed("Demo", jobs[1], str(output))
+
+    edited = [jobs[0], jobs[1].model_copy(update={"prompt": "new"})]
+    changed, skipped = store.split_unchanged("Demo", edited)
+    assert [j.frame_type for j in changed] == ["end"] and skipped == 1
+
+    output.unlink()
+    changed, skipped = store.split_unchanged("Demo", edited)
+    assert len(changed) == 2 and skipped == 0
+    store.close()
+
+
+def test_split_unchanged_reruns_video_when_only_its_start_frame_changes(tmp_path):
+    output = tmp_path / "out.bin"
+    output.write_bytes(b"data")
+    jobs = [
+        GenerationJob(scene_id="S1", shot_id=shot, frame_type=frame, prompt=f"{shot}-{frame}")
+        for shot in ("1", "2") for frame in ("start", "end", "video")
+    ]
+    store = TaskStore(str(tmp_path / "tasks.db"))
+    store.enqueue("b1", "p1", "Demo", jobs)
+    for job in jobs:
+        store.mark_completed("Demo", job, str(output))
+
+    # Only shot 1's start prompt changed: its video was conditioned on the old frame
+    edited = [jobs[0].model_copy(update={"prompt": "1-start (revised)"})] + jobs[1:]
+    changed, skipped = store.split_unchanged("Demo", edited)
+    assert [(j.shot_id, j.frame_type) for j in changed] == [("1", "start"), ("1", "video")]
+    assert skipped == 4
+    store.close()
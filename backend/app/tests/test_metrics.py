@@ -0,0 +1,91 @@
+import asyncio
+import os
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.mock.upstream import MockProfile, create_app
+from app.services.file_storage import FileStorageService
+from app.services.generation_cache import GenerationCache
+from app.services.manifest import manifest_store
+from app.services.metrics import STAGE_SECONDS, MetricsRegistry, upstream_outcome
+from app.services.project_registry import ProjectRegistry
+from main import app
+
+INPUT_JSON = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../../../input/Visual_Development_Prompts_Nano_Veo.json"
+))
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry(enabled=True)
+    histogram = registry.histogram("demo_seconds", "Demo", ("stage",), buckets=(0.1, 1.0))
+    counter = registry.counter("demo_total", "Demo counter", ("target",))
+
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, stage="parse")
+    counter.inc(10, target="output")
+    counter.inc(5, target="output")
+
+    text = registry.render()
+    assert 's2iv_demo_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 's2iv_demo_seconds_bucket{stage="parse",le="1"} 3' in text
+    assert 's2iv_demo_seconds_bucket{stage="parse",le="+Inf"} 4' in text
+    assert 's2iv_demo_seconds_count{stage="parse"} 4' in text
+    assert 's2iv_demo_total{target="output"} 15' in text
+    assert "# TYPE s2iv_demo_seconds histogram" in text
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    histogram = registry.histogram("off_seconds", "Off")
+    with histogram.time():
+        pass
+    assert histogram.count() == 0
+
+
+def test_upstream_outcome_labels():
+    assert upstream_outcome(None, 200) == "2xx"
+    assert upstream_outcome(None, 429) == "429"
+    assert upstream_outcome(None, 503) == "5xx"
+    assert upstream_outcome(TimeoutError()) == "timeout"
+    assert upstream_outcome(ValueError()) == "error"
+
+
+def test_metrics_endpoint_reports_stages_and_routes(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest_store, "base_dir", str(tmp_path))
+    monkeypatch.setattr("main.project_registry", ProjectRegistry(base_dir=str(tmp_path / "projects")))
+    with open(INPUT_JSON, "rb") as f:
+        raw = f.read()
+
+    with TestClient(app) as client:
+        assert client.post("/api/upload-json", content=raw, headers={"Content-Type": "application/json"}).status_code == 200
+        response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 's2iv_stage_duration_seconds_count{stage="process_all_prompts"}' in text
+    assert 's2iv_stage_duration_seconds_count{stage="parse_upload"}' in text
+    assert 'route="/api/upload-json",status="200"' in text
+    assert "s2iv_cache_hits_total" in text
+    assert "# TYPE s2iv_circuit_breaker_open gauge" in text
+
+
+def test_streaming_generation_observes_extract_and_write_stages(tmp_path, make_gemini_client):
+    client = make_gemini_client(httpx.ASGITransport(app=create_app(MockProfile(latency_ms=0, image_bytes=4096))))
+    storage = FileStorageService(base_dir=str(tmp_path / "out"))
+    cache = GenerationCache(cache_dir=str(tmp_path / "cache"), enabled=True)
+    stages = ("extract_image_data", "decode_image", "save_file", "save_cache_blob", "link_file")
+    before = {stage: STAGE_SECONDS.count(stage=stage) for stage in stages}
+
+    async def run():
+        await storage.save_stream(client.stream_image("frame"), "P", "S1", "1", "S1_1_start.png")
+        blob = await cache.get_or_stream("k1", lambda: client.stream_image("frame"))
+        await blob.save_to(storage, "P", "S1", "1", "S1_1_end.png")
+
+    asyncio.run(run())
+    # The paths every generated frame takes, not only the buffered fallbacks
+    assert {stage: STAGE_SECONDS.count(stage=stage) - before[stage] for stage in stages} == {
+        "extract_image_data": 2, "decode_image": 2, "save_file": 1, "save_cache_blob": 1, "link_file": 1,
+    }
@@ -0,0 +1,40 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.mock.upstream import MockProfile, create_app
+from benchmarks.load import percentile
+
+
+def test_gemini_client_against_mock_upstream(make_gemini_client):
+    mock_app = create_app(MockProfile(latency_ms=0, image_bytes=4096, seed=1))
+
+    image = asyncio.run(make_gemini_client(httpx.ASGITransport(app=mock_app)).generate_image("a lighthouse at dusk"))
+
+    assert len(image) == 4096
+    assert image.startswith(b"\x89PNG")
+    assert mock_app.state.stats["requests"] == 1
+
+
+def test_mock_upstream_injects_throttling_and_errors(make_gemini_client):
+    throttling = create_app(MockProfile(latency_ms=0, error_rate_429=1.0, retry_after=7))
+    with pytest.raises(httpx.HTTPStatusError) as exc:
+        asyncio.run(make_gemini_client(httpx.ASGITransport(app=throttling)).generate_image("p"))
+    assert exc.value.response.status_code == 429
+    assert exc.value.response.headers["Retry-After"] == "7"
+
+    failing = create_app(MockProfile(latency_ms=0, error_rate_5xx=1.0, error_status=503))
+    with pytest.raises(httpx.HTTPStatusError) as exc:
+        asyncio.run(make_gemini_client(httpx.ASGITransport(app=failing)).generate_image("p"))
+    assert exc.value.response.status_code == 503
+    assert failing.state.stats == {"requests": 1, "throttled": 0, "errors": 1}
+
+
+def test_benchmark_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) is None
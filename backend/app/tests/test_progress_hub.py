@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from app.services.batch_scheduler import BatchScheduler
+from app.services.file_storage import FileStorageService
+from app.services.manifest import ManifestStore, project_slug
+from app.services.progress_hub import ProgressHub, task_update
+from app.services.task_store import TaskStore
+from app.services.veo_jobs import VeoJobManager
+from app.tests.test_batch_scheduler import FakeUpstream, make_project
+
+DEMO_ID = project_slug("Demo")
+
+
+def test_slow_subscriber_gets_latest_state_per_task():
+    async def run():
+        hub = ProgressHub(max_pending=2)
+        subscriber = hub.subscribe(DEMO_ID)
+        for state in ("queued", "running", "completed"):
+            hub.publish(task_update("Demo", "S1", "1", "start", state))
+        hub.publish(task_update("Demo", "S1", "1", "end", "queued"))
+        batch = await subscriber.next_batch(timeout=0.1)
+
+        # A third distinct pending task exceeds max_pending
+        for frame in ("start", "middle", "end"):
+            hub.publish(task_update("Demo", "S1", "2", frame, "queued"))
+        overflowed = subscriber.overflowed
+
+        # Late subscribers are primed with the latest snapshot
+        late = hub.subscribe(DEMO_ID)
+        primed = await late.next_batch(timeout=0.1)
+        hub.unsubscribe(DEMO_ID, subscriber)
+        hub.unsubscribe(DEMO_ID, late)
+        return batch, subscriber.coalesced, overflowed, primed, hub.stats()
+
+    batch, coalesced, overflowed, primed, stats = asyncio.run(run())
+    states = [(u["task_id"], u["status"]) for u in map(json.loads, batch)]
+    assert states == [("S1-1-start", "completed"), ("S1-1-end", "queued")]
+    assert coalesced == 2
+    assert overflowed
+    assert len(primed) == 5
+    assert stats == {}
+
+
+def test_batch_publishes_frame_updates(tmp_path):
+    async def run():
+        hub = ProgressHub()
+        subscriber = hub.subscribe(project_slug("BatchTest"))
+        upstream = FakeUpstream()
+        scheduler = BatchScheduler(
+            jobs=VeoJobManager(hub=hub), store=TaskStore(str(tmp_path / "tasks.db")), hub=hub,
+            manifests=ManifestStore(str(tmp_path / "manifests"))
+        )
+        storage = FileStorageService(base_dir=str(tmp_path / "output"))
+        status = scheduler.submit("p1", make_project(2), upstream, upstream, storage)
+        await scheduler._runners[status.task_id]
+        return [json.loads(data) for data in await subscriber.next_batch(timeout=0.1)]
+
+    updates = {u["task_id"]: u for u in asyncio.run(run())}
+    assert len(updates) == 8
+    assert {u["status"] for u in updates.values()} == {"completed"}
+    # Versioned with the content hash (?v=...) so the browser may cache it as immutable
+    url, _, version = updates["S1-0-video"]["result"]["file"]["file_url"].partition("?v=")
+    assert url.endswith("S1_0_video.mp4")
+    assert len(version) == 16
@@ -0,0 +1,81 @@
+import hashlib
+import os
+
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_project_registry
+from app.services.json_parser import JSONParserService
+from app.services.manifest import manifest_store
+from app.services.project_registry import ProjectRegistry
+from main import app
+
+INPUT_JSON = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../../../input/Visual_Development_Prompts_Nano_Veo.json"
+))
+
+
+def test_registry_survives_restart_and_bounds_memory(tmp_path):
+    service = JSONParserService()
+    project = service.process_all_prompts(service.parse_project_json(INPUT_JSON))
+    manifest = service.build_manifest(project)
+
+    registry = ProjectRegistry(base_dir=str(tmp_path), max_entries=1)
+    registry.put("a" * 64, project, manifest)
+    registry.put("b" * 64, project, manifest)
+    assert registry.stats()["entries"] == 1
+
+    restarted = ProjectRegistry(base_dir=str(tmp_path))
+    reloaded = restarted.get_project(project.project_id)
+    assert reloaded.project.content_hash == "b" * 64
+    assert reloaded.project.model_dump(exclude={"content_hash"}) == project.model_dump(exclude={"content_hash"})
+    assert restarted.get("a" * 64) is not None
+    assert restarted.get("c" * 64) is None
+    assert restarted.get_project("../../etc") is None
+
+
+def test_reupload_is_memoized_and_project_is_fetchable(tmp_path, monkeypatch):
+    registry = ProjectRegistry(base_dir=str(tmp_path / "projects"))
+    monkeypatch.setattr(manifest_store, "base_dir", str(tmp_path / "manifests"))
+    monkeypatch.setattr("main.project_registry", registry)
+    monkeypatch.setattr(JSONParserService, "process_scene_prompts", counting(JSONParserService.process_scene_prompts))
+    app.dependency_overrides[get_project_registry] = lambda: registry
+    with open(INPUT_JSON, "rb") as f:
+        raw = f.read()
+    content_hash = hashlib.sha256(raw).hexdigest()
+
+    try:
+        with TestClient(app) as client:
+            first = client.post("/api/upload-json", content=raw, headers={"Content-Type": "application/json"}).json()
+            second = client.post("/api/upload-json", content=raw, headers={"Content-Type": "application/json"}).json()
+            # Known hash: answered without reading the body
+            by_hash = client.post(f"/api/upload-json?content_hash={content_hash}", content=b"").json()
+
+            project_id = first["project_id"]
+            fetched = client.get(f"/api/projects/{project_id}")
+            scene = first["scenes"][0]
+            shot = scene["shots"][0]
+            shot_response = client.get(f"/api/projects/{project_id}/shots/{shot['shot_id']}",
+                                       params={"scene_id": scene["scene_id"]})
+            missing = client.get("/api/projects/unknown-project")
+            other_id = client.post("/api/projects/other-project/generate", json=first)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert JSONParserService.process_scene_prompts.calls == 1
+    assert first["content_hash"] == second["content_hash"] == by_hash["content_hash"] == content_hash
+    assert all(s["project_id"] == project_id for s in first["scenes"])
+    assert second["changes"] == first["changes"]
+    assert fetched.status_code == 200
+    assert {**fetched.json(), "changes": None} == {**first, "changes": None}
+    assert shot_response.json() == shot
+    assert missing.status_code == 404
+    # One project's body posted under another project's id
+    assert other_id.status_code == 409
+
+
+def counting(func):
+    def wrapper(*args, **kwargs):
+        wrapper.calls += 1
+        return func(*args, **kwargs)
+    wrapper.calls = 0
+    return wrapper
@@ -0,0 +1,86 @@
+import json
+import os
+import random
+import re
+
+from app.services.prompt_processor import PromptProcessorService
+
+INPUT_JSON = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../../../input/Visual_Development_Prompts_Nano_Veo.json"
+))
+
+
+def legacy_process_prompt(processor, prompt):
+    """Reference implementation: the per-key regex passes the compiled engine replaced"""
+    if not prompt:
+        return ""
+    for key, value in processor.style_blocks.items():
+        prompt = re.compile(re.escape(f"[{key}]"), re.IGNORECASE).sub(value, prompt)
+        if "_" in key:
+            alt_key = key.replace("_", " ")
+            prompt = re.compile(re.escape(f"[{alt_key}]"), re.IGNORECASE).sub(value, prompt)
+
+    def replace_match(match):
+        ref_name = match.group(1).strip()
+        if ref_name in processor.character_references:
+            return processor.character_references[ref_name]
+        ref_lower = ref_name.lower().replace(" ", "_")
+        if ref_lower in processor.character_references:
+            return processor.character_references[ref_lower]
+        return match.group(0)
+
+    return re.sub(r'\(\[Ref:\s*([^\]]+)\]\)', replace_match, prompt)
+
+
+def test_matches_legacy_on_sample_script():
+    with open(INPUT_JSON, encoding="utf-8") as f:
+        data = json.load(f)
+    processor = PromptProcessorService(data["core_style"], data["character_references"])
+
+    for scene in data["scenes"]:
+        for shot in scene["shots"]:
+            prompts = [p["prompt"] for p in shot["nano_banana_pro_prompts"]] + [shot["veo_3_1_prompt"]]
+            for prompt in prompts:
+                assert processor.process_prompt(prompt) == legacy_process_prompt(processor, prompt)
+
+
+def test_matches_legacy_on_edge_cases():
+    core_style = {
+        "universal_style_block": {"art": "charcoal", "ref": "([Ref: Murata])"},
+        "video_style_block": {"motion": "12fps [Lighting]"},
+        "lighting": "noir",
+        "Video Style Block": "shadowed by a later duplicate",
+        "escaped": "back\\\\slash",
+    }
+    refs = {"murata": "a soldier", "Liu Decai": "the leader"}
+    processor = PromptProcessorService(core_style, refs)
+
+    pieces = [
+        "[Universal Style Block]", "[universal_style_block]", "[UNIVERSAL STYLE BLOCK]",
+        "[Video Style Block]", "[video_style_block]", "[lighting]", "[Escaped]", "[unknown]",
+        "([Ref: Murata])", "([Ref:  Liu Decai ])", "([Ref: Nobody])", "([Ref: liu_decai])",
+        "plain text", " ", "[", "]", "(",
+    ]
+    rng = random.Random(42)
+    for _ in range(500):
+        prompt = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 8)))
+        assert processor.process_prompt(prompt) == legacy_process_prompt(processor, prompt), prompt
+
+
+def test_without_style_blocks():
+    processor = PromptProcessorService(None, {"murata": "a soldier"})
+    assert processor.process_prompt("([Ref: Murata]) [Universal Style Block]") == "a soldier [Universal Style Block]"
+    assert processor.process_prompt("") == ""
+
+
+def test_matches_legacy_when_substitutions_form_new_placeholders():
+    # A style value completes a reference around it
+    processor = PromptProcessorService({"lighting": "murata"}, {"murata": "a soldier"})
+    assert processor.process_prompt("([Ref: [lighting]])") == "a soldier"
+    # A style value and the text after it form a later key's placeholder
+    processor = PromptProcessorService({"a": "[b", "b_c": "X"}, {})
+    assert processor.process_prompt("[a]_c]") == "X"
+    # Same across a placeholder nested in brackets, without brackets in any value
+    processor = PromptProcessorService({"a": "b", "x b y": "Z"}, {})
+    for prompt in ("[x [a] y]", "([Ref: [a]])", "[A] [X B Y]"):
+        assert processor.process_prompt(prompt) == legacy_process_prompt(processor, prompt), prompt
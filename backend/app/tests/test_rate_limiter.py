@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services.gemini_client import GeminiClient
+from app.services.rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from app.services.resilience import RetryPolicy
+
+
+def throttled_error(status=429, retry_after="0"):
+    request = httpx.Request("POST", "https://upstream.test")
+    response = httpx.Response(status, headers={"Retry-After": retry_after}, request=request)
+    return httpx.HTTPStatusError("throttled", request=request, response=response)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3", 5.0) == 3.0
+    assert parse_retry_after(None, 5.0) == 5.0
+    assert parse_retry_after("soon", 5.0) == 5.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", 5.0) == 0.0
+
+
+def test_concurrency_cap_and_token_pacing():
+    limiter = AdaptiveRateLimiter("test", rate=50.0, burst=2, max_concurrency=2, enabled=True)
+    state = {"in_flight": 0, "peak": 0}
+
+    async def call():
+        async with limiter.limit():
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            await asyncio.sleep(0.01)
+            state["in_flight"] -= 1
+
+    async def run():
+        started = time.monotonic()
+        await asyncio.gather(*(call() for _ in range(6)))
+        return time.monotonic() - started
+
+    elapsed = asyncio.run(run())
+    assert state["peak"] == 2
+    # Burst of 2, then 4 more tokens at 50/s
+    assert elapsed >= 4 / 50 - 0.01
+    assert limiter.in_flight == 0 and limiter.successes == 6
+
+
+def test_aimd_decreases_once_per_round_and_recovers_slowly():
+    limiter = AdaptiveRateLimiter("test", rate=0, burst=1, max_concurrency=8, enabled=True)
+
+    async def throttled_call():
+        async with limiter.limit():
+            await asyncio.sleep(0.01)
+            raise throttled_error()
+
+    async def run():
+        # Four concurrent 429s from the same round only halve the limit once
+        await asyncio.gather(*(throttled_call() for _ in range(4)), return_exceptions=True)
+
+    asyncio.run(run())
+    assert limiter.throttled == 4
+    assert limiter.stats()["concurrency_limit"] == 4
+
+    # Additive increase: +1/limit per success, so about one full round per step
+    for _ in range(5):
+        limiter.on_success()
+    assert limiter.stats()["concurrency_limit"] == 5
+
+
+def test_client_reports_throttling_to_its_limiter():
+    def handler(request):
+        return httpx.Response(429, headers={"Retry-After": "0"})
+
+    client = GeminiClient(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    client.api_key, client.base_url = "key", "https://upstream.test"
+    client.limiter = AdaptiveRateLimiter("models/test", rate=0, burst=1, max_concurrency=4, enabled=True)
+    client.retry_policy = RetryPolicy(max_attempts=1)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.generate_image("prompt"))
+    assert client.limiter.throttled == 1
+    assert client.limiter.stats()["concurrency_limit"] == 2
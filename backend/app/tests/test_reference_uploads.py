@@ -0,0 +1,82 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.api.deps import get_file_storage
+from app.core.config import settings
+from app.mock.veo_operations import create_app
+from app.services.file_hashes import file_hashes
+from app.services.file_storage import FileStorageService
+from app.services.generation_cache import GenerationCache
+from app.services.rate_limiter import AdaptiveRateLimiter
+from app.services.reference_uploads import ReferenceUploadCache
+from app.services.veo_client import VeoClient
+from app.services.veo_jobs import VeoJobManager
+from main import app
+
+
+def make_client(mock_app) -> VeoClient:
+    client = VeoClient(http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_app)))
+    client.api_key = "mock"
+    client.base_url = "http://mock-veo"
+    client.limiter = AdaptiveRateLimiter(client.model, rate=0, burst=1, enabled=False)
+    return client
+
+
+def test_start_frame_is_uploaded_once_and_conditions_the_video(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VEO_POLL_INITIAL_INTERVAL", 0.01)
+    mock_app = create_app(polls_until_done=1)
+    frame = tmp_path / "S1_1_start.png"
+    Image.new("RGB", (64, 36), (10, 20, 30)).save(frame)
+    uploads_path = str(tmp_path / "data" / "reference_uploads.json")
+
+    async def run():
+        uploads = ReferenceUploadCache(path=uploads_path)
+        manager = VeoJobManager(cache=GenerationCache(cache_dir=str(tmp_path / "cache"), enabled=True), uploads=uploads)
+        client = make_client(mock_app)
+        storage = FileStorageService(base_dir=str(tmp_path / "out"))
+        # Two takes of the same shot submitted together, plus the same prompt without a start frame
+        takes = await asyncio.gather(*(
+            manager.submit(client, storage, f"take {n}", "P", "S1", "1", f"S1_1_video_{n}.mp4", start_image_path=str(frame))
+            for n in (1, 2)
+        ))
+        plain = await manager.submit(client, storage, "take 1", "P", "S1", "1", "S1_1_plain.mp4")
+        finals = [await manager.wait(s.task_id) for s in (*takes, plain)]
+        # A re-run of take 1 is a cache hit keyed on prompt + start frame hash
+        again = await manager.submit(client, storage, "take 1", "P", "S1", "1", "S1_1_again.mp4",
+                                     start_image_path=str(frame))
+        await manager.shutdown()
+        return uploads, finals, again
+
+    _, finals, again = asyncio.run(run())
+
+    assert [s.status for s in finals] == ["completed"] * 3
+    assert again.result["cache_hit"]
+    assert len(mock_app.state.uploads) == 1
+    image_urls = sorted(str(op["image_url"]) for op in mock_app.state.operations.values())
+    uploaded_uri = f"http://mock-veo/files/{next(iter(mock_app.state.uploads))}"
+    assert image_urls == sorted([uploaded_uri, uploaded_uri, "None"])
+
+    # Known across restarts; re-uploaded once the upstream copy is close to expiring
+    async def reuse(refresh_margin):
+        cache = ReferenceUploadCache(path=uploads_path, refresh_margin=refresh_margin)
+        return await cache.get_url(make_client(mock_app), str(frame), file_hashes.digest(str(frame)))
+
+    assert asyncio.run(reuse(0)) == uploaded_uri
+    assert asyncio.run(reuse(49 * 3600)) != uploaded_uri
+    assert len(mock_app.state.uploads) == 2
+
+
+def test_generate_video_rejects_start_frames_outside_the_output_tree(tmp_path):
+    storage = FileStorageService(base_dir=str(tmp_path / "output"))
+    app.dependency_overrides[get_file_storage] = lambda: storage
+    body = {"project_name": "P", "scene_id": "S1", "shot_id": "1", "prompt": "p"}
+    try:
+        with TestClient(app) as client:
+            for path in ("../secret.png", "P/S1/1/missing.png"):
+                response = client.post("/api/generate-video", json={**body, "start_image_path": path})
+                assert response.status_code == 400
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,94 @@
+import asyncio
+import base64
+
+import httpx
+import pytest
+
+from app.services.gemini_client import GeminiClient
+from app.services.rate_limiter import AdaptiveRateLimiter
+from app.services.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, is_retryable
+
+
+def status_error(status):
+    request = httpx.Request("POST", "https://upstream.test")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+def make_gemini(handler, breaker, attempts=3) -> GeminiClient:
+    client = GeminiClient(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    client.api_key, client.base_url = "key", "https://upstream.test"
+    client.limiter = AdaptiveRateLimiter(client.model, rate=0, burst=1, enabled=False)
+    client.breaker = breaker
+    client.retry_policy = RetryPolicy(max_attempts=attempts, base_delay=0.001, max_delay=0.005)
+    return client
+
+
+def test_retryable_classification():
+    assert is_retryable(status_error(503))
+    assert not is_retryable(status_error(400))
+    assert is_retryable(httpx.ReadTimeout("slow"))
+    # Submissions that may have been accepted are not retried
+    assert not is_retryable(status_error(500), idempotent=False)
+    assert not is_retryable(httpx.ReadTimeout("slow"), idempotent=False)
+    assert is_retryable(httpx.ConnectError("refused"), idempotent=False)
+    assert is_retryable(status_error(429), idempotent=False)
+
+
+def test_decorrelated_jitter_stays_within_bounds():
+    policy = RetryPolicy(base_delay=0.5, max_delay=4.0)
+    delay = policy.base_delay
+    for _ in range(20):
+        delay = policy.next_delay(delay)
+        assert 0.5 <= delay <= 4.0
+
+
+def test_transient_failure_is_retried():
+    calls = []
+    png = b"\x89PNG"
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"candidates": [{"content": {"parts": [
+            {"inline_data": {"data": base64.b64encode(png).decode()}}
+        ]}}]})
+
+    breaker = CircuitBreaker("gemini-test", failure_threshold=5, reset_timeout=60)
+    client = make_gemini(handler, breaker)
+    assert asyncio.run(client.generate_image("prompt")) == png
+    assert len(calls) == 3
+    assert breaker.state == "closed" and breaker.consecutive_failures == 0
+
+
+def test_breaker_opens_and_fails_fast():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500)
+
+    breaker = CircuitBreaker("gemini-test", failure_threshold=2, reset_timeout=60)
+    client = make_gemini(handler, breaker, attempts=5)
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(client.generate_image("prompt"))
+    assert len(calls) == 2
+    assert breaker.stats()["state"] == "open"
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(client.generate_image("prompt"))
+    assert len(calls) == 2 and breaker.rejected == 2
+
+
+def test_half_open_probe_closes_circuit():
+    breaker = CircuitBreaker("probe", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    asyncio.run(asyncio.sleep(0.02))
+    breaker.allow()  # the single probe
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
@@ -0,0 +1,140 @@
+import asyncio
+
+import httpx
+
+from app.api.deps import get_file_storage, get_flights, get_gemini_client, get_generation_cache
+from app.core.config import settings
+from app.mock.veo_operations import create_app as create_veo_app
+from app.services.file_storage import FileStorageService
+from app.services.generation_cache import GenerationCache
+from app.services.rate_limiter import AdaptiveRateLimiter
+from app.services.single_flight import SingleFlight
+from app.services.veo_client import VeoClient
+from app.services.veo_jobs import VeoJobManager
+from main import app
+
+
+def test_concurrent_duplicates_share_one_call():
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "image"
+
+    async def run():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("k", generate) for _ in range(5)))
+        # Finished calls are not remembered: the next request generates again
+        results.append(await flights.do("k", generate))
+        return flights, results
+
+    flights, results = asyncio.run(run())
+    assert results == ["image"] * 6
+    assert len(calls) == 2
+    assert flights.stats() == {"in_flight": 0, "coalesced": 4}
+
+
+def test_file_lock_serializes_workers_and_second_reuses_result(tmp_path):
+    shared = {}  # stands in for the generation cache both workers see
+    upstream = []
+
+    def make_call(worker):
+        async def call():
+            if "k" in shared:
+                return shared["k"]
+            upstream.append(worker)
+            await asyncio.sleep(0.05)
+            shared["k"] = f"from {worker}"
+            return shared["k"]
+        return call
+
+    async def run():
+        # Two SingleFlights with separate in-process state, like two uvicorn workers
+        first, second = SingleFlight(lock_dir=str(tmp_path)), SingleFlight(lock_dir=str(tmp_path))
+        return await asyncio.gather(first.do("k", make_call("a")), second.do("k", make_call("b")))
+
+    assert asyncio.run(run()) == ["from a", "from a"]
+    assert upstream == ["a"]
+    assert not list(tmp_path.rglob("*.lock"))
+
+
+class CountingGemini:
+    model = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    def cache_key(self, prompt, **kwargs):
+        return None
+
+    async def stream_image(self, prompt, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        yield b"\x89PNG fake"
+
+
+def test_duplicate_image_requests_hit_upstream_once(tmp_path):
+    gemini = CountingGemini()
+    storage = FileStorageService(base_dir=str(tmp_path))
+    app.dependency_overrides[get_gemini_client] = lambda: gemini
+    app.dependency_overrides[get_file_storage] = lambda: storage
+    app.dependency_overrides[get_generation_cache] = lambda: GenerationCache(cache_dir=str(tmp_path / ".cache"), enabled=False)
+    flights = SingleFlight()
+    app.dependency_overrides[get_flights] = lambda: flights
+    body = {"project_name": "P", "scene_id": "1", "shot_id": "1", "prompt": "a quiet harbour", "frame_type": "start"}
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await asyncio.gather(
+                *(client.post("/api/generate-image", json=body) for _ in range(3)),
+                client.post("/api/generate-image", json={**body, "frame_type": "end"}),
+            )
+
+    try:
+        responses = asyncio.run(run())
+    finally:
+        app.dependency_overrides.clear()
+    assert [r.status_code for r in responses] == [200] * 4
+    assert len({r.json()["file_path"] for r in responses[:3]}) == 1
+    assert gemini.calls == 2
+    assert flights.coalesced == 2
+
+
+def make_veo(mock_app) -> VeoClient:
+    client = VeoClient(http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_app)))
+    client.api_key = "mock"
+    client.base_url = "http://mock-veo"
+    client.limiter = AdaptiveRateLimiter(client.model, rate=0, burst=1, enabled=False)
+    return client
+
+
+def test_duplicate_video_submits_share_a_job_across_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VEO_POLL_INITIAL_INTERVAL", 0.01)
+    monkeypatch.setattr(settings, "SINGLE_FLIGHT_LOCK_POLL", 0.01)
+    mock_app = create_veo_app(polls_until_done=3)
+
+    async def run():
+        # Two managers over one cache directory and lock directory, like two uvicorn workers
+        workers = [
+            VeoJobManager(cache=GenerationCache(cache_dir=str(tmp_path / "cache"), enabled=True),
+                          flights=SingleFlight(lock_dir=str(tmp_path / "locks")))
+            for _ in range(2)
+        ]
+        client = make_veo(mock_app)
+        storage = FileStorageService(base_dir=str(tmp_path / "out"))
+        args = (client, storage, "a lantern festival", "P", "S1", "1", "S1_1_video.mp4")
+
+        first, double_click = await asyncio.gather(workers[0].submit(*args), workers[0].submit(*args))
+        other_worker = await workers[1].submit(*args)
+        assert other_worker.result == {"waiting_for": "another worker"}
+        finals = [await workers[0].wait(first.task_id), await workers[1].wait(other_worker.task_id)]
+        for worker in workers:
+            await worker.shutdown()
+        return first, double_click, finals
+
+    first, double_click, (done, peer) = asyncio.run(run())
+    assert double_click.task_id == first.task_id
+    assert done.status == peer.status == "completed"
+    assert peer.result["cache_hit"]
+    assert len(mock_app.state.operations) == 1
@@ -0,0 +1,88 @@
+import hashlib
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.static_files import OutputFiles, UnsatisfiableRange, parse_range
+from app.services.file_storage import FileStorageService
+
+
+@pytest.fixture
+def served(tmp_path):
+    storage = FileStorageService(base_dir=str(tmp_path))
+    content = os.urandom(300_000)
+    file_path = storage.save_file(content, "demo", "S1", "1", "S1_1_video.mp4")
+    app = FastAPI()
+    app.mount("/files", OutputFiles(directory=str(tmp_path)), name="files")
+    with TestClient(app) as client:
+        yield client, storage.get_file_url(file_path), content
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=990-5000", 1000) == (990, 999)
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    assert parse_range("bytes=abc", 1000) is None
+    with pytest.raises(UnsatisfiableRange):
+        parse_range("bytes=1000-", 1000)
+
+
+def test_versioned_url_is_immutable_and_revalidates_with_304(served):
+    client, url, content = served
+    etag = f'"{hashlib.sha256(content).hexdigest()}"'
+    assert "?v=" in url
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["etag"] == etag
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+
+    plain = client.get(url.split("?")[0], headers={"If-None-Match": f"W/{etag}"})
+    assert plain.status_code == 304
+    assert plain.headers["cache-control"] == "no-cache"
+    assert plain.content == b""
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+    # Only a full-length version pins the content
+    short = client.get(url.split("?")[0] + "?v=" + url.split("?v=")[1][:2])
+    assert short.headers["cache-control"] == "no-cache"
+
+
+def test_byte_ranges(served):
+    client, url, content = served
+    etag = client.head(url).headers["etag"]
+
+    partial = client.get(url, headers={"Range": "bytes=1000-1999"})
+    assert partial.status_code == 206
+    assert partial.content == content[1000:2000]
+    assert partial.headers["content-range"] == f"bytes 1000-1999/{len(content)}"
+    assert partial.headers["content-length"] == "1000"
+
+    tail = client.get(url, headers={"Range": "bytes=-10", "If-Range": etag})
+    assert tail.status_code == 206 and tail.content == content[-10:]
+
+    # Stale If-Range: the whole (changed) file is sent instead of a mismatched slice
+    stale = client.get(url, headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert stale.status_code == 200 and len(stale.content) == len(content)
+
+    unsatisfiable = client.get(url, headers={"Range": f"bytes={len(content)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(content)}"
+
+
+def test_dot_paths_are_not_served(served, tmp_path):
+    client, url, _ = served
+    os.makedirs(tmp_path / ".cache" / "ab")
+    (tmp_path / ".cache" / "ab" / "ab12").write_bytes(b"blob")
+    (tmp_path / "demo" / ".S1_1_end.png.abc.tmp").write_bytes(b"partial")
+
+    assert client.get("/files/.cache/ab/ab12").status_code == 404
+    assert client.get("/files/demo/.S1_1_end.png.abc.tmp").status_code == 404
+    assert client.get(url).status_code == 200
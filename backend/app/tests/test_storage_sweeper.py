@@ -0,0 +1,66 @@
+import asyncio
+import os
+import time
+
+from app.services.asset_catalog import AssetCatalog
+from app.services.file_storage import FileStorageService
+from app.services.single_flight import FileLock
+from app.services.storage_sweeper import StorageSweeper
+
+DAY = 24 * 3600
+
+
+def write(path, size: int, age: float) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return str(path)
+
+
+def test_sweep_removes_temp_files_and_lru_outputs(tmp_path):
+    out = tmp_path / "out"
+    shot = out / "Demo" / "S1" / "1"
+    catalog = AssetCatalog(str(tmp_path / "assets.db"))
+    storage = FileStorageService(base_dir=str(out), catalog=catalog)
+
+    frames = [(shot / name, age) for name, age in
+              (("S1_1_end.png", 5 * DAY), ("S1_1_start.png", 3 * DAY), ("S1_1_middle.png", 2 * DAY))]
+    end_frame, start_frame, middle_frame = [write(path, 100, age) for path, age in frames]
+    start_thumbnail = write(shot / "S1_1_start.thumb.webp", 10, 3 * DAY)
+    fresh_video = write(out / "Demo" / "S1" / "2" / "S1_2_video.mp4", 500, 60)
+    stale_tmp = write(shot / ".S1_1_end.png.abc.tmp", 50, 2 * DAY)
+    live_tmp = write(shot / ".S1_1_middle.png.def.tmp", 50, 60)
+    cache_blob = write(tmp_path / "cache" / "ab" / "ab12", 5000, 9 * DAY)
+    cache_tmp = write(tmp_path / "cache" / "ab" / ".ab34.abc.tmp", 30, 2 * DAY)
+    for path in (end_frame, start_frame, middle_frame):
+        storage.register_file(path, "Demo", "S1", "1", "image")
+    # Registering read the files; put the access times back
+    for path, age in frames:
+        write(path, 100, age)
+
+    sweeper = StorageSweeper(base_dir=str(out), temp_ttl=DAY, max_bytes=600, min_age=3600,
+                             catalog=catalog, lock_dir=str(tmp_path / "locks"), cache_dir=str(tmp_path / "cache"))
+    report = asyncio.run(sweeper.sweep())
+
+    remaining = {p for p in (end_frame, start_frame, middle_frame, start_thumbnail, fresh_video, stale_tmp, live_tmp,
+                             cache_blob, cache_tmp)
+                 if os.path.exists(p)}
+    # Least recently used outputs (with their thumbnails) go until the tree is under budget; the video is
+    # over budget too but newer than min_age. The cache is left to its own budget.
+    assert remaining == {middle_frame, fresh_video, live_tmp, cache_blob}
+    assert report["removed_files"] == {"temp": 2, "lru": 2}
+    assert report["reclaimed_bytes"] == {"temp": 80, "lru": 210}
+    assert report["output_bytes"] == 600
+    assert {a.file_path for a in catalog.list_assets("Demo")} == {middle_frame}
+    assert sweeper.stats()["totals"]["temp"] == {"files": 2, "bytes": 80}
+
+    # Another worker holding the sweep lock: this pass is skipped
+    lock = FileLock(str(tmp_path / "locks" / "storage-sweep.lock"))
+    assert lock.try_acquire()
+    try:
+        assert asyncio.run(sweeper.sweep()) is None
+    finally:
+        lock.release()
+    catalog.close()
@@ -0,0 +1,86 @@
+import asyncio
+
+from app.models.schemas import GenerationJob
+from app.services.batch_scheduler import BatchScheduler
+from app.services.file_storage import FileStorageService
+from app.services.manifest import ManifestStore
+from app.services.task_store import TaskStore
+from app.services.veo_jobs import VeoJobManager
+from app.tests.test_batch_scheduler import FakeUpstream
+
+
+def make_jobs():
+    return [
+        GenerationJob(scene_id="S1", shot_id="1", frame_type=frame, prompt=f"1-{frame}")
+        for frame in ("start", "middle", "end", "video")
+    ]
+
+
+def test_task_lifecycle_and_listing(tmp_path):
+    store = TaskStore(str(tmp_path / "tasks.db"))
+    jobs = make_jobs()
+    store.enqueue("b1", "p1", "Demo", jobs)
+    store.mark_running("Demo", jobs[0])
+    store.mark_failed("Demo", jobs[0], "boom")
+    store.mark_running("Demo", jobs[1])
+    store.mark_completed("Demo", jobs[1], "/out/S1_1_middle.png")
+
+    failed = store.list_tasks(project="Demo", status="failed")
+    assert [(t.frame_type, t.attempts, t.error) for t in failed] == [("start", 1, "boom")]
+    completed = store.list_tasks(status="completed")
+    assert completed[0].output_path == "/out/S1_1_middle.png"
+    assert len(store.list_tasks(shot_id="1", limit=2)) == 2
+
+    # Re-queueing keeps attempts for an unchanged prompt and resets them for a new one
+    jobs[1] = jobs[1].model_copy(update={"prompt": "edited"})
+    store.enqueue("b2", "p1", "Demo", jobs[:2])
+    by_frame = {t.frame_type: t for t in store.list_tasks(project="Demo")}
+    assert by_frame["start"].attempts == 1 and by_frame["start"].status == "queued"
+    assert by_frame["middle"].attempts == 0 and by_frame["middle"].batch_id == "b2"
+    store.close()
+
+
+def test_resume_requeues_only_unfinished_jobs(tmp_path):
+    db_path = str(tmp_path / "tasks.db")
+    jobs = make_jobs()
+
+    # A previous process finished the start frame and died with the rest in flight
+    store = TaskStore(db_path)
+    store.enqueue("b1", "p1", "Demo", jobs)
+    store.mark_completed("Demo", jobs[0], "/out/S1_1_start.png")
+    store.mark_running("Demo", jobs[1])
+    store.close()
+
+    async def run():
+        upstream = FakeUpstream()
+        scheduler = BatchScheduler(jobs=VeoJobManager(), store=TaskStore(db_path),
+                                   manifests=ManifestStore(str(tmp_path / "manifests")))
+        storage = FileStorageService(base_dir=str(tmp_path / "output"))
+        statuses = await scheduler.resume(upstream, upstream, storage)
+        for status in statuses:
+            await scheduler._runners[status.task_id]
+        return upstream, statuses, scheduler.store
+
+    upstream, statuses, store = asyncio.run(run())
+    assert len(statuses) == 1 and statuses[0].result["total"] == 3
+    assert "1-start" not in upstream.calls
+    assert sorted(upstream.calls) == ["1-end", "1-middle", "1-video"]
+    assert {t.status for t in store.list_tasks(project="Demo")} == {"completed"}
+    assert store.resumable() == {}
+
+
+def test_resume_gives_up_on_jobs_that_keep_getting_interrupted(tmp_path):
+    store = TaskStore(str(tmp_path / "tasks.db"))
+    jobs = make_jobs()
+    store.enqueue("b1", "p1", "Demo", jobs)
+    # The start frame took the process down on each of its three runs, the middle frame on one
+    for _ in range(3):
+        store.mark_running("Demo", jobs[0])
+    store.mark_running("Demo", jobs[1])
+
+    resumed = store.resumable(max_attempts=3)
+    assert {job.frame_type for job in resumed[("p1", "Demo")]} == {"middle", "end", "video"}
+    start = store.list_tasks(project="Demo", status="failed")
+    assert [(t.frame_type, t.attempts) for t in start] == [("start", 3)]
+    assert "3 interrupted attempts" in start[0].error
+    store.close()
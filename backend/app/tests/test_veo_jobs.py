@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+
+from app.core.config import settings
+from app.mock.veo_operations import MOCK_VIDEO, create_app
+from app.services.file_storage import FileStorageService
+from app.services.generation_cache import GenerationCache
+from app.services.rate_limiter import AdaptiveRateLimiter
+from app.services.veo_client import VeoClient
+from app.services.veo_jobs import VeoJobManager
+
+
+def make_client(mock_app) -> VeoClient:
+    client = VeoClient(http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_app)))
+    client.api_key = "mock"
+    client.base_url = "http://mock-veo"
+    client.limiter = AdaptiveRateLimiter(client.model, rate=0, burst=1, enabled=False)
+    return client
+
+
+def test_jobs_poll_until_done_and_save(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VEO_POLL_INITIAL_INTERVAL", 0.01)
+    monkeypatch.setattr(settings, "VEO_POLL_MAX_INTERVAL", 0.05)
+    mock_app = create_app(polls_until_done=3)
+
+    async def run():
+        manager = VeoJobManager(cache=GenerationCache(cache_dir=str(tmp_path / "cache"), enabled=True))
+        client = make_client(mock_app)
+        storage = FileStorageService(base_dir=str(tmp_path / "out"))
+
+        submitted = [
+            await manager.submit(client, storage, prompt, "P", "S1", shot, f"S1_{shot}_video.mp4")
+            for prompt, shot in (("a calm river", "1"), ("a FAIL shot", "2"))
+        ]
+        assert all(s.status == "running" for s in submitted)
+
+        finals = [await manager.wait(s.task_id) for s in submitted]
+        # Identical prompt is served from the cache without a new operation
+        again = await manager.submit(client, storage, "a calm river", "P", "S1", "3", "S1_3_video.mp4")
+        await manager.shutdown()
+        return finals, again
+
+    (ok, failed), again = asyncio.run(run())
+
+    assert ok.status == "completed"
+    with open(ok.result["file_path"], "rb") as f:
+        assert f.read() == MOCK_VIDEO
+    assert failed.status == "failed"
+    assert "Prompt rejected" in failed.error
+    assert again.status == "completed" and again.result["cache_hit"]
+    assert len(mock_app.state.operations) == 2
+    assert all(op["polls"] >= 3 for op in mock_app.state.operations.values())
+
+
+def test_finished_jobs_are_dropped_after_retention(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VEO_POLL_INITIAL_INTERVAL", 0.01)
+    mock_app = create_app(polls_until_done=1)
+
+    async def run():
+        manager = VeoJobManager(cache=GenerationCache(cache_dir=str(tmp_path / "cache"), enabled=False), status_ttl=0)
+        client = make_client(mock_app)
+        storage = FileStorageService(base_dir=str(tmp_path / "out"))
+        first = await manager.submit(client, storage, "a calm river", "P", "S1", "1", "S1_1_video.mp4")
+        assert (await manager.wait(first.task_id)).status == "completed"
+        # Finished: no longer tracked as a job, status kept until the next prune
+        assert manager.jobs == {} and manager.get_status(first.task_id) is first
+
+        second = await manager.submit(client, storage, "a quiet lake", "P", "S1", "2", "S1_2_video.mp4")
+        await manager.wait(second.task_id)
+        await manager.shutdown()
+        return manager, first, second
+
+    manager, first, second = asyncio.run(run())
+    assert manager.get_status(first.task_id) is None
+    assert list(manager.statuses) == [second.task_id]
@@ -0,0 +1,86 @@
+import asyncio
+import base64
+import json
+import os
+
+import httpx
+
+from app.services.file_storage import FileStorageService
+from app.services.rate_limiter import AdaptiveRateLimiter
+from app.services.veo_client import VeoClient
+from app.utils.streaming import Base64StreamDecoder, JSONStringExtractor
+
+VIDEO = os.urandom(300_000)
+
+
+class ChunkedStream(httpx.AsyncByteStream):
+    def __init__(self, body: bytes, size: int = 1000):
+        self.body = body
+        self.size = size
+
+    async def __aiter__(self):
+        for i in range(0, len(self.body), self.size):
+            yield self.body[i:i + self.size]
+
+
+def make_client(handler) -> VeoClient:
+    client = VeoClient(http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    client.api_key = "test-key"
+    client.limiter = AdaptiveRateLimiter(client.model, rate=0, burst=1, enabled=False)
+    return client
+
+
+def test_extractor_handles_escapes_split_across_chunks():
+    encoded = base64.b64encode(VIDEO[:3000]).decode().replace("/", "\\/")
+    body = json.dumps({"meta": 1}).encode()[:-1] + b', "predictions": [{"bytesBase64Encoded": "' + encoded.encode() + b'"}]}'
+    extractor = JSONStringExtractor(["bytesBase64Encoded"])
+    decoder = Base64StreamDecoder()
+    out = b""
+    for i in range(0, len(body), 7):
+        for piece in extractor.feed(body[i:i + 7]):
+            out += decoder.decode(piece)
+    assert extractor.done
+    assert out == VIDEO[:3000]
+
+
+def test_stream_base64_response_to_disk(tmp_path):
+    body = json.dumps({"predictions": [{"bytesBase64Encoded": base64.b64encode(VIDEO).decode()}]}).encode()
+
+    def handler(request):
+        return httpx.Response(200, stream=ChunkedStream(body))
+
+    async def run():
+        client = make_client(handler)
+        storage = FileStorageService(base_dir=str(tmp_path))
+        return await storage.save_stream(client.stream_video("prompt"), "P", "S1", "1", "S1_1_video.mp4")
+
+    path = asyncio.run(run())
+    with open(path, "rb") as f:
+        assert f.read() == VIDEO
+    # No temp files left behind
+    assert os.listdir(os.path.dirname(path)) == ["S1_1_video.mp4"]
+
+
+def test_failed_stream_leaves_no_temp_file(tmp_path):
+    async def chunks():
+        yield VIDEO[:1000]
+        raise httpx.ReadError("connection dropped")
+
+    async def run():
+        storage = FileStorageService(base_dir=str(tmp_path))
+        try:
+            await storage.save_stream(chunks(), "P", "S1", "1", "S1_1_video.mp4")
+        except httpx.ReadError:
+            return storage.get_output_path("P", "S1", "1", "S1_1_video.mp4")
+
+    path = asyncio.run(run())
+    assert os.listdir(os.path.dirname(path)) == []
+
+
+def test_stream_video_url_download():
+    def handler(request):
+        if request.url.path.endswith(":generate"):
+            return httpx.Response(200, json={"video_url": "https://cdn.example/video.mp4"})
+        return httpx.Response(200, stream=ChunkedStream(VIDEO))
+
+    assert asyncio.run(make_client(handler).generate_video("prompt")) == VIDEO
@@ -0,0 +1,167 @@
+import base64
+import re
+from typing import Iterable, List, Optional
+
+_NON_BASE64 = re.compile(rb"[^A-Za-z0-9+/=]")
+_BASE64_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+_SIMPLE_ESCAPES = {
+    ord("/"): b"/", ord("\\"): b"\\", ord('"'): b'"',
+    ord("n"): b"\n", ord("r"): b"\r", ord("t"): b"\t", ord("b"): b"\b", ord("f"): b"\f",
+}
+
+
+class Base64StreamDecoder:
+    """
+    Incremental base64 decoder.
+    Like base64.b64decode (non-validating), characters outside the alphabet are
+    discarded; complete 4-character groups are decoded as soon as they arrive.
+    """
+
+    def __init__(self):
+        self._pending = b""
+
+    def decode(self, data: bytes) -> bytes:
+        # Deleting the alphabet is a cheap C-level check; the regex only runs on dirty chunks
+        if data.translate(None, _BASE64_ALPHABET):
+            data = _NON_BASE64.sub(b"", data)
+        data = self._pending + data
+        cut = len(data) - len(data) % 4
+        self._pending = data[cut:]
+        return base64.b64decode(data[:cut]) if cut else b""
+
+    def flush(self) -> bytes:
+        if self._pending:
+            raise ValueError("Incorrect base64 padding")
+        return b""
+
+
+class JSONStringExtractor:
+    """
+    Finds the first string value for one of `keys` in a streamed JSON document
+    and yields its (unescaped) contents chunk by chunk, without parsing the tree.
+
+    If none of the keys appear, the whole body is kept in `buffer` so the caller
+    can fall back to a regular json.loads.
+    """
+
+    # Enough overlap to catch a key split across chunks
+    SEARCH_OVERLAP = 256
+
+    def __init__(self, keys: Iterable[str]):
+        names = b"|".join(re.escape(k.encode()) for k in keys)
+        self._key_pattern = re.compile(rb'"(' + names + rb')"\s*:\s*"')
+        self.buffer = bytearray()
+        self.key: Optional[str] = None
+        self.done = False
+        self._searched = 0
+        self._escape = b""  # partial escape sequence carried across chunks
+
+    @property
+    def found(self) -> bool:
+        return self.key is not None
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Return the pieces of the target string contained in this chunk"""
+        if self.done:
+            return []
+        if self.key is None:
+            self.buffer += chunk
+            start = max(0, self._searched - self.SEARCH_OVERLAP)
+            match = self._key_pattern.search(self.buffer, start)
+            self._searched = len(self.buffer)
+            if not match:
+                return []
+            self.key = match.group(1).decode()
+            chunk = bytes(self.buffer[match.end():])
+            self.buffer = bytearray()
+        return self._scan_string(chunk)
+
+    def _scan_string(self, chunk: bytes) -> List[bytes]:
+        pieces = []
+        data = self._escape + chunk
+        self._escape = b""
+        pos = 0
+        while pos < len(data):
+            quote = data.find(b'"', pos)
+            backslash = data.find(b"\\", pos)
+            if backslash != -1 and (quote == -1 or backslash < quote):
+                pieces.append(data[pos:backslash])
+                escape_len = 6 if data[backslash + 1:backslash + 2] == b"u" else 2
+                escape = data[backslash:backslash + escape_len]
+                if len(escape) < escape_len:
+                    self._escape = escape
+                    return pieces
+                if escape_len == 6:
+                    pieces.append(chr(int(escape[2:], 16)).encode("utf-8"))
+                else:
+                    pieces.append(_SIMPLE_ESCAPES.get(escape[1], escape[1:]))
+                pos = backslash + escape_len
+                continue
+            if quote == -1:
+                pieces.append(data[pos:])
+                return pieces
+            pieces.append(data[pos:quote])
+            self.done = True
+            return pieces
+        return pieces
+
+
+class DecodeBuffer:
+    """
+    Collects decoded chunks into a single bytearray.
+    With `reserve` called up front (e.g. from Content-Length) the buffer is
+    allocated once and filled in place, instead of growing and re-copying.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._size = 0
+
+    def reserve(self, capacity: int):
+        if capacity <= len(self._buf):
+            return
+        if not self._size:
+            # Allocated in place (extending with bytes(n) would briefly need twice the memory)
+            self._buf = bytearray(capacity)
+        else:
+            self._buf.extend(bytes(capacity - len(self._buf)))
+
+    def write(self, chunk: bytes):
+        end = self._size + len(chunk)
+        if end <= len(self._buf):
+            self._buf[self._size:end] = chunk
+        else:
+            del self._buf[self._size:]
+            self._buf += chunk
+        self._size = end
+
+    def getvalue(self) -> bytearray:
+        """The collected bytes (the buffer itself, trimmed; no copy)"""
+        del self._buf[self._size:]
+        return self._buf
+
+
+def describe_json(value, max_depth: int = 6, max_items: int = 8, max_chars: int = 80) -> str:
+    """
+    Short structural summary of a decoded JSON value for logs: long strings
+    (e.g. base64 payloads) are reduced to their length, deep or wide
+    containers are cut off.
+    """
+    if isinstance(value, dict):
+        if max_depth <= 0:
+            return f"{{...{len(value)} keys}}"
+        items = [
+            f"{key!r}: {describe_json(item, max_depth - 1, max_items, max_chars)}"
+            for key, item in list(value.items())[:max_items]
+        ]
+        if len(value) > max_items:
+            items.append(f"...{len(value) - max_items} more")
+        return "{" + ", ".join(items) + "}"
+    if isinstance(value, list):
+        if max_depth <= 0 or not value:
+            return f"[{len(value)} items]" if value else "[]"
+        first = describe_json(value[0], max_depth - 1, max_items, max_chars)
+        return f"[{first}]" if len(value) == 1 else f"[{first}, ...{len(value) - 1} more]"
+    if isinstance(value, str) and len(value) > max_chars:
+        return f"<str {len(value)} chars>"
+    return repr(value)
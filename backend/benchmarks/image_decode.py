@@ -0,0 +1,161 @@
+"""
+Peak memory per frame when decoding a Gemini inline-image response.
+
+Compares the previous path (response.json() -> base64 decode -> write) with
+GeminiClient.generate_image (decode into a preallocated buffer) and
+GeminiClient.stream_image (decode straight into the destination file).
+The response body is built before measuring, so only the decode path's own
+allocations are counted (tracemalloc peak above the starting level).
+
+    cd backend
+    python -m benchmarks.image_decode --sizes-mb 1 4 16
+"""
+import argparse
+import asyncio
+import base64
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.services.gemini_client import DOWNLOAD_CHUNK_SIZE, GeminiClient  # noqa: E402
+from app.services.rate_limiter import AdaptiveRateLimiter  # noqa: E402
+
+URL = "http://gemini.bench/models/bench:generateContent"
+
+
+class ChunkedBody(httpx.AsyncByteStream):
+    """Serves a prebuilt body in network-sized chunks"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def __aiter__(self):
+        view = memoryview(self.body)
+        for start in range(0, len(view), DOWNLOAD_CHUNK_SIZE):
+            yield bytes(view[start:start + DOWNLOAD_CHUNK_SIZE])
+
+
+def build_body(size: int) -> bytes:
+    encoded = base64.b64encode(os.urandom(size)).decode()
+    return json.dumps({
+        "candidates": [{"content": {"parts": [{"inline_data": {"mime_type": "image/png", "data": encoded}}]}}]
+    }).encode()
+
+
+def make_http_client(body: bytes) -> httpx.AsyncClient:
+    def handler(request):
+        return httpx.Response(200, headers={"Content-Length": str(len(body))}, stream=ChunkedBody(body))
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def make_gemini(http_client: httpx.AsyncClient) -> GeminiClient:
+    client = GeminiClient(http_client=http_client)
+    client.api_key = "bench"
+    client.base_url = "http://gemini.bench"
+    client.limiter = AdaptiveRateLimiter("bench", rate=0, burst=1, enabled=False)
+    return client
+
+
+async def legacy_path(http_client: httpx.AsyncClient, path: str) -> int:
+    """The decode path before streaming: full body, full dict, full decoded copy"""
+    response = await http_client.post(URL, json={"contents": []})
+    data = response.json()
+    image = base64.b64decode(data["candidates"][0]["content"]["parts"][0]["inline_data"]["data"])
+    with open(path, "wb") as f:
+        f.write(image)
+    return len(image)
+
+
+async def buffered_path(http_client: httpx.AsyncClient, path: str) -> int:
+    image = await make_gemini(http_client).generate_image("bench")
+    with open(path, "wb") as f:
+        f.write(image)
+    return len(image)
+
+
+async def streamed_path(http_client: httpx.AsyncClient, path: str) -> int:
+    size = 0
+    with open(path, "wb") as f:
+        async for chunk in make_gemini(http_client).stream_image("bench"):
+            f.write(chunk)
+            size += len(chunk)
+    return size
+
+
+PATHS: Dict[str, Callable] = {
+    "legacy_json": legacy_path,
+    "buffered": buffered_path,
+    "streamed_to_file": streamed_path,
+}
+
+
+async def measure(path_fn: Callable, body: bytes, workdir: str) -> Dict[str, float]:
+    async with make_http_client(body) as http_client:
+        target = os.path.join(workdir, "frame.bin")
+        # Leftovers of the previous run must not be freed inside the measurement
+        gc.collect()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        size = await path_fn(http_client, target)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    return {"image_bytes": size, "peak_mb": round(peak / 2**20, 2), "seconds": round(elapsed, 4)}
+
+
+async def run(sizes_mb: List[float], repeat: int) -> List[dict]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="s2iv-decode-") as workdir:
+        for size_mb in sizes_mb:
+            body = build_body(int(size_mb * 2**20))
+            for name, path_fn in PATHS.items():
+                runs = [await measure(path_fn, body, workdir) for _ in range(repeat)]
+                best = min(runs, key=lambda r: r["peak_mb"])
+                results.append({
+                    "path": name,
+                    "image_mb": size_mb,
+                    "peak_mb": best["peak_mb"],
+                    "peak_per_image_mb": round(best["peak_mb"] / size_mb, 2),
+                    "seconds": min(r["seconds"] for r in runs),
+                })
+            del body
+    return results
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Peak memory per frame for Gemini image decoding")
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    from loguru import logger
+    logger.remove()
+
+    tracemalloc.start()
+    try:
+        results = asyncio.run(run(args.sizes_mb, args.repeat))
+    finally:
+        tracemalloc.stop()
+
+    print(f"{'path':<18} {'image MB':>8} {'peak MB':>8} {'x image':>8} {'seconds':>8}")
+    for r in results:
+        print(f"{r['path']:<18} {r['image_mb']:>8g} {r['peak_mb']:>8} {r['peak_per_image_mb']:>8} {r['seconds']:>8}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
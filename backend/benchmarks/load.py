@@ -0,0 +1,365 @@
+"""
+End-to-end load benchmark.
+
+Drives the FastAPI app in-process (ASGI transport, full lifespan) with N
+concurrent projects: upload-json -> /projects/{id}/generate -> poll /batches.
+Upstream calls go to the mock in app.mock.upstream, started as a subprocess
+(real sockets) or mounted in-process. Reports frame latency p50/p95/p99,
+frames/sec and peak RSS, and saves the results as JSON:
+
+    cd backend
+    python -m benchmarks.load --projects 4 --latency-ms 300 --error-rate-429 0.02
+    python -m benchmarks.load --projects 4 --compare benchmarks/results/<earlier>.json
+
+Settings are passed through environment variables before the app is imported,
+so every other Settings field can be tuned the same way (e.g. MAX_CONCURRENT_TASKS=10).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_INPUT = os.path.join(os.path.dirname(BACKEND_DIR), "input", "Visual_Development_Prompts_Nano_Veo.json")
+DEFAULT_RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+TERMINAL_STATES = ("completed", "failed", "cancelled")
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.mock.upstream import add_profile_arguments, create_app as create_mock_app, profile_from_args  # noqa: E402
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty sample"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil without importing math
+    return ordered[int(rank) - 1]
+
+
+def summarize_latencies(values: List[float]) -> Dict[str, Optional[float]]:
+    """Seconds in, milliseconds out"""
+    ms = [v * 1000 for v in values]
+    return {
+        "count": len(ms),
+        "mean": round(sum(ms) / len(ms), 2) if ms else None,
+        "p50": _round(percentile(ms, 50)),
+        "p95": _round(percentile(ms, 95)),
+        "p99": _round(percentile(ms, 99)),
+        "max": _round(max(ms) if ms else None),
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 2)
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class FrameRecorder:
+    """
+    Timestamps every task state the app publishes to the progress hub.
+    Hooked in synchronously, so no state is coalesced away.
+    """
+
+    def __init__(self):
+        self.tasks: Dict[tuple, Dict[str, float]] = {}
+
+    def install(self, hub):
+        original = hub.publish
+
+        def publish(project_name, update):
+            self.record(project_name, update)
+            original(project_name, update)
+
+        hub.publish = publish
+
+    def record(self, project_name: str, update):
+        entry = self.tasks.setdefault((project_name, update.task_id), {"frame_type": update.result["frame_type"]})
+        now = time.perf_counter()
+        entry.setdefault(update.status, now)
+        if update.status in TERMINAL_STATES:
+            entry["final"] = update.status
+            entry["finished"] = now
+
+    def summary(self) -> dict:
+        service = {"image": [], "video": []}
+        end_to_end = []
+        outcomes = {state: 0 for state in TERMINAL_STATES}
+        for entry in self.tasks.values():
+            if "finished" not in entry:
+                continue
+            outcomes[entry["final"]] += 1
+            if entry["final"] != "completed":
+                continue
+            kind = "video" if entry["frame_type"] == "video" else "image"
+            # Cache hits complete without ever running
+            service[kind].append(entry["finished"] - entry.get("running", entry["finished"]))
+            if "queued" in entry:
+                end_to_end.append(entry["finished"] - entry["queued"])
+        return {
+            "frames": outcomes,
+            # running -> completed: slot wait, upstream calls (retries, rate-limit pauses) and the save
+            "frame_latency_ms": summarize_latencies(service["image"] + service["video"]),
+            "image_latency_ms": summarize_latencies(service["image"]),
+            "video_latency_ms": summarize_latencies(service["video"]),
+            # queued -> completed: what a user waits for each frame
+            "end_to_end_latency_ms": summarize_latencies(end_to_end),
+        }
+
+
+async def run_project(client: httpx.AsyncClient, index: int, raw: dict, poll_interval: float) -> dict:
+    project = dict(raw, project=f"{raw.get('project', 'bench')} #{index}")
+
+    started = time.perf_counter()
+    response = await client.post("/api/upload-json", content=json.dumps(project),
+                                 headers={"Content-Type": "application/json"})
+    response.raise_for_status()
+    upload_seconds = time.perf_counter() - started
+
+    response = await client.post(f"/api/projects/bench-{index}/generate", json=response.json())
+    response.raise_for_status()
+    batch_id = response.json()["task_id"]
+
+    while True:
+        await asyncio.sleep(poll_interval)
+        response = await client.get(f"/api/batches/{batch_id}")
+        response.raise_for_status()
+        batch = response.json()
+        if batch["status"] in TERMINAL_STATES:
+            break
+
+    return {
+        "upload_seconds": upload_seconds,
+        "batch_seconds": time.perf_counter() - started,
+        "status": batch["status"],
+        "total": batch["result"]["total"],
+        "completed": batch["result"]["completed"],
+        "failed": batch["result"]["failed"],
+    }
+
+
+async def run_benchmark(args: argparse.Namespace, upstream_app=None) -> dict:
+    # Imported here: the environment configured by configure_environment must be in place first
+    from app.services.http_pool import http_pool
+    from app.services.progress_hub import progress_hub
+    from app.services.rate_limiter import rate_limiters
+    from app.services.resilience import circuit_breakers
+    from main import app
+
+    with open(args.input, "rb") as f:
+        raw = json.load(f)
+
+    recorder = FrameRecorder()
+    recorder.install(progress_hub)
+
+    if upstream_app is not None:
+        # In-process upstream: pre-seed the pools so the lifespan keeps them
+        http_pool.gemini = httpx.AsyncClient(transport=httpx.ASGITransport(app=upstream_app), timeout=None)
+        http_pool.veo = httpx.AsyncClient(transport=httpx.ASGITransport(app=upstream_app), timeout=None)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            started = time.perf_counter()
+            projects = await asyncio.gather(*(
+                run_project(client, index, raw, args.poll_interval) for index in range(args.projects)
+            ))
+            wall_seconds = time.perf_counter() - started
+        limiter_stats = rate_limiters.stats()
+        breaker_stats = circuit_breakers.stats()
+
+    frames = recorder.summary()
+    completed = frames["frames"]["completed"]
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "projects": args.projects,
+            "input": os.path.basename(args.input),
+            "upstream": args.upstream,
+            "max_concurrent_tasks": int(os.environ["MAX_CONCURRENT_TASKS"]),
+            "rate_limit_enabled": os.environ["RATE_LIMIT_ENABLED"],
+            "gemini_batch_enabled": os.environ["GEMINI_BATCH_ENABLED"],
+            "mock": profile_from_args(args).model_dump(),
+        },
+        "wall_seconds": round(wall_seconds, 3),
+        "frames_per_sec": round(completed / wall_seconds, 3) if wall_seconds else None,
+        **frames,
+        "upload_latency_ms": summarize_latencies([p["upload_seconds"] for p in projects]),
+        "batch_seconds": summarize_latencies([p["batch_seconds"] for p in projects]),
+        "batches": {state: sum(1 for p in projects if p["status"] == state) for state in TERMINAL_STATES},
+        "peak_rss_mb": peak_rss_mb(),
+        "rate_limits": limiter_stats,
+        "breakers": breaker_stats,
+    }
+
+
+def configure_environment(args: argparse.Namespace, upstream_url: str, workdir: str):
+    """Point the app at the mock and at scratch directories (must run before importing main)"""
+    os.environ.update({
+        "GEMINI_API_KEY": "mock",
+        "VEO_API_KEY": "mock",
+        "GEMINI_BASE_URL": upstream_url,
+        "VEO_BASE_URL": upstream_url,
+        "OUTPUT_DIR": os.path.join(workdir, "output"),
+        "DATA_DIR": os.path.join(workdir, "data"),
+        "TASK_RESUME_ON_STARTUP": "false",
+        "CACHE_ENABLED": "true" if args.cache else "false",
+        "RATE_LIMIT_ENABLED": "true" if args.rate_limit else "false",
+        "GEMINI_BATCH_ENABLED": "true" if args.batch else "false",
+    })
+    # Tunables: anything already set in the environment wins
+    os.environ.setdefault("MAX_CONCURRENT_TASKS", str(args.concurrency))
+    os.environ.setdefault("VEO_POLL_INITIAL_INTERVAL", "0.2")
+    os.environ.setdefault("VEO_POLL_MAX_INTERVAL", "1.0")
+    os.environ.setdefault("GEMINI_BATCH_POLL_INTERVAL", "0.2")
+
+
+def start_mock_server(args: argparse.Namespace) -> tuple:
+    """Run app.mock.upstream in a subprocess (keeps its RSS out of the measurement)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    profile = profile_from_args(args)
+    command = [sys.executable, "-m", "app.mock.upstream", "--port", str(port)]
+    for name, value in profile.model_dump(exclude_none=True).items():
+        command += [f"--{name.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR)
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Mock upstream exited with code {process.returncode}")
+        try:
+            httpx.get(f"{url}/health", timeout=1).raise_for_status()
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Mock upstream did not start within 15s")
+
+
+def compare(current: dict, baseline: dict) -> List[str]:
+    """Human-readable deltas for the headline metrics"""
+    rows = [
+        ("frames/sec", ["frames_per_sec"]),
+        ("frame p50 ms", ["frame_latency_ms", "p50"]),
+        ("frame p95 ms", ["frame_latency_ms", "p95"]),
+        ("frame p99 ms", ["frame_latency_ms", "p99"]),
+        ("end-to-end p95 ms", ["end_to_end_latency_ms", "p95"]),
+        ("peak RSS MB", ["peak_rss_mb"]),
+    ]
+    lines = [f"Compared with {baseline.get('commit') or '?'} ({baseline.get('timestamp')}):"]
+    for label, path in rows:
+        new, old = current, baseline
+        for key in path:
+            new = new.get(key) if isinstance(new, dict) else None
+            old = old.get(key) if isinstance(old, dict) else None
+        if new is None or old is None:
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        lines.append(f"  {label:<20} {old:>10} -> {new:<10} ({change})")
+    return lines
+
+
+def print_report(result: dict):
+    frames = result["frames"]
+    latency = result["frame_latency_ms"]
+    print(f"commit {result['commit']}  projects={result['config']['projects']}  wall={result['wall_seconds']}s")
+    print(f"frames completed={frames['completed']} failed={frames['failed']}  frames/sec={result['frames_per_sec']}")
+    print(f"frame latency ms  p50={latency['p50']} p95={latency['p95']} p99={latency['p99']}")
+    e2e = result["end_to_end_latency_ms"]
+    print(f"end-to-end ms     p50={e2e['p50']} p95={e2e['p95']} p99={e2e['p99']}")
+    print(f"peak RSS {result['peak_rss_mb']} MB")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Load benchmark against the mock Gemini/Veo upstream")
+    parser.add_argument("--projects", type=int, default=4, help="concurrent projects")
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="project JSON to replicate")
+    parser.add_argument("--concurrency", type=int, default=5, help="MAX_CONCURRENT_TASKS unless set in the env")
+    parser.add_argument("--upstream", choices=("subprocess", "inprocess"), default="subprocess")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the adaptive rate limiter on")
+    parser.add_argument("--cache", action="store_true", help="keep the generation cache on")
+    parser.add_argument("--batch", action="store_true", help="submit image frames through batchGenerateContent")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--log-level", default="WARNING")
+    add_profile_arguments(parser)
+    return parser
+
+
+def main(argv: List[str] = None):
+    args = build_parser().parse_args(argv)
+
+    from loguru import logger
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    process = None
+    with tempfile.TemporaryDirectory(prefix="s2iv-bench-") as workdir:
+        try:
+            if args.upstream == "subprocess":
+                process, url = start_mock_server(args)
+                upstream_app = None
+            else:
+                url = "http://upstream"
+                upstream_app = create_mock_app(profile_from_args(args))
+            configure_environment(args, url, workdir)
+            result = asyncio.run(run_benchmark(args, upstream_app))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{result['commit'] or 'nogit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    print_report(result)
+    print(f"results written to {output}")
+    if args.compare:
+        with open(args.compare, "rb") as f:
+            for line in compare(result, json.load(f)):
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Upload parsing cost for very large scripts.
+
+Synthetic scripts are generated from the shape of
+input/Visual_Development_Prompts_Nano_Veo.json (same core_style, character
+references and per-shot prompt structure, with the sample shots cycled and
+their ids/text varied) and run through the /upload-json stages: streaming
+parse, prompt processing, one-pass model validation, manifest building and
+response serialization. Times are the best of --repeat runs, in seconds.
+
+    cd backend
+    python -m benchmarks.parser --shots 1000 10000 50000
+"""
+import argparse
+import copy
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from app.services.json_parser import JSONParserService  # noqa: E402
+
+SAMPLE_JSON = os.path.join(os.path.dirname(BACKEND_DIR), "input", "Visual_Development_Prompts_Nano_Veo.json")
+SHOTS_PER_SCENE = 8
+FEED_CHUNK_SIZE = 64 * 1024
+
+
+def synthetic_script(shots: int, sample_path: str = SAMPLE_JSON) -> Dict[str, Any]:
+    with open(sample_path, "rb") as f:
+        sample = json.load(f)
+    sample_shots = [shot for scene in sample["scenes"] for shot in scene["shots"]]
+    template_scene = {k: v for k, v in sample["scenes"][0].items() if k != "shots"}
+
+    scenes: List[Dict[str, Any]] = []
+    for index in range(shots):
+        if index % SHOTS_PER_SCENE == 0:
+            scene_no = len(scenes) + 1
+            scenes.append({**template_scene, "scene_id": str(scene_no),
+                           "scene_title": f"{template_scene.get('scene_title', 'Scene')} #{scene_no}", "shots": []})
+        shot = copy.deepcopy(sample_shots[index % len(sample_shots)])
+        shot["shot_id"] = f"{index // 60}:{index % 60:02d}"
+        # Distinct text per shot so nothing downstream can dedupe it away
+        for prompt in shot.get("nano_banana_pro_prompts", []):
+            prompt["prompt"] = f"{prompt['prompt']} (take {index})"
+        if shot.get("veo_3_1_prompt"):
+            shot["veo_3_1_prompt"] = f"{shot['veo_3_1_prompt']} (take {index})"
+        scenes[-1]["shots"].append(shot)
+
+    return {**{k: v for k, v in sample.items() if k != "scenes"}, "scenes": scenes}
+
+
+def run_stages(raw: bytes) -> Dict[str, float]:
+    """The /upload-json path: stream parse, prompt processing, one-pass validation, manifest"""
+    service = JSONParserService()
+    timings = {}
+
+    started = time.perf_counter()
+    parser = service.create_stream_parser()
+    for start in range(0, len(raw), FEED_CHUNK_SIZE):
+        parser.feed(raw[start:start + FEED_CHUNK_SIZE])
+    data = parser.close()
+    timings["stream_parse"] = time.perf_counter() - started
+
+    # build_project(data, process_prompts=True), split in its two halves
+    started = time.perf_counter()
+    processor = service.create_processor(data.get("core_style", {}), data.get("character_references", {}))
+    service.process_scene_prompts(data["scenes"], processor)
+    timings["process_prompts"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    project = service.build_project(data)
+    timings["validate"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    service.build_manifest(project)
+    timings["build_manifest"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    project.model_dump_json()
+    timings["serialize"] = time.perf_counter() - started
+
+    timings["total"] = sum(timings.values())
+    return timings
+
+
+def benchmark(shots: int, repeat: int, measure_memory: bool) -> Dict[str, Any]:
+    raw = json.dumps(synthetic_script(shots), ensure_ascii=False).encode("utf-8")
+    runs = []
+    for _ in range(repeat):
+        gc.collect()
+        runs.append(run_stages(raw))
+    result = {
+        "shots": shots,
+        "input_mb": round(len(raw) / 2**20, 2),
+        **{stage: round(min(run[stage] for run in runs), 4) for stage in runs[0]},
+    }
+    if measure_memory:
+        gc.collect()
+        tracemalloc.start()
+        run_stages(raw)
+        result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+        tracemalloc.stop()
+    return result
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Parse/process time for synthetic scripts")
+    parser.add_argument("--shots", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--memory", action="store_true", help="also report tracemalloc peak (slows the run)")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args(argv)
+
+    results = [benchmark(shots, args.repeat, args.memory) for shots in args.shots]
+
+    columns = ["shots", "input_mb", "stream_parse", "process_prompts", "validate", "build_manifest", "serialize", "total"]
+    if args.memory:
+        columns.append("peak_mb")
+    print(" ".join(f"{c:>15}" for c in columns))
+    for r in results:
+        print(" ".join(f"{r[c]:>15}" for c in columns))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
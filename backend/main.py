@@ -1,25 +1,68 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import Response
 from app.core.config import settings
 from app.models.schemas import ProjectData
 from app.services.json_parser import JSONParserService
-from app.api import image_routes, video_routes
-import shutil
+from app.services.json_stream import read_upload_stream, UploadTooLargeError, UploadFormatError
+from app.api import image_routes, video_routes, project_routes, system_routes, task_routes, asset_routes, metrics_routes, file_routes
+from app.api.metrics_routes import MetricsMiddleware
+from app.api.static_files import OutputFiles
+from app.api.deps import get_gemini_client, get_veo_client, get_file_storage
+from app.services.http_pool import http_pool
+from app.services.batch_scheduler import batch_scheduler
+from app.services.veo_jobs import veo_jobs
+from app.services.derivatives import derivatives
+from app.services.gemini_batcher import gemini_batcher
+from app.services.single_flight import generation_flights
+from app.services.task_store import task_store
+from app.services.asset_catalog import asset_catalog
+from app.services.storage_sweeper import storage_sweeper
+from app.services.manifest import diff_manifests, manifest_store
+from app.services.project_registry import RegisteredProject, project_registry
+from app.services.file_storage import run_io
+from app.services.metrics import stage_timer
+from contextlib import asynccontextmanager
+from functools import partial
 import os
-import uuid
+from typing import Optional
 from loguru import logger
+from pydantic import ValidationError
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 共享的上游连接池，随应用启动/关闭
+    await http_pool.start()
+    try:
+        if settings.TASK_RESUME_ON_STARTUP:
+            # 恢复上次进程未完成的任务（已完成的任务不会重新生成）
+            await batch_scheduler.resume(get_gemini_client(), get_veo_client(), get_file_storage())
+        if settings.SWEEP_ENABLED:
+            # 后台清理临时文件、旧版本与超出容量的输出
+            storage_sweeper.start()
+        yield
+    finally:
+        await storage_sweeper.shutdown()
+        await batch_scheduler.shutdown()
+        await gemini_batcher.shutdown()
+        await generation_flights.shutdown()
+        await veo_jobs.shutdown()
+        await derivatives.shutdown()
+        await http_pool.close()
+        task_store.close()
+        asset_catalog.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Ensure output directory exists
 os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
 
 # Mount static files
-app.mount("/files", StaticFiles(directory=settings.OUTPUT_DIR), name="files")
+app.mount("/files", OutputFiles(directory=settings.OUTPUT_DIR), name="files")
 
 # 设置CORS
 app.add_middleware(
@@ -30,52 +73,108 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求延迟与并发指标（/metrics）
+app.add_middleware(MetricsMiddleware)
+
 # 注册路由
 app.include_router(image_routes.router, prefix=f"{settings.API_V1_STR}", tags=["images"])
 app.include_router(video_routes.router, prefix=f"{settings.API_V1_STR}", tags=["videos"])
+app.include_router(project_routes.router, prefix=f"{settings.API_V1_STR}", tags=["projects"])
+app.include_router(system_routes.router, prefix=f"{settings.API_V1_STR}", tags=["system"])
+app.include_router(task_routes.router, prefix=f"{settings.API_V1_STR}", tags=["tasks"])
+app.include_router(asset_routes.router, prefix=f"{settings.API_V1_STR}", tags=["assets"])
+app.include_router(file_routes.router, prefix=f"{settings.API_V1_STR}", tags=["files"])
+app.include_router(metrics_routes.router, tags=["system"])
 
 @app.get("/")
 def read_root():
     return {"message": f"Welcome to {settings.PROJECT_NAME}"}
 
-@app.post(f"{settings.API_V1_STR}/upload-json", response_model=ProjectData)
-async def upload_json(file: UploadFile = File(...)):
+@app.post(
+    f"{settings.API_V1_STR}/upload-json",
+    response_model=ProjectData,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"],
+                    }
+                },
+                "application/json": {"schema": {"type": "object"}},
+            },
+        }
+    },
+)
+async def upload_json(
+    request: Request,
+    content_hash: Optional[str] = Query(None, description="文件的SHA-256；已解析过的文件直接返回，不再读取请求体"),
+):
     """
     上传并解析JSON文件
+    请求体边读取边解析（multipart 文件或原始 JSON），读取时即执行 MAX_FILE_SIZE 限制
+    解析结果按文件内容哈希缓存，重复上传同一文件时跳过解析和提示词处理
     """
-    if not file.filename.endswith('.json'):
-        raise HTTPException(status_code=400, detail="Only JSON files are allowed")
-    
-    # 确保临时目录存在
-    temp_dir = os.path.join(settings.OUTPUT_DIR, "temp")
-    os.makedirs(temp_dir, exist_ok=True)
-    
-    # 保存文件
-    file_id = str(uuid.uuid4())
-    file_path = os.path.join(temp_dir, f"{file_id}_{file.filename}")
-    
+    if content_hash:
+        registered = await run_io(project_registry.get, content_hash.lower())
+        if registered is not None:
+            logger.info(f"Upload {content_hash[:12]} already parsed; reusing project {registered.project.project_id}")
+            return await finish_upload(registered)
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail=f"File exceeds {settings.MAX_FILE_SIZE} bytes")
+
+    parser = JSONParserService()
+    stream_parser = parser.create_stream_parser()
+    filename = None
+
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        # 解析JSON
-        parser = JSONParserService()
-        project_data = parser.parse_project_json(file_path)
-        
-        # 处理Prompts
-        processed_project = parser.process_all_prompts(project_data)
+        # 解析JSON（场景随数据到达逐个构建）
+        # 包含接收请求体的时间（解析与读取交错进行）
+        with stage_timer("parse_upload"):
+            filename = await read_upload_stream(
+                request.stream(),
+                request.headers.get("content-type", ""),
+                stream_parser,
+                settings.MAX_FILE_SIZE
+            )
+            data = stream_parser.close()
+
+        registered = await run_io(project_registry.get, stream_parser.content_hash)
+        if registered is None:
+            # 处理Prompts（在字典上处理后一次性校验为 ProjectData）
+            # CPU-bound for large scripts: kept off the event loop
+            processed_project = await run_io(partial(parser.build_project, data, process_prompts=True))
+            manifest = await run_io(parser.build_manifest, processed_project)
+            registered = await run_io(project_registry.put, stream_parser.content_hash, processed_project, manifest)
         
-        logger.info(f"Successfully processed JSON file: {file.filename}")
-        return processed_project
+        logger.info(f"Successfully processed JSON file: {filename or 'request body'}")
+        return await finish_upload(registered)
         
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValidationError as e:
+        # 结构合法但字段类型不符合项目格式
+        raise HTTPException(status_code=400, detail=f"Invalid project JSON: {e.error_count()} invalid fields")
     except Exception as e:
-        logger.error(f"Error processing file {file.filename}: {str(e)}")
+        logger.error(f"Error processing file {filename or 'request body'}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
-    finally:
-        # 清理临时文件 (可选，或者保留用于调试)
-        # if os.path.exists(file_path):
-        #     os.remove(file_path)
-        pass
+
+async def finish_upload(registered: RegisteredProject) -> Response:
+    """与该项目上次生成的清单比较（由批量生成完成时写入），报告需要重新生成的镜头，并记为该项目的最新版本"""
+    project = registered.project
+    previous = await run_io(manifest_store.load, project.project)
+    changes = diff_manifests(previous, registered.manifest)
+    await run_io(project_registry.set_latest, project.project_id, project.content_hash)
+    # 直接序列化：避免 FastAPI 对 response_model 再做一次 dump + 校验（大剧本时开销显著）
+    project = project.model_copy(update={"changes": changes})
+    return Response(content=project.model_dump_json(), media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
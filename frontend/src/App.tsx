@@ -1,21 +1,54 @@
-import React, { useState } from 'react';
-import { uploadJson, generateImage, generateVideo } from './services/api';
+import React, { useEffect, useState } from 'react';
+import { uploadJson, getProject, generateImage, submitVideo, subscribeProjectEvents } from './services/api';
 import type { ProjectData } from './types';
 import FileUploader from './components/FileUploader';
 import SceneList from './components/SceneList';
 import { LayoutDashboard, Settings, History } from 'lucide-react';
 
+const LAST_PROJECT_KEY = 'lastProjectId';
+
 function App() {
   const [projectData, setProjectData] = useState<ProjectData | null>(null);
   const [loading, setLoading] = useState(false);
   const [generatingTasks, setGeneratingTasks] = useState<Record<string, string>>({}); // taskId -> status
   const [generatedFiles, setGeneratedFiles] = useState<Record<string, string>>({}); // taskId -> fileUrl
+  const [thumbnails, setThumbnails] = useState<Record<string, string>>({}); // taskId -> thumbnailUrl
+  const [framePaths, setFramePaths] = useState<Record<string, string>>({}); // taskId -> file_path (video start frames)
+
+  // Restore the last project after a page reload
+  useEffect(() => {
+    const projectId = localStorage.getItem(LAST_PROJECT_KEY);
+    if (!projectId) return;
+    getProject(projectId)
+      .then(setProjectData)
+      .catch(() => localStorage.removeItem(LAST_PROJECT_KEY));
+  }, []);
+
+  // Live per-frame updates for the loaded project (taskId = sceneId-shotId-frameType)
+  useEffect(() => {
+    if (!projectData?.project_id) return;
+    return subscribeProjectEvents(projectData.project_id, (task) => {
+      const status = task.status === 'queued' || task.status === 'running' ? 'generating' : task.status;
+      setGeneratingTasks(prev => ({ ...prev, [task.task_id]: status }));
+      const fileUrl = task.result?.file?.file_url;
+      if (fileUrl) {
+        setGeneratedFiles(prev => ({ ...prev, [task.task_id]: fileUrl }));
+      }
+      const thumbnailUrl = task.result?.file?.thumbnail_url;
+      if (thumbnailUrl) {
+        setThumbnails(prev => ({ ...prev, [task.task_id]: thumbnailUrl }));
+      }
+    });
+  }, [projectData?.project_id]);
 
   const handleUpload = async (file: File) => {
     setLoading(true);
     try {
       const data = await uploadJson(file);
       setProjectData(data);
+      if (data.project_id) {
+        localStorage.setItem(LAST_PROJECT_KEY, data.project_id);
+      }
     } catch (error) {
       console.error('Upload failed:', error);
       alert('Failed to upload JSON file');
@@ -42,6 +75,10 @@ function App() {
       if (result.file_url) {
         setGeneratedFiles(prev => ({ ...prev, [taskId]: result.file_url }));
       }
+      if (result.thumbnail_url) {
+        setThumbnails(prev => ({ ...prev, [taskId]: result.thumbnail_url }));
+      }
+      setFramePaths(prev => ({ ...prev, [taskId]: result.file_path }));
     } catch (error) {
       console.error('Generation failed:', error);
       setGeneratingTasks(prev => ({ ...prev, [taskId]: 'failed' }));
@@ -55,16 +92,14 @@ function App() {
     setGeneratingTasks(prev => ({ ...prev, [taskId]: 'generating' }));
 
     try {
-      const result = await generateVideo({
+      // Completion (or failure) is delivered by the project event stream
+      await submitVideo({
         project_name: projectData.project,
         scene_id: sceneId,
         shot_id: shotId,
         prompt: prompt,
+        start_image_path: framePaths[`${sceneId}-${shotId}-start`],
       });
-      setGeneratingTasks(prev => ({ ...prev, [taskId]: 'completed' }));
-      if (result.file_url) {
-        setGeneratedFiles(prev => ({ ...prev, [taskId]: result.file_url }));
-      }
     } catch (error) {
       console.error('Video Generation failed:', error);
       setGeneratingTasks(prev => ({ ...prev, [taskId]: 'failed' }));
@@ -115,6 +150,7 @@ function App() {
                 onGenerateVideo={handleGenerateVideo}
                 generatingTasks={generatingTasks}
                 generatedFiles={generatedFiles}
+                thumbnails={thumbnails}
              />
           </div>
         )}
@@ -8,12 +8,14 @@ interface SceneListProps {
     onGenerateVideo: (sceneId: string, shotId: string, prompt: string) => void;
     generatingTasks: Record<string, string>; // key: taskId (e.g. "sceneId-shotId-type"), value: status
     generatedFiles: Record<string, string>; // key: taskId, value: fileUrl
+    thumbnails: Record<string, string>; // key: taskId, value: thumbnailUrl
 }
 
-const SceneList: React.FC<SceneListProps> = ({ scenes, onGenerateImage, onGenerateVideo, generatingTasks, generatedFiles }) => {
+const SceneList: React.FC<SceneListProps> = ({ scenes, onGenerateImage, onGenerateVideo, generatingTasks, generatedFiles, thumbnails }) => {
     
     const getTaskStatus = (id: string) => generatingTasks[id];
     const getFileUrl = (id: string) => generatedFiles[id];
+    const getThumbnailUrl = (id: string) => thumbnails[id];
 
     return (
         <div className="space-y-8">
@@ -41,6 +43,7 @@ const SceneList: React.FC<SceneListProps> = ({ scenes, onGenerateImage, onGenera
                                 onGenerateVideo={onGenerateVideo}
                                 getStatus={getTaskStatus}
                                 getFileUrl={getFileUrl}
+                                getThumbnailUrl={getThumbnailUrl}
                             />
                         ))}
                     </div>
@@ -57,9 +60,13 @@ interface ShotItemProps {
     onGenerateVideo: (sceneId: string, shotId: string, prompt: string) => void;
     getStatus: (id: string) => string | undefined;
     getFileUrl: (id: string) => string | undefined;
+    getThumbnailUrl: (id: string) => string | undefined;
 }
 
-const ShotItem: React.FC<ShotItemProps> = ({ shot, sceneId, onGenerateImage, onGenerateVideo, getStatus, getFileUrl }) => {
+const ShotItem: React.FC<ShotItemProps> = ({ shot, sceneId, onGenerateImage, onGenerateVideo, getStatus, getFileUrl, getThumbnailUrl }) => {
+    const videoTaskId = `${sceneId}-${shot.shot_id}-video`;
+    const videoPoster = getThumbnailUrl(videoTaskId);
+
     return (
         <div className="p-4 hover:bg-gray-800/30 transition-colors">
             <div className="flex items-start justify-between mb-3">
@@ -91,6 +98,7 @@ const ShotItem: React.FC<ShotItemProps> = ({ shot, sceneId, onGenerateImage, onG
                                 const taskId = `${sceneId}-${shot.shot_id}-${frame}`;
                                 const status = getStatus(taskId);
                                 const fileUrl = getFileUrl(taskId);
+                                const thumbnailUrl = getThumbnailUrl(taskId);
 
                                 return (
                                     <div key={frame} className="space-y-2 bg-gray-900 p-2 rounded border border-gray-800/50">
@@ -106,13 +114,20 @@ const ShotItem: React.FC<ShotItemProps> = ({ shot, sceneId, onGenerateImage, onG
                                             />
                                         </div>
                                         {fileUrl && (
-                                            <div className="relative aspect-video rounded overflow-hidden bg-black/50 border border-gray-800">
+                                            <a
+                                                href={`http://localhost:8000${fileUrl}`}
+                                                target="_blank"
+                                                rel="noreferrer"
+                                                className="block relative aspect-video rounded overflow-hidden bg-black/50 border border-gray-800"
+                                            >
+                                                {/* Thumbnail in the list; the full-size frame opens on click */}
                                                 <img 
-                                                    src={`http://localhost:8000${fileUrl}`} 
+                                                    src={`http://localhost:8000${thumbnailUrl || fileUrl}`} 
                                                     alt={`${frame} frame`}
+                                                    loading="lazy"
                                                     className="w-full h-full object-contain"
                                                 />
-                                            </div>
+                                            </a>
                                         )}
                                     </div>
                                 );
@@ -133,10 +148,12 @@ const ShotItem: React.FC<ShotItemProps> = ({ shot, sceneId, onGenerateImage, onG
                                 {shot.veo_3_1_prompt}
                             </p>
                         </div>
-                        {getFileUrl(`${sceneId}-${shot.shot_id}-video`) && (
+                        {getFileUrl(videoTaskId) && (
                              <div className="mb-3 relative aspect-video rounded overflow-hidden bg-black/50 border border-gray-800">
                                 <video 
-                                    src={`http://localhost:8000${getFileUrl(`${sceneId}-${shot.shot_id}-video`)}`} 
+                                    src={`http://localhost:8000${getFileUrl(videoTaskId)}`} 
+                                    poster={videoPoster ? `http://localhost:8000${videoPoster}` : undefined}
+                                    preload={videoPoster ? 'none' : 'metadata'}
                                     controls
                                     className="w-full h-full object-contain"
                                 />
@@ -144,7 +161,7 @@ const ShotItem: React.FC<ShotItemProps> = ({ shot, sceneId, onGenerateImage, onG
                         )}
                         <div className="flex justify-end">
                             <ActionButton 
-                                status={getStatus(`${sceneId}-${shot.shot_id}-video`)} 
+                                status={getStatus(videoTaskId)} 
                                 onClick={() => onGenerateVideo(sceneId, shot.shot_id, shot.veo_3_1_prompt!)}
                                 label="Generate Video"
                                 icon={<Play className="w-3 h-3 mr-1.5" />}
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import type { ProjectData, GeneratedFile } from '../types';
+import type { ProjectData, GeneratedFile, TaskStatus } from '../types';
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000/api';
 
@@ -10,18 +10,32 @@ const api = axios.create({
     },
 });
 
+const sha256Hex = async (file: File): Promise<string | undefined> => {
+    // crypto.subtle is only available in secure contexts (https or localhost)
+    if (!window.crypto?.subtle) return undefined;
+    const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+};
+
 export const uploadJson = async (file: File): Promise<ProjectData> => {
     const formData = new FormData();
     formData.append('file', file);
     
+    // A file the backend has already parsed is answered from its cache without re-parsing
     const response = await api.post<ProjectData>('/upload-json', formData, {
         headers: {
             'Content-Type': 'multipart/form-data',
         },
+        params: { content_hash: await sha256Hex(file) },
     });
     return response.data;
 };
 
+export const getProject = async (projectId: string): Promise<ProjectData> => {
+    const response = await api.get<ProjectData>(`/projects/${encodeURIComponent(projectId)}`);
+    return response.data;
+};
+
 export const generateImage = async (params: {
     project_name: string;
     scene_id: string;
@@ -33,14 +47,63 @@ export const generateImage = async (params: {
     return response.data;
 };
 
-export const generateVideo = async (params: {
+const VIDEO_POLL_INTERVAL_MS = 3000;
+
+type VideoParams = {
     project_name: string;
     scene_id: string;
     shot_id: string;
     prompt: string;
-}): Promise<GeneratedFile> => {
-    const response = await api.post<GeneratedFile>('/generate-video', params);
+    // file_path of the generated start frame; the backend falls back to the shot's saved start frame
+    start_image_path?: string;
+};
+
+export const submitVideo = async (params: VideoParams): Promise<TaskStatus> => {
+    // Returns as soon as the task is queued; progress arrives via subscribeProjectEvents
+    const response = await api.post<TaskStatus>('/generate-video', params);
     return response.data;
 };
 
+export const generateVideo = async (params: VideoParams): Promise<GeneratedFile> => {
+    // The backend returns a task immediately; poll until the video is ready
+    let task = await submitVideo(params);
+    while (task.status === 'pending' || task.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, VIDEO_POLL_INTERVAL_MS));
+        task = (await api.get<TaskStatus>(`/video-tasks/${task.task_id}`)).data;
+    }
+    if (task.status !== 'completed' || !task.result) {
+        throw new Error(task.error || 'Video generation failed');
+    }
+    return task.result as GeneratedFile;
+};
+
+export const generateProject = async (
+    projectId: string,
+    project: ProjectData,
+    mode: 'all' | 'changed' = 'all'
+): Promise<TaskStatus> => {
+    // mode 'changed' only regenerates frames whose prompt differs from the last completed run
+    const response = await api.post<TaskStatus>(`/projects/${encodeURIComponent(projectId)}/generate`, project, {
+        params: { mode },
+    });
+    return response.data;
+};
+
+export const getBatchStatus = async (taskId: string): Promise<TaskStatus> => {
+    const response = await api.get<TaskStatus>(`/batches/${taskId}`);
+    return response.data;
+};
+
+// One server-sent-events stream per project carries every frame/video status update
+export const subscribeProjectEvents = (
+    projectId: string,
+    onUpdate: (task: TaskStatus) => void
+): (() => void) => {
+    const source = new EventSource(`${API_BASE_URL}/projects/${encodeURIComponent(projectId)}/events`);
+    source.addEventListener('task', (event) => {
+        onUpdate(JSON.parse((event as MessageEvent).data) as TaskStatus);
+    });
+    return () => source.close();
+};
+
 export default api;
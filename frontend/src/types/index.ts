@@ -22,11 +22,27 @@ export interface Scene {
     shots: Shot[];
 }
 
+export interface ShotChange {
+    scene_id: string;
+    shot_id: string;
+    frames: string[];
+}
+
+export interface ManifestDiff {
+    stale: ShotChange[];
+    unchanged: ShotChange[];
+    new: ShotChange[];
+    removed: ShotChange[];
+}
+
 export interface ProjectData {
     project: string;
+    project_id?: string; // stable id, usable with GET /projects/{project_id}
+    content_hash?: string; // SHA-256 of the uploaded file
     core_style?: Record<string, any>;
     character_references?: Record<string, string>;
     scenes: Scene[];
+    changes?: ManifestDiff; // only on upload responses
 }
 
 export interface GeneratedFile {
@@ -35,6 +51,7 @@ export interface GeneratedFile {
     file_type: 'image' | 'video';
     file_path: string;
     file_url?: string;
+    thumbnail_url?: string; // WebP thumbnail / video poster, rendered on demand
     file_name: string;
     created_at: string;
     file_size: number;
@@ -50,3 +67,13 @@ export interface TaskState {
     error?: string;
     result?: GeneratedFile;
 }
+
+export interface TaskStatus {
+    task_id: string;
+    status: string;
+    progress: number;
+    result?: Record<string, any>;
+    error?: string;
+    created_at: string;
+    updated_at: string;
+}